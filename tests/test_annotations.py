@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from yolo.annotations import (
+    AnnotationIndex,
+    open_annotation_index,
+    parse_annotation,
+)
+from yolo.targets import annotation_to_arrays
+
+ANNOTATION = """<annotation>
+    <filename>{name}.jpg</filename>
+    <size><width>500</width><height>{height}</height><depth>3</depth></size>
+{objects}</annotation>
+"""
+
+OBJECT = """    <object>
+        <name>{name}</name>
+        <difficult>{difficult}</difficult>
+        <bndbox><xmin>{x}</xmin><ymin>2</ymin><xmax>{x2}</xmax><ymax>40.5</ymax></bndbox>
+    </object>
+"""
+
+
+def write_annotation(path, name, objects, height=375):
+    body = "".join(
+        OBJECT.format(name=cls, difficult=int(d), x=x, x2=x + 10)
+        for cls, x, d in objects
+    )
+    with open(path, "w") as file:
+        file.write(ANNOTATION.format(name=name, height=height, objects=body))
+
+
+class TestAnnotationIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        contents = [
+            [("dog", 1, False), ("person", 20, True)],
+            [],
+            [("tvmonitor", 5, False)],
+        ]
+        for n, objects in enumerate(contents):
+            path = os.path.join(self.tmp.name, f"{n:06d}.xml")
+            write_annotation(path, f"{n:06d}", objects, height=300 + n)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_annotation(self):
+        image_id, size, boxes, labels, difficult = parse_annotation(self.paths[0])
+        self.assertEqual(image_id, "000000")
+        self.assertEqual(size, (500, 300))
+        np.testing.assert_allclose(boxes, [[1, 2, 11, 40.5], [20, 2, 30, 40.5]])
+        self.assertEqual(labels.tolist(), [11, 14])
+        self.assertEqual(difficult.tolist(), [False, True])
+
+    def test_unknown_class(self):
+        write_annotation(self.paths[1], "000001", [("unicorn", 1, False)])
+        with self.assertRaises(ValueError):
+            parse_annotation(self.paths[1])
+
+    def test_build_slices(self):
+        for workers in (0, 2):
+            index = AnnotationIndex.build(self.paths, num_workers=workers)
+            self.assertEqual(len(index), 3)
+            self.assertEqual(index.offsets.tolist(), [0, 2, 2, 3])
+            self.assertEqual(index[1].boxes.shape, (0, 4))
+            self.assertEqual(index[2].labels.tolist(), [19])
+            self.assertEqual(index[2].size, (500, 302))
+            self.assertEqual(index.image_of_box().tolist(), [0, 0, 2])
+            # Targets are views, not copies
+            self.assertTrue(np.shares_memory(index[0].boxes, index.boxes))
+
+    def test_save_load(self):
+        path = os.path.join(self.tmp.name, "index.npz")
+        index = AnnotationIndex.build(self.paths, num_workers=0)
+        index.save(path)
+        loaded = AnnotationIndex.load(path)
+        self.assertEqual(loaded.key, index.key)
+        self.assertEqual(loaded.image_ids.tolist(), index.image_ids.tolist())
+        np.testing.assert_array_equal(loaded.boxes, index.boxes)
+        self.assertEqual(loaded.class_names, index.class_names)
+
+    def test_open_rebuilds_when_stale(self):
+        path = os.path.join(self.tmp.name, "index.npz")
+        first = open_annotation_index(self.paths, path, num_workers=0)
+        self.assertEqual(open_annotation_index(self.paths, path).key, first.key)
+
+        write_annotation(self.paths[1], "000001", [("cat", 3, False)])
+        os.utime(self.paths[1], ns=(0, 0))
+        rebuilt = open_annotation_index(self.paths, path, num_workers=0)
+        self.assertNotEqual(rebuilt.key, first.key)
+        self.assertEqual(rebuilt[1].labels.tolist(), [7])
+
+    def test_annotation_to_arrays(self):
+        index = AnnotationIndex.build(self.paths, num_workers=0)
+        boxes, labels, size = annotation_to_arrays(index[0])
+        self.assertEqual(labels.tolist(), [11, 14])
+        self.assertEqual(size, (500, 300))
+        self.assertEqual(len(index[0].box_array()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+
+import numpy as np
+import torch
+
+from yolo.annotations import AnnotationTarget
+from yolo.augment import BatchAugment, color_matrices
+from yolo.base import BoxArray
+from yolo.targets import YoloCollate
+
+
+def boxes_of(*xyxy, labels=None):
+    xyxy = np.array(xyxy, dtype=np.float32).reshape(-1, 4)
+    if labels is None:
+        labels = np.arange(len(xyxy))
+    return BoxArray(xyxy, "xyxy", labels=np.asarray(labels))
+
+
+IDENTITY = dict(scale=0.0, translate=0.0, flip=0.0, hue=0.0, saturation=0.0, value=0.0)
+
+
+class TestColorMatrices(unittest.TestCase):
+    def test_identity_without_jitter(self):
+        zeros, ones = torch.zeros(2, dtype=torch.float64), torch.ones(
+            2, dtype=torch.float64
+        )
+        matrices = color_matrices(zeros, ones, ones)
+        torch.testing.assert_close(
+            matrices, torch.eye(3, dtype=torch.float64).expand(2, 3, 3)
+        )
+
+    def test_gray_stays_gray(self):
+        hue = torch.tensor([0.1], dtype=torch.float64)
+        matrices = color_matrices(
+            hue,
+            torch.tensor([1.5], dtype=torch.float64),
+            torch.ones(1, dtype=torch.float64),
+        )
+        gray = torch.full((3,), 0.5, dtype=torch.float64)
+        torch.testing.assert_close(matrices[0] @ gray, gray)
+
+
+class TestBatchAugment(unittest.TestCase):
+    def setUp(self):
+        self.generator = torch.Generator().manual_seed(0)
+        self.images = torch.randint(
+            0, 256, (2, 3, 64, 64), dtype=torch.uint8, generator=self.generator
+        )
+        self.boxes = [
+            boxes_of([8, 8, 24, 40]),
+            boxes_of([30, 10, 60, 20], [4, 4, 12, 12]),
+        ]
+
+    def test_identity(self):
+        images, boxes = BatchAugment(**IDENTITY)(self.images, self.boxes)
+        self.assertEqual(images.dtype, torch.uint8)
+        self.assertLessEqual((images.int() - self.images.int()).abs().max().item(), 1)
+        for got, expected in zip(boxes, self.boxes):
+            np.testing.assert_allclose(got.xyxy(), expected.xyxy(), atol=1e-4)
+            np.testing.assert_array_equal(got.labels, expected.labels)
+
+    def test_flip(self):
+        augment = BatchAugment(**{**IDENTITY, "flip": 1.0})
+        images, boxes = augment(self.images, self.boxes)
+        self.assertLessEqual(
+            (images.int() - self.images.flip(-1).int()).abs().max().item(), 1
+        )
+        np.testing.assert_allclose(boxes[0].xyxy(), [[40, 8, 56, 40]], atol=1e-4)
+
+    def test_translation_moves_boxes_together(self):
+        augment = BatchAugment(
+            **{**IDENTITY, "translate": 0.05}, generator=self.generator
+        )
+        _, boxes = augment(self.images, self.boxes)
+        self.assertEqual(len(boxes[1]), 2)
+        xyxy = boxes[1].xyxy()
+        shift = xyxy - self.boxes[1].xyxy()
+        np.testing.assert_allclose(shift[0], shift[1], atol=1e-4)
+        np.testing.assert_allclose(shift[0, :2], shift[0, 2:], atol=1e-4)
+        self.assertTrue(np.any(np.abs(shift) > 0))
+
+    def test_boxes_outside_are_dropped(self):
+        xyxy = np.array(
+            [[10, 10, 20, 20], [60, 10, 80, 20], [-30, 0, 2, 30], [0, 0, 1, 50]],
+            dtype=np.float32,
+        )
+        keep = BatchAugment._visible(xyxy, 64, 64)
+        np.testing.assert_array_equal(keep, [True, True, False, False])
+
+    def test_float_dtype_preserved(self):
+        images = self.images.float() / 255
+        out, _ = BatchAugment(generator=self.generator)(images, self.boxes)
+        self.assertEqual(out.dtype, torch.float32)
+        self.assertEqual(out.shape, images.shape)
+        self.assertTrue(out.min() >= 0 and out.max() <= 1)
+
+    def test_mosaic(self):
+        augment = BatchAugment(**{**IDENTITY, "mosaic": 1.0}, generator=self.generator)
+        _, boxes = augment(self.images, self.boxes)
+        # every mosaic has its own boxes at half size in the top left tile
+        np.testing.assert_allclose(boxes[0].xyxy()[0], [4, 4, 12, 20], atol=1e-4)
+        for b in boxes:
+            self.assertGreaterEqual(len(b), 1)
+            self.assertTrue(np.all(b.xyxy() <= 64))
+
+    def test_collate_with_augment(self):
+        collate = YoloCollate(augment=BatchAugment(generator=self.generator))
+        images = torch.randint(0, 256, (2, 3, 448, 448), dtype=torch.uint8)
+        targets = [
+            collate_target([[50, 60, 200, 300]], [3]),
+            collate_target([[10, 10, 400, 400]], [7]),
+        ]
+        out, encoded, mask = collate.from_batch(images, targets)
+        self.assertEqual(out.shape, images.shape)
+        self.assertEqual(encoded.shape, (2, 7, 7, 30))
+        self.assertLessEqual(mask.sum().item(), 2)
+
+
+def collate_target(boxes, labels):
+    return AnnotationTarget(
+        "0",
+        np.array(boxes, dtype=np.float32),
+        np.array(labels, dtype=np.int64),
+        np.zeros(len(labels), dtype=bool),
+        (448, 448),
+    )
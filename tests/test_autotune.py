@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import unittest
+
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+from yolo.autotune import (
+    LoaderSettings,
+    autotune,
+    candidate_settings,
+    load_settings,
+    measure,
+    resolve_settings,
+    save_settings,
+)
+
+
+class TestAutotune(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "loader.json")
+        self.dataset = TensorDataset(torch.zeros(64, 3, 8, 8))
+        self.threads = torch.get_num_threads()
+
+    def tearDown(self):
+        torch.set_num_threads(self.threads)
+        self.tmp.cleanup()
+
+    def make_loader(self, settings):
+        return DataLoader(self.dataset, batch_size=4, **settings.loader_kwargs())
+
+    def test_candidates(self):
+        candidates = candidate_settings(16)
+        self.assertEqual(len(candidates), len(set(candidates)))
+        self.assertEqual(candidates[0].num_workers, 0)
+        self.assertEqual(max(c.num_workers for c in candidates), 15)
+        for c in candidates:
+            self.assertEqual(c.torch_threads, max(1, 16 - c.num_workers))
+        self.assertEqual(len(candidate_settings(1)), 3)
+
+    def test_loader_kwargs(self):
+        self.assertEqual(
+            LoaderSettings(0, 2, True, 4).loader_kwargs(), {"num_workers": 0}
+        )
+        kwargs = LoaderSettings(3, 4, True, 1).loader_kwargs()
+        self.assertEqual(kwargs["prefetch_factor"], 4)
+        self.assertTrue(kwargs["persistent_workers"])
+        kwargs = LoaderSettings(3, 4, True, 1).loader_kwargs(persistent=False)
+        self.assertFalse(kwargs["persistent_workers"])
+
+    def test_fallback_keeps_threads(self):
+        torch.set_num_threads(1)
+        LoaderSettings.fallback(2).apply()
+        self.assertEqual(torch.get_num_threads(), 1)
+        LoaderSettings(2, 2, False, 2).apply()
+        self.assertEqual(torch.get_num_threads(), 2)
+
+    def test_measure(self):
+        result = measure(self.make_loader, LoaderSettings(0, 2, False, 1), 5)
+        self.assertGreater(result["batches_per_s"], 0)
+        self.assertGreaterEqual(result["stall_total_ms"], result["stall_ms"])
+        self.assertEqual(torch.get_num_threads(), 1)
+
+    def test_autotune(self):
+        candidates = [LoaderSettings(0, 2, False, 1), LoaderSettings(0, 2, False, 2)]
+        best = autotune(self.make_loader, candidates, num_batches=3)
+        self.assertIn(best, candidates)
+        self.assertEqual(torch.get_num_threads(), self.threads)
+
+    def test_cache(self):
+        self.assertIsNone(load_settings("train", self.path))
+        settings = LoaderSettings(2, 4, True, 6)
+        save_settings("train", settings, self.path)
+        save_settings("val", LoaderSettings(1, 2, True, 7), self.path)
+        self.assertEqual(load_settings("train", self.path), settings)
+
+        # Settings tuned for another core count are ignored
+        with open(self.path) as file:
+            entries = json.load(file)
+        entries["train"]["cpu_count"] = -1
+        with open(self.path, "w") as file:
+            json.dump(entries, file)
+        self.assertIsNone(load_settings("train", self.path))
+        self.assertIsNotNone(load_settings("val", self.path))
+
+    def test_resolve(self):
+        explicit = resolve_settings("k", self.make_loader, 3, path=self.path)
+        self.assertEqual(explicit.num_workers, 3)
+        fallback = resolve_settings("k", self.make_loader, path=self.path)
+        self.assertEqual(fallback, LoaderSettings.fallback())
+
+        save_settings("k", LoaderSettings(0, 2, False, 1), self.path)
+        cached = resolve_settings("k", self.make_loader, path=self.path)
+        self.assertEqual(cached, LoaderSettings(0, 2, False, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
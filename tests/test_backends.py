@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+import warnings
+
+import torch
+
+from tests.test_model import batch_norm_config, trained_model
+from yolo.backends import (
+    InferenceBackend,
+    OnnxRuntimeBackend,
+    TorchBackend,
+    TorchScriptBackend,
+    export_onnx,
+    open_backend,
+)
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+
+class TestBackends(unittest.TestCase):
+    def setUp(self):
+        self.model = trained_model(batch_norm_config(reshape=True))
+        self.images = torch.rand(3, 3, 64, 64)
+
+    def torchscript(self) -> TorchScriptBackend:
+        with warnings.catch_warnings():
+            # TorchScript is deprecated in favour of torch.export
+            warnings.simplefilter("ignore", FutureWarning)
+            return open_backend("torchscript", self.model)
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            InferenceBackend()
+
+    def test_torch(self):
+        backend = open_backend("torch", self.model)
+        self.assertIsInstance(backend, TorchBackend)
+        torch.testing.assert_close(
+            backend.predict(self.images), self.model.predict(self.images)
+        )
+
+    def test_torchscript(self):
+        backend = self.torchscript()
+        self.assertIsInstance(backend, TorchScriptBackend)
+        torch.testing.assert_close(
+            backend.predict(self.images), self.model.predict(self.images)
+        )
+
+    def test_inference_only(self):
+        backend = self.torchscript()
+        self.assertIs(backend.eval(), backend)
+        backend.train(False)
+        with self.assertRaises(ValueError):
+            backend.train()
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            open_backend("tensorrt", self.model)
+        with self.assertRaises(ValueError):
+            open_backend("onnxruntime")
+
+    @unittest.skipIf(onnxruntime is None, "onnxruntime is not installed")
+    def test_onnxruntime(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "yolo.onnx")
+            with warnings.catch_warnings():
+                # The TorchScript based exporter is deprecated in favour of dynamo
+                warnings.simplefilter("ignore", DeprecationWarning)
+                export_onnx(self.model, path)
+            backend = open_backend("onnxruntime", path=path, threads=1)
+        self.assertIsInstance(backend, OnnxRuntimeBackend)
+        # Exported with a batch of one, run with others
+        for images in (self.images, self.images[:1]):
+            torch.testing.assert_close(
+                backend.predict(images),
+                self.model.predict(images),
+                atol=1e-4,
+                rtol=1e-4,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader
+from torchvision.transforms import v2
+
+from yolo.annotations import AnnotationIndex, IndexedVOCDataset
+from yolo.data import (
+    BatchNormalizer,
+    IMAGENET_MEAN,
+    IMAGENET_STD,
+    collate_fn,
+    stack_images,
+)
+from yolo.decode import DraftDecoder
+
+ANNOTATION = """<annotation>
+    <filename>{name}.jpg</filename>
+    <size><width>64</width><height>48</height><depth>3</depth></size>
+</annotation>
+"""
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        images, annotations = [], []
+        for n in range(6):
+            image_path = os.path.join(self.tmp.name, f"{n}.png")
+            pixels = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+            Image.fromarray(pixels).save(image_path)
+            anno_path = os.path.join(self.tmp.name, f"{n}.xml")
+            with open(anno_path, "w") as file:
+                file.write(ANNOTATION.format(name=n))
+            images.append(image_path)
+            annotations.append(anno_path)
+        self.images = images
+        self.index = AnnotationIndex.build(annotations, num_workers=0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def loader(self, transform, num_workers=0):
+        dataset = IndexedVOCDataset(
+            self.images, self.index, transform, loader=DraftDecoder((32, 32))
+        )
+        return DataLoader(
+            dataset, batch_size=3, num_workers=num_workers, collate_fn=collate_fn
+        )
+
+    def test_stack_images(self):
+        tensors = [torch.full((3, 4, 4), n, dtype=torch.uint8) for n in range(3)]
+        batch = stack_images(tensors)
+        self.assertEqual(batch.shape, (3, 3, 4, 4))
+        self.assertEqual(batch.dtype, torch.uint8)
+        self.assertEqual(batch[:, 0, 0, 0].tolist(), [0, 1, 2])
+
+    def test_uint8_matches_float(self):
+        to_float = v2.Compose([v2.ToImage(), v2.ToDtype(torch.float32, scale=True)])
+        float_batches = [f for f, _ in self.loader(to_float)]
+        uint8_batches = [f for f, _ in self.loader(v2.ToImage(), num_workers=1)]
+
+        normalize = BatchNormalizer()
+        for f, u in zip(float_batches, uint8_batches):
+            self.assertEqual(u.dtype, torch.uint8)
+            self.assertEqual(f.nbytes, 4 * u.nbytes)
+            torch.testing.assert_close(normalize(u), f)
+            torch.testing.assert_close(normalize(f), f)
+
+    def test_normalize(self):
+        batch = torch.randint(0, 256, (2, 3, 8, 8), dtype=torch.uint8)
+        expected = v2.Normalize(IMAGENET_MEAN, IMAGENET_STD)(batch.float() / 255)
+        normalize = BatchNormalizer(IMAGENET_MEAN, IMAGENET_STD)
+        torch.testing.assert_close(normalize(batch), expected)
+        torch.testing.assert_close(normalize(batch.float() / 255), expected)
+
+    def test_does_not_modify_float_input(self):
+        batch = torch.rand(2, 3, 4, 4)
+        original = batch.clone()
+        BatchNormalizer(IMAGENET_MEAN, IMAGENET_STD)(batch)
+        torch.testing.assert_close(batch, original)
+
+    def test_from_config(self):
+        self.assertTrue(BatchNormalizer.from_config({}).identity)
+        self.assertFalse(BatchNormalizer.from_config({"normalize": True}).identity)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -51,6 +51,32 @@ class TestBoundingBox(unittest.TestCase):
         self.assertEqual(self.bbox1.iou(self.bbox2), 1 / 15)
         self.assertEqual(self.bbox2.iou(self.bbox1), 1 / 15)
 
+    def test_contains(self):
+        self.assertTrue(self.bbox1.contains(0.25, 0.5))
+        self.assertFalse(self.bbox1.contains(0.5, 0.5))
+        self.assertFalse(self.bbox2.contains(0.25, 0.0))
+
+    def test_on_edge(self):
+        self.assertTrue(self.bbox1.on_edge(Point(0.5, 0.0), 0.2))
+        self.assertFalse(self.bbox1.on_edge(Point(0.0, 0.0), 0.2))
+
+    def test_no_intersection(self):
+        far = Rectangle((10, 10), 1, 1, 0.5)
+        self.assertFalse(self.bbox1.intersects(far))
+        self.assertEqual(self.bbox1.int_area(far), 0.0)
+        self.assertEqual(self.bbox1.iou(far), 0.0)
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            self.bbox1.w = 3
+        with self.assertRaises(AttributeError):
+            self.bbox1.center.x = 3
+
+    def test_hashable(self):
+        copy = Rectangle((0, 0), 1, 2, 0.5)
+        self.assertEqual(hash(copy), hash(self.bbox1))
+        self.assertEqual(len({copy, self.bbox1, self.bbox2}), 2)
+
 
 if __name__ == "__main__":
     unittest.main()
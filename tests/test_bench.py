@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from yolo.bench import (
+    compare,
+    flatten,
+    load_results,
+    run_suites,
+    save_results,
+    time_fn,
+)
+
+
+def results(p50, rate):
+    return {"suites": {"a": {"op": {"p50_ms": p50, "p99_ms": 100.0}, "per_s": rate}}}
+
+
+class TestBench(unittest.TestCase):
+    def test_time_fn(self):
+        timing = time_fn(lambda: None, repeat=10, warmup=1)
+        self.assertLessEqual(timing["p50_ms"], timing["p90_ms"])
+        self.assertLessEqual(timing["p90_ms"], timing["p99_ms"])
+
+    def test_flatten(self):
+        flat = flatten({"a": {"b": 1, "c": {"d": 2.5}}, "e": "text", "f": True})
+        self.assertEqual(flat, {"a.b": 1.0, "a.c.d": 2.5})
+
+    def test_compare(self):
+        baseline = results(10.0, 100.0)
+        self.assertEqual(compare(results(10.5, 96.0), baseline, 0.1), [])
+        self.assertEqual(compare(results(5.0, 200.0), baseline, 0.1), [])
+
+        regressions = compare(results(12.0, 80.0), baseline, 0.1)
+        metrics = {r["metric"]: r for r in regressions}
+        self.assertEqual(set(metrics), {"a.op.p50_ms", "a.per_s"})
+        self.assertAlmostEqual(metrics["a.op.p50_ms"]["slowdown"], 0.2)
+        self.assertAlmostEqual(metrics["a.per_s"]["slowdown"], 0.25)
+
+    def test_compare_skips_missing(self):
+        current = {"suites": {"b": {"p50_ms": 1000.0}}}
+        self.assertEqual(compare(current, results(1.0, 1.0)), [])
+
+    def test_unknown_suite(self):
+        with self.assertRaises(ValueError):
+            run_suites(["nope"])
+
+    def test_run_and_store(self):
+        output = run_suites(["collate"], quick=True)
+        self.assertIn("torch", output["environment"])
+        self.assertGreater(output["suites"]["collate"]["samples_per_s"], 0)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench", "baseline.json")
+            save_results(output, path)
+            self.assertEqual(compare(output, load_results(path)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
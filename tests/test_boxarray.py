@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+import torch
+
+from yolo.base import BoxArray, Rectangle
+
+
+class TestBoxArray(unittest.TestCase):
+    def setUp(self):
+        self.rects = [
+            Rectangle((0, 0), 1, 2, 0.5),
+            Rectangle((1, 1), 2, 1, 0.5),
+            Rectangle((10, 10), 2, 2, 0.9),
+        ]
+        self.boxes = BoxArray.from_rects(self.rects)
+
+    def test_rects_round_trip(self):
+        self.assertEqual(self.boxes.to_rects(), self.rects)
+
+    def test_labeled_rects_round_trip(self):
+        pairs = [("cat", self.rects[0]), ("dog", self.rects[1])]
+        boxes = BoxArray.from_labeled_rects(pairs)
+        self.assertEqual(boxes.to_labeled_rects(), pairs)
+
+    def test_convert(self):
+        xyxy = self.boxes.convert("xyxy")
+        np.testing.assert_allclose(xyxy.data[0], [-0.5, -1.0, 0.5, 1.0])
+        np.testing.assert_allclose(xyxy.convert("cxcywh").data, self.boxes.data)
+
+    def test_area(self):
+        np.testing.assert_allclose(self.boxes.area(), [2, 2, 4])
+
+    def test_iou_matches_rectangle(self):
+        iou = self.boxes.iou(self.boxes)
+        for i, a in enumerate(self.rects):
+            for j, b in enumerate(self.rects):
+                self.assertAlmostEqual(iou[i, j], a.iou(b))
+
+    def test_union_matches_rectangle(self):
+        union = self.boxes.union(self.boxes)
+        self.assertAlmostEqual(union[0, 1], self.rects[0].union_area(self.rects[1]))
+
+    def test_tensor_backend(self):
+        boxes = self.boxes.tensor()
+        iou = boxes.iou(boxes.convert("xyxy"))
+        self.assertIsInstance(iou, torch.Tensor)
+        np.testing.assert_allclose(iou.numpy(), self.boxes.iou(self.boxes))
+
+    def test_clip(self):
+        clipped = self.boxes.clip(10, 10).xyxy()
+        np.testing.assert_allclose(clipped[0], [0, 0, 0.5, 1.0])
+        np.testing.assert_allclose(clipped[2], [9, 9, 10, 10])
+
+    def test_scale(self):
+        scaled = self.boxes.scale(2, 0.5)
+        np.testing.assert_allclose(scaled.data[1], [2, 0.5, 4, 0.5])
+
+    def test_index(self):
+        self.assertEqual(len(self.boxes[1:]), 2)
+        self.assertEqual(self.boxes[-1].to_rects(), [self.rects[2]])
+        # Scalars of vectorized code select one box too
+        for index in (np.int64(2), np.array(2), torch.tensor(2), np.int32(-1)):
+            self.assertEqual(self.boxes[index].data.shape, (1, 4))
+            self.assertEqual(self.boxes[index].to_rects(), [self.rects[2]])
+        self.assertEqual(len(self.boxes[np.array([True, False, True])]), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+from PIL import Image
+
+from yolo.cache import (
+    RESAMPLE,
+    ShardCacheDataset,
+    build_shard_cache,
+    cache_key,
+    open_shard_cache,
+    read_index,
+)
+
+ANNOTATION = """<annotation>
+    <filename>{name}.jpg</filename>
+    <size><width>{width}</width><height>{height}</height><depth>3</depth></size>
+    <object>
+        <name>dog</name>
+        <bndbox><xmin>1</xmin><ymin>2</ymin><xmax>10</xmax><ymax>12</ymax></bndbox>
+    </object>
+</annotation>
+"""
+
+
+class FakeVOC:
+    def __init__(self, root, count=3):
+        self.images, self.annotations = [], []
+        rng = np.random.default_rng(0)
+        for n in range(count):
+            name = f"{n:06d}"
+            image_path = os.path.join(root, name + ".png")
+            pixels = rng.integers(0, 256, (30 + n, 40, 3), dtype=np.uint8)
+            Image.fromarray(pixels).save(image_path)
+            anno_path = os.path.join(root, name + ".xml")
+            with open(anno_path, "w") as file:
+                file.write(ANNOTATION.format(name=name, width=40, height=30 + n))
+            self.images.append(image_path)
+            self.annotations.append(anno_path)
+
+
+class TestShardCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = FakeVOC(self.tmp.name)
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build_and_read(self):
+        build_shard_cache(
+            self.source.images, self.source.annotations, self.cache_dir, (16, 8)
+        )
+        dataset = ShardCacheDataset(self.cache_dir)
+        self.assertEqual(len(dataset), 3)
+
+        image, target = dataset[1]
+        self.assertEqual(image.shape, (3, 8, 16))
+        self.assertEqual(image.dtype, torch.float32)
+        self.assertEqual(target.labels.tolist(), [11])
+        self.assertEqual(target.size, (40, 31))
+
+        expected = np.asarray(
+            Image.open(self.source.images[1]).convert("RGB").resize((16, 8), RESAMPLE)
+        )
+        np.testing.assert_array_equal(
+            dataset.image(1).permute(1, 2, 0).numpy(), expected
+        )
+
+    def test_zero_copy(self):
+        build_shard_cache(
+            self.source.images, self.source.annotations, self.cache_dir, (16, 8)
+        )
+        dataset = ShardCacheDataset(self.cache_dir)
+        first, second = dataset.image(0), dataset.image(0)
+        self.assertEqual(first.data_ptr(), second.data_ptr())
+
+    def test_invalidation(self):
+        first = open_shard_cache(self.source, self.cache_dir, (16, 8))
+        self.assertEqual(first.key, read_index(self.cache_dir)["key"])
+
+        # Same sources and parameters reuse the cache
+        mtime = os.path.getmtime(os.path.join(self.cache_dir, "index.json"))
+        open_shard_cache(self.source, self.cache_dir, (16, 8))
+        self.assertEqual(
+            mtime, os.path.getmtime(os.path.join(self.cache_dir, "index.json"))
+        )
+
+        # Other transform parameters rebuild it
+        resized = open_shard_cache(self.source, self.cache_dir, (8, 8))
+        self.assertNotEqual(resized.key, first.key)
+        self.assertEqual(resized.image(0).shape, (3, 8, 8))
+
+        # So does a changed source file
+        Image.new("RGB", (40, 30), (255, 0, 0)).save(self.source.images[0])
+        os.utime(self.source.images[0], ns=(0, 0))
+        changed = open_shard_cache(self.source, self.cache_dir, (8, 8))
+        self.assertNotEqual(changed.key, resized.key)
+        self.assertEqual(changed.image(0)[:, 0, 0].tolist(), [255, 0, 0])
+
+    def test_key_depends_on_size(self):
+        args = (self.source.images, self.source.annotations)
+        self.assertEqual(cache_key(*args, (8, 8)), cache_key(*args, (8, 8)))
+        self.assertNotEqual(cache_key(*args, (8, 8)), cache_key(*args, (16, 8)))
+
+
+if __name__ == "__main__":
+    unittest.main()
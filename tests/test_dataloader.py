@@ -7,6 +7,7 @@ import torch
 import json
 
 from yolo import ROOT_DIR
+from yolo.annotations import AnnotationTarget
 from yolo.base import Rectangle
 from yolo.data import create_voc_dataloader
 from yolo.utils import draw_bbox_on_image, objects_to_rects, save_image_buf
@@ -36,23 +37,21 @@ class TestDataLoader(unittest.TestCase):
     def test_plot_some_images(self):
         print("Testing dataloader")
         features: torch.Tensor
-        targets: list[dict]
+        targets: list[AnnotationTarget]
         for batch_index, (features, targets) in enumerate(self.loader):
 
             target = targets[0]
             print(f"target: {target}")
 
-            anno = target["annotation"]
-            filename = anno["filename"]
-
             rect_image = np.squeeze(features[0].numpy())
             rect_image = np.transpose(rect_image, [1, 2, 0])
 
-            rects = objects_to_rects(anno["object"])
+            width, height = target.size
+            boxes = target.box_array().scale(448 / width, 448 / height)
+            rects = boxes.to_rects()
             print(f"rects: {rects}")
 
-            for rect in rects:
-                rect_image = draw_bbox_on_image(rect_image, [rect[1]])
+            rect_image = draw_bbox_on_image(rect_image, rects)
 
             plt.imshow(rect_image)
             plt.savefig("example.png")
@@ -0,0 +1,50 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from yolo.decode import DraftDecoder, decode_image
+
+
+class TestDecode(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        gradient = np.linspace(0, 255, 1600, dtype=np.uint8)
+        pixels = np.stack(
+            np.broadcast_arrays(
+                gradient[None, :], gradient[:1200, None], np.uint8(128)
+            ),
+            -1,
+        )
+        self.jpeg = os.path.join(self.tmp.name, "large.jpg")
+        Image.fromarray(pixels).save(self.jpeg, quality=95)
+        self.png = os.path.join(self.tmp.name, "small.png")
+        Image.fromarray(pixels[:300, :400]).save(self.png)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_size(self):
+        for path in (self.jpeg, self.png):
+            image = decode_image(path, (448, 448))
+            self.assertEqual(image.size, (448, 448))
+            self.assertEqual(image.mode, "RGB")
+
+    def test_close_to_full_decode(self):
+        full = Image.open(self.jpeg).convert("RGB").resize((448, 448), Image.BILINEAR)
+        draft = decode_image(self.jpeg, (448, 448))
+        diff = np.abs(np.asarray(full, np.int16) - np.asarray(draft, np.int16))
+        self.assertLess(diff.mean(), 2.0)
+
+    def test_decoder(self):
+        decoder = pickle.loads(pickle.dumps(DraftDecoder((64, 32))))
+        tensor = decoder.to_tensor(self.jpeg)
+        self.assertEqual(tuple(tensor.shape), (3, 32, 64))
+        self.assertEqual(str(tensor.dtype), "torch.uint8")
+
+
+if __name__ == "__main__":
+    unittest.main()
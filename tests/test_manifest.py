@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from yolo.manifest import open_voc_split, verify_manifest
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dataset_dir = self.tmp.name
+        self.root = os.path.join(self.dataset_dir, "VOCdevkit", "VOC2012")
+        for sub in ("JPEGImages", "Annotations", os.path.join("ImageSets", "Main")):
+            os.makedirs(os.path.join(self.root, sub))
+        self.ids = [f"2012_{n:06d}" for n in range(5)]
+        for image_id in self.ids:
+            self.write(os.path.join("JPEGImages", image_id + ".jpg"), b"jpeg")
+            self.write(os.path.join("Annotations", image_id + ".xml"), b"<xml/>")
+        self.write(
+            os.path.join("ImageSets", "Main", "train.txt"),
+            ("\n".join(self.ids) + "\n").encode(),
+        )
+        self.path = os.path.join(self.dataset_dir, "voc2012-train-manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        with open(os.path.join(self.root, name), "wb") as f:
+            f.write(data)
+
+    def manifest(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+    def test_lists_extracted_split_offline(self):
+        with mock.patch("yolo.manifest.VOCDetection") as voc:
+            split = open_voc_split(self.dataset_dir, "train")
+        voc.assert_not_called()
+        self.assertEqual(
+            split.images,
+            [os.path.join(self.root, "JPEGImages", i + ".jpg") for i in self.ids],
+        )
+        self.assertEqual(len(split.annotations), 5)
+        self.assertEqual(self.manifest()["ids"], self.ids)
+
+    def test_reuses_valid_manifest(self):
+        open_voc_split(self.dataset_dir, "train")
+        with mock.patch("yolo.manifest.write_manifest") as write:
+            split = open_voc_split(self.dataset_dir, "train", download=False)
+        write.assert_not_called()
+        self.assertEqual(len(split.images), 5)
+
+    def test_detects_changes(self):
+        open_voc_split(self.dataset_dir, "train")
+        manifest = self.manifest()
+        self.assertTrue(verify_manifest(self.root, manifest, full=True))
+
+        # rewriting a file in place keeps the directories, only the full
+        # check sees the new size
+        self.write(os.path.join("JPEGImages", self.ids[0] + ".jpg"), b"longer jpeg")
+        self.assertTrue(verify_manifest(self.root, manifest))
+        self.assertFalse(verify_manifest(self.root, manifest, full=True))
+
+        os.remove(os.path.join(self.root, "Annotations", self.ids[1] + ".xml"))
+        self.assertFalse(verify_manifest(self.root, manifest))
+
+    def test_missing_split(self):
+        with self.assertRaises(FileNotFoundError):
+            open_voc_split(self.dataset_dir, "val", download=False)
+        with mock.patch("yolo.manifest.VOCDetection") as voc:
+            with self.assertRaises(FileNotFoundError):
+                open_voc_split(self.dataset_dir, "val")
+        voc.assert_called_once()
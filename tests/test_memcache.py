@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader
+from torchvision.transforms import v2
+
+from yolo.annotations import AnnotationIndex, IndexedVOCDataset
+from yolo.data import collate_fn
+from yolo.decode import DraftDecoder
+from yolo.memcache import MemoryCachedDataset, SharedImageCache
+
+ANNOTATION = """<annotation>
+    <filename>{name}.jpg</filename>
+    <size><width>64</width><height>48</height><depth>3</depth></size>
+</annotation>
+"""
+IMAGE_BYTES = 3 * 2 * 2
+
+
+def image(n):
+    return torch.full((3, 2, 2), n, dtype=torch.uint8)
+
+
+class TestSharedImageCache(unittest.TestCase):
+    def test_budget(self):
+        self.assertEqual(len(SharedImageCache(10, (3, 2, 2), 3 * IMAGE_BYTES + 5)), 3)
+        self.assertEqual(len(SharedImageCache(2, (3, 2, 2), 100 * IMAGE_BYTES)), 2)
+        with self.assertRaises(ValueError):
+            SharedImageCache(10, (3, 2, 2), IMAGE_BYTES - 1)
+
+    def test_hit_and_miss(self):
+        cache = SharedImageCache(4, (3, 2, 2), 4 * IMAGE_BYTES)
+        self.assertIsNone(cache.get(1))
+        cache.put(1, image(7))
+        torch.testing.assert_close(cache.get(1), image(7))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual((stats["images"], stats["bytes"]), (1, IMAGE_BYTES))
+
+    def test_clock_keeps_referenced_images(self):
+        cache = SharedImageCache(5, (3, 2, 2), 2 * IMAGE_BYTES)
+        cache.put(0, image(0))
+        cache.put(1, image(1))
+        cache.get(0)
+        # 1 was not used since it was cached, so it goes first
+        cache.put(2, image(2))
+        self.assertIsNone(cache.get(1))
+        torch.testing.assert_close(cache.get(0), image(0))
+        torch.testing.assert_close(cache.get(2), image(2))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+class TestMemoryCachedDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(0)
+        images, annotations = [], []
+        for n in range(6):
+            image_path = os.path.join(self.tmp.name, f"{n}.png")
+            pixels = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+            Image.fromarray(pixels).save(image_path)
+            anno_path = os.path.join(self.tmp.name, f"{n}.xml")
+            with open(anno_path, "w") as file:
+                file.write(ANNOTATION.format(name=n))
+            images.append(image_path)
+            annotations.append(anno_path)
+        self.source = IndexedVOCDataset(
+            images,
+            AnnotationIndex.build(annotations, num_workers=0),
+            v2.ToImage(),
+            loader=DraftDecoder((32, 24)),
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_samples(self):
+        dataset = MemoryCachedDataset(self.source, 2**20)
+        for n in range(len(dataset)):
+            for _ in range(2):
+                image, target = dataset[n]
+                expected, expected_target = self.source[n]
+                self.assertEqual(image.shape, (3, 24, 32))
+                torch.testing.assert_close(image, expected)
+                self.assertEqual(target.image_id, expected_target.image_id)
+        self.assertEqual(dataset.cache_stats()["hits"], 6)
+
+    def test_shared_by_workers_across_epochs(self):
+        dataset = MemoryCachedDataset(self.source, 2**20)
+        loader = DataLoader(dataset, batch_size=2, num_workers=2, collate_fn=collate_fn)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for _ in range(2):
+                for _ in loader:
+                    pass
+        stats = dataset.cache_stats()
+        self.assertEqual(stats["misses"], 6)
+        self.assertEqual(stats["hits"], 6)
+        self.assertEqual(stats["images"], 6)
@@ -0,0 +1,201 @@
+import copy
+import logging
+import os
+import tempfile
+import unittest
+import warnings
+
+import torch
+import torch.nn as nn
+
+from yolo.model import ConvAct, Reshape, Yolo, load_frozen, save_frozen
+
+CONFIG = {
+    "input_size": 64,
+    "layers": [
+        {"type": "conv", "name": "c1", "kernel_size": 7, "filters": 8, "stride": 2},
+        {"type": "maxpool", "name": "p1", "kernel_size": 2, "stride": 2},
+        {"type": "conv", "name": "c2", "kernel_size": 3, "filters": 16, "stride": 1},
+        {"type": "conv", "name": "c3", "kernel_size": 3, "filters": 16, "stride": 2},
+        {"type": "fc", "name": "fc1", "filters": 32, "dropout": 0.5},
+        {"type": "fc", "name": "fc2", "filters": 4 * 4 * 30, "activation": "linear"},
+    ],
+}
+
+
+def batch_norm_config(reshape: bool = False) -> dict:
+    """:data:`CONFIG` with a batch norm after the second convolution, and
+    optionally a reshape of the outputs into the grid"""
+    config = copy.deepcopy(CONFIG)
+    config["layers"][2]["batch_norm"] = True
+    if reshape:
+        config["layers"].append({"type": "reshape", "name": "r", "shape": [4, 4, 30]})
+    return config
+
+
+def trained_model(config: dict) -> Yolo:
+    """Builds a model in evaluation mode whose batch norm statistics were
+    trained away from the identity"""
+    torch.manual_seed(0)
+    model = Yolo(config, logging.getLogger(__name__))
+    for _ in range(3):
+        model(torch.rand(4, 3, 64, 64) * 2)
+    return model.eval()
+
+
+class TestModel(unittest.TestCase):
+    def setUp(self):
+        self.model = Yolo(CONFIG, logging.getLogger(__name__))
+
+    def test_output_shape(self):
+        outputs = self.model.predict(torch.rand(2, 3, 64, 64))
+        self.assertEqual(outputs.shape, (2, 4 * 4 * 30))
+
+    def test_layers(self):
+        layers = list(self.model.layers)
+        flatten = [i for i, l in enumerate(layers) if isinstance(l, nn.Flatten)]
+        self.assertEqual(len(flatten), 1)
+        fc1 = layers[flatten[0] + 1]
+        self.assertEqual(fc1.in_features, 16 * 8 * 8)
+        self.assertEqual(sum(isinstance(l, nn.Dropout) for l in layers), 1)
+
+    def test_backward(self):
+        self.model(torch.rand(1, 3, 64, 64)).sum().backward()
+        self.assertIsNotNone(self.model.layers[0].weight.grad)
+
+
+class TestExecutionModes(unittest.TestCase):
+    def setUp(self):
+        torch.manual_seed(0)
+        self.eager = Yolo(CONFIG, logging.getLogger(__name__))
+        self.images = torch.rand(2, 3, 64, 64)
+
+    def build(self, **options):
+        model = Yolo({**CONFIG, **options}, logging.getLogger(__name__))
+        model.load_state_dict(self.eager.state_dict())
+        return model
+
+    def assertSameAsEager(self, model):
+        model.eval()
+        self.eager.eval()
+        torch.testing.assert_close(
+            model.predict(self.images), self.eager.predict(self.images)
+        )
+        # Training forward, with the same dropout masks
+        for m in (model, self.eager):
+            m.train()
+            m.zero_grad()
+            torch.manual_seed(1)
+            m(self.images).square().sum().backward()
+        for p, q in zip(model.parameters(), self.eager.parameters()):
+            torch.testing.assert_close(p.grad, q.grad, rtol=1e-4, atol=1e-5)
+
+    def test_channels_last(self):
+        model = self.build(channels_last=True)
+        self.assertTrue(
+            model.layers[0].weight.is_contiguous(memory_format=torch.channels_last)
+        )
+        self.assertSameAsEager(model)
+
+    def test_fuse(self):
+        model = self.build(fuse=True)
+        self.assertIsInstance(model.layers[0], ConvAct)
+        self.assertIsInstance(model.layers[1], nn.Identity)
+        self.assertEqual(model.state_dict().keys(), self.eager.state_dict().keys())
+        self.assertSameAsEager(model)
+
+    def test_compile(self):
+        # The eager backend only traces, which keeps the test fast
+        model = self.build(compile="eager", channels_last=True, fuse=True)
+        self.assertEqual(model.state_dict().keys(), self.eager.state_dict().keys())
+        self.assertSameAsEager(model)
+
+
+class TestCheckpoint(unittest.TestCase):
+    def build(self, checkpoint: bool) -> Yolo:
+        config = copy.deepcopy(CONFIG)
+        config["layers"][2]["batch_norm"] = True
+        if checkpoint:
+            for layer in config["layers"][:3]:
+                layer["checkpoint"] = True
+            config["layers"][3]["checkpoint"] = "c3"
+        torch.manual_seed(0)
+        return Yolo(config, logging.getLogger(__name__))
+
+    def step(self, model: Yolo) -> torch.Tensor:
+        torch.manual_seed(1)
+        outputs = model(torch.rand(2, 3, 64, 64))
+        outputs.square().sum().backward()
+        return outputs
+
+    def test_segments(self):
+        model = self.build(checkpoint=True)
+        # c1, p1 and c2 with its norm form one segment, c3 another
+        self.assertEqual(model.segments, [(0, 6, True), (6, 8, True), (8, 14, False)])
+        self.assertFalse(self.build(checkpoint=False).checkpointed)
+
+    def test_same_as_without(self):
+        plain, checkpointed = self.build(False), self.build(True)
+        torch.testing.assert_close(self.step(checkpointed), self.step(plain))
+        for a, b in zip(checkpointed.parameters(), plain.parameters()):
+            torch.testing.assert_close(a.grad, b.grad)
+        # The recomputation does not update the norm statistics again
+        for a, b in zip(checkpointed.buffers(), plain.buffers()):
+            torch.testing.assert_close(a, b)
+
+    def test_fewer_saved_tensors(self):
+        saved = []
+        for model in (self.build(False), self.build(True)):
+            count = [0]
+
+            def pack(tensor):
+                count[0] += 1
+                return tensor
+
+            with torch.autograd.graph.saved_tensors_hooks(pack, lambda t: t):
+                model(torch.rand(2, 3, 64, 64))
+            saved.append(count[0])
+        self.assertLess(saved[1], saved[0])
+
+    def test_not_compiled(self):
+        config = copy.deepcopy(CONFIG)
+        config["layers"][0]["checkpoint"] = True
+        with self.assertRaises(ValueError):
+            Yolo(dict(config, compile=True), logging.getLogger(__name__))
+
+
+class TestFreeze(unittest.TestCase):
+    def setUp(self):
+        self.model = trained_model(batch_norm_config(reshape=True))
+        self.images = torch.rand(3, 3, 64, 64)
+
+    def test_batch_norm_layers(self):
+        layers = list(self.model.layers)
+        norm = [i for i, l in enumerate(layers) if isinstance(l, nn.BatchNorm2d)]
+        self.assertEqual(len(norm), 1)
+        self.assertIsNone(layers[norm[0] - 1].bias)
+        self.assertIsInstance(layers[-1], Reshape)
+        self.assertEqual(self.model.predict(self.images).shape, (3, 4, 4, 30))
+
+    def test_inference_layers(self):
+        layers = self.model.inference_layers()
+        for kind in (nn.BatchNorm2d, nn.Identity, nn.Dropout):
+            self.assertFalse(any(isinstance(l, kind) for l in layers))
+        self.assertFalse(any(p.requires_grad for p in layers.parameters()))
+        torch.testing.assert_close(layers(self.images), self.model.predict(self.images))
+
+    def test_freeze_round_trip(self):
+        with warnings.catch_warnings():
+            # TorchScript is deprecated in favour of torch.export
+            warnings.simplefilter("ignore", FutureWarning)
+            frozen = self.model.freeze()
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "frozen.pt")
+                save_frozen(frozen, path)
+                loaded = load_frozen(path)
+        # Traced with a batch of one, run with three
+        torch.testing.assert_close(loaded(self.images), self.model.predict(self.images))
+
+
+if __name__ == "__main__":
+    unittest.main()
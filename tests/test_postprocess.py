@@ -0,0 +1,64 @@
+import unittest
+
+import torch
+
+from yolo.postprocess import decode_outputs, postprocess
+
+S, B, C = 7, 2, 20
+
+
+def make_outputs(batch_size: int) -> torch.Tensor:
+    return torch.zeros(batch_size, S, S, B * 5 + C)
+
+
+def set_box(outputs, n, i, j, b, box, conf, cls):
+    outputs[n, i, j, b * 5 : b * 5 + 5] = torch.tensor([*box, conf])
+    outputs[n, i, j, B * 5 + cls] = 1.0
+
+
+class TestPostprocess(unittest.TestCase):
+    def test_decode_geometry(self):
+        outputs = make_outputs(1)
+        set_box(outputs, 0, 2, 3, 0, (0.5, 0.5, 0.25, 0.5), 0.8, 4)
+        boxes, scores, classes = decode_outputs(outputs)
+
+        index = (2 * S + 3) * B
+        # cell (2, 3) is 64 pixels wide, its center is at (160, 224)
+        torch.testing.assert_close(
+            boxes[0, index], torch.tensor([104.0, 112.0, 216.0, 336.0])
+        )
+        self.assertAlmostEqual(scores[0, index].item(), 0.8)
+        self.assertEqual(classes[0, index].item(), 4)
+
+    def test_suppresses_same_class_only(self):
+        outputs = make_outputs(1)
+        set_box(outputs, 0, 3, 3, 0, (0.5, 0.5, 0.3, 0.3), 0.9, 1)
+        set_box(outputs, 0, 3, 3, 1, (0.55, 0.5, 0.3, 0.3), 0.7, 1)
+        set_box(outputs, 0, 3, 4, 0, (0.5, 0.0, 0.3, 0.3), 0.8, 2)
+        detections = postprocess(outputs.flatten(1))[0]
+
+        self.assertEqual(len(detections), 2)
+        self.assertEqual(detections.labels.tolist(), [1, 2])
+        torch.testing.assert_close(detections.conf, torch.tensor([0.9, 0.8]))
+
+    def test_per_image_results(self):
+        outputs = make_outputs(3)
+        set_box(outputs, 0, 0, 0, 0, (0.5, 0.5, 0.1, 0.1), 0.9, 0)
+        set_box(outputs, 2, 0, 0, 0, (0.5, 0.5, 0.1, 0.1), 0.9, 0)
+        set_box(outputs, 2, 6, 6, 0, (0.5, 0.5, 0.1, 0.1), 0.3, 0)
+        detections = postprocess(outputs.flatten(1), conf_threshold=0.5)
+
+        self.assertEqual([len(d) for d in detections], [1, 0, 1])
+
+    def test_top_k(self):
+        outputs = make_outputs(2)
+        for i in range(S):
+            set_box(outputs, 1, i, i, 0, (0.5, 0.5, 0.1, 0.1), 0.5 + i / 20, 0)
+        detections = postprocess(outputs.flatten(1), top_k=3)
+
+        self.assertEqual(len(detections[1]), 3)
+        self.assertTrue(torch.all(detections[1].conf[:-1] >= detections[1].conf[1:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
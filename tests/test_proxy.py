@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from yolo.annotations import AnnotationIndex
+from yolo.base import BoxArray
+from yolo.proxy import (
+    ProxyEvaluator,
+    mean_average_precision,
+    open_proxy_subset,
+    stratified_subset,
+)
+from yolo.targets import encode_targets
+
+
+def make_index(labels_per_image, class_names=("a", "b", "c")):
+    counts = [len(labels) for labels in labels_per_image]
+    labels = np.concatenate([np.asarray(l, dtype=np.int64) for l in labels_per_image])
+    return AnnotationIndex(
+        image_ids=[str(n) for n in range(len(counts))],
+        sizes=[(448, 448)] * len(counts),
+        offsets=np.concatenate([[0], np.cumsum(counts)]),
+        boxes=np.tile([10.0, 10.0, 50.0, 50.0], (len(labels), 1)),
+        labels=labels,
+        difficult=np.zeros(len(labels), dtype=bool),
+        class_names=class_names,
+        key="test",
+    )
+
+
+class PerfectModel(nn.Module):
+    """Returns the encoded ground truth of the image whose index is stored
+    in its pixels"""
+
+    def __init__(self, boxes):
+        super().__init__()
+        xyxy = torch.cat([torch.as_tensor(b.xyxy()) for b in boxes]).float()
+        labels = torch.cat([torch.as_tensor(b.labels) for b in boxes])
+        image_idx = torch.repeat_interleave(torch.tensor([len(b) for b in boxes]))
+        self.targets, _ = encode_targets(xyxy, labels, image_idx, len(boxes))
+
+    def predict(self, x):
+        index = (x[:, 0, 0, 0] * 255).round().long()
+        return self.targets[index].flatten(1)
+
+
+class TestStratifiedSubset(unittest.TestCase):
+    def setUp(self):
+        # class 2 is rare, class 0 is everywhere
+        self.index = make_index([[0]] * 20 + [[0, 1]] * 10 + [[0, 2]] * 2)
+
+    def test_covers_every_class(self):
+        subset = stratified_subset(self.index, per_class=3, seed=0)
+        labels = [set(self.index[int(n)].labels.tolist()) for n in subset]
+        self.assertEqual(sum(2 in l for l in labels), 2)
+        self.assertGreaterEqual(sum(1 in l for l in labels), 3)
+        self.assertGreaterEqual(sum(0 in l for l in labels), 3)
+        self.assertLess(len(subset), 10)
+        self.assertEqual(subset.tolist(), sorted(subset.tolist()))
+
+    def test_deterministic(self):
+        a = stratified_subset(self.index, per_class=5, seed=1)
+        np.testing.assert_array_equal(a, stratified_subset(self.index, 5, seed=1))
+
+    def test_persisted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "subset.json")
+            first = open_proxy_subset(self.index, path, per_class=3)
+            with mock.patch(
+                "yolo.proxy.stratified_subset", return_value=np.arange(2)
+            ) as pick:
+                again = open_proxy_subset(self.index, path, per_class=3)
+                pick.assert_not_called()
+                open_proxy_subset(self.index, path, per_class=4)
+                pick.assert_called_once()
+            np.testing.assert_array_equal(first, again)
+
+
+class TestMeanAveragePrecision(unittest.TestCase):
+    def test_values(self):
+        # one class with 2 positives: a hit, a false positive, then a hit
+        mean_ap, ap = mean_average_precision(
+            np.array([0, 0, 1]),
+            np.array([0, 0, 0]),
+            np.array([0.9, 0.8, 0.7]),
+            np.array([True, False, True]),
+            np.array([[1, 0], [1, 0]]),
+        )
+        self.assertAlmostEqual(ap[0], 0.5 + 0.5 * 2 / 3)
+        self.assertTrue(np.isnan(ap[1]))
+        self.assertAlmostEqual(mean_ap, ap[0])
+
+    def test_weights(self):
+        args = (
+            np.array([0, 1]),
+            np.array([0, 0]),
+            np.array([0.9, 0.8]),
+            np.array([False, True]),
+            np.array([[0], [1]]),
+        )
+        # without the first image only the hit is left
+        self.assertAlmostEqual(mean_average_precision(*args, np.array([0, 2]))[0], 1.0)
+        self.assertAlmostEqual(mean_average_precision(*args)[0], 0.5)
+
+
+class TestProxyEvaluator(unittest.TestCase):
+    def test_perfect_model(self):
+        boxes = [
+            BoxArray(
+                np.array([[10, 10, 100, 120], [300, 300, 400, 420]], dtype=np.float32),
+                "xyxy",
+                labels=np.array([3, 7]),
+            ),
+            BoxArray(
+                np.array([[50, 200, 150, 260]], dtype=np.float32),
+                "xyxy",
+                labels=np.array([3]),
+            ),
+        ]
+        images = torch.stack(
+            [torch.full((3, 448, 448), n, dtype=torch.uint8) for n in range(2)]
+        )
+        evaluator = ProxyEvaluator(
+            images, boxes, [np.zeros(2, bool), np.zeros(1, bool)]
+        )
+        result = evaluator.evaluate(PerfectModel(boxes), bootstrap=20)
+        self.assertAlmostEqual(result["map"], 1.0)
+        self.assertAlmostEqual(result["ci_low"], 1.0)
+        self.assertEqual(result["images"], 2)
+        self.assertTrue(np.isnan(result["ap"][0]))
@@ -0,0 +1,97 @@
+import contextlib
+import logging
+import os
+import tempfile
+import unittest
+import warnings
+
+import torch
+import torch.nn as nn
+import torch.ao.nn.intrinsic.quantized as nniq
+import torch.ao.nn.quantized as nnq
+import torch.ao.nn.quantized.dynamic as nnqd
+
+from tests.test_model import batch_norm_config, trained_model
+from yolo.model import Yolo
+from yolo.targets import YoloCollate
+from yolo.quantize import format_report, quantization_report, quantize_layers
+
+
+@contextlib.contextmanager
+def eager_quantization():
+    with warnings.catch_warnings():
+        # Eager mode quantization is deprecated in favour of torch.export
+        warnings.simplefilter("ignore", DeprecationWarning)
+        yield
+
+
+class TestQuantize(unittest.TestCase):
+    def setUp(self):
+        self.config = batch_norm_config()
+        self.model = trained_model(self.config)
+        self.calibration = [torch.rand(4, 3, 64, 64) for _ in range(4)]
+        self.images = torch.rand(3, 3, 64, 64)
+
+    def quantized(self) -> Yolo:
+        int8 = Yolo(self.config, logging.getLogger(__name__))
+        int8.load_state_dict(self.model.state_dict())
+        with eager_quantization():
+            return int8.quantize(self.calibration)
+
+    def test_layers(self):
+        layers = list(self.quantized().layers)
+        self.assertIsInstance(layers[0], nnq.Quantize)
+        # Every conv is fused with its batch norm and ReLU
+        self.assertEqual(sum(isinstance(l, nniq.ConvReLU2d) for l in layers), 3)
+        self.assertEqual(sum(isinstance(l, nnqd.Linear) for l in layers), 2)
+        for kind in (nn.BatchNorm2d, nn.Dropout, nn.Identity):
+            self.assertFalse(any(isinstance(l, kind) for l in layers))
+
+    def test_layers_are_copied(self):
+        with eager_quantization():
+            layers = quantize_layers(self.model.layers, self.calibration)
+        self.assertIsNot(layers, self.model.layers)
+        self.assertTrue(any(isinstance(l, nn.BatchNorm2d) for l in self.model.layers))
+
+    def test_close_to_float(self):
+        int8 = self.quantized()
+        expected = self.model.predict(self.images)
+        torch.testing.assert_close(
+            int8.predict(self.images), expected, atol=0.05, rtol=0
+        )
+
+    def test_load_weights(self):
+        int8 = self.quantized()
+        with tempfile.TemporaryDirectory() as tmp, eager_quantization():
+            path = os.path.join(tmp, "int8.pt")
+            int8.save_weights(path)
+            loaded = Yolo(self.config, logging.getLogger(__name__))
+            loaded.load_weights(path)
+            built = Yolo.from_weights(self.config, path, logging.getLogger(__name__))
+        for model in (loaded, built):
+            self.assertEqual(model.quantized, int8.quantized)
+            torch.testing.assert_close(
+                model.predict(self.images), int8.predict(self.images)
+            )
+
+    def test_report(self):
+        report = quantization_report(
+            self.model,
+            self.quantized(),
+            self.images,
+            collate=YoloCollate(grid_size=4, image_size=(64, 64)),
+            repeat=1,
+        )
+        self.assertLess(report["int8"]["size_mib"], report["fp32"]["size_mib"])
+        self.assertLess(report["max_output_diff"], 0.05)
+        self.assertGreaterEqual(report["detection_agreement"], 0)
+        self.assertIn("int8", format_report(report))
+
+    def test_rejects_fused_model(self):
+        config = dict(self.config, fuse=True)
+        with self.assertRaises(ValueError):
+            Yolo(config, logging.getLogger(__name__)).quantize(self.calibration)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+import torch
+
+from yolo.base import BoxArray, get_grid
+from yolo.utils import DEFAULT_PALETTE, render_overlays
+from yolo.utils.images import BOUNDING_BOX_COLOR, GRID_COLOR
+
+
+class TestRender(unittest.TestCase):
+    def setUp(self):
+        self.images = np.zeros((2, 64, 64, 3), dtype=np.uint8)
+        self.boxes = [
+            BoxArray(np.array([[9.0, 9.0, 30.0, 40.0]]), labels=np.array([3])),
+            BoxArray(np.array([[19.0, 4.0, 50.0, 20.0]])),
+        ]
+
+    def assertColor(self, pixels, color):
+        np.testing.assert_array_equal(pixels, np.broadcast_to(color, pixels.shape))
+
+    def test_draws_in_place(self):
+        out = render_overlays(self.images, self.boxes, thickness=1)
+        self.assertIs(out, self.images)
+        self.assertColor(out[0, 10, 10:31], DEFAULT_PALETTE[3])
+        self.assertColor(out[0, 10:41, 30], DEFAULT_PALETTE[3])
+        self.assertColor(out[1, 20, 20:51], BOUNDING_BOX_COLOR)
+        # Inside of the boxes stays untouched
+        self.assertEqual(out[0, 20, 20].sum(), 0)
+        self.assertEqual(out[1, 10, 30].sum(), 0)
+
+    def test_out_buffer(self):
+        out = np.empty_like(self.images)
+        result = render_overlays(self.images, self.boxes, out=out)
+        self.assertIs(result, out)
+        self.assertEqual(self.images.sum(), 0)
+        self.assertGreater(out.sum(), 0)
+
+    def test_grid(self):
+        grid = get_grid((64, 64), (4, 4))
+        out = render_overlays(self.images, grid=grid)
+        for edge in grid.x_edges[:-1]:
+            self.assertColor(out[:, :, edge], GRID_COLOR)
+        for edge in grid.y_edges[:-1]:
+            self.assertColor(out[:, edge], GRID_COLOR)
+        self.assertEqual(out[:, 1, 1].sum(), 0)
+
+    def test_float_tensor(self):
+        images = torch.ones(2, 3, 64, 64)
+        out = render_overlays(images, self.boxes)
+        self.assertEqual(out.shape, (2, 64, 64, 3))
+        self.assertEqual(out.dtype, np.uint8)
+        self.assertEqual(out[0, 30, 20].tolist(), [255, 255, 255])
+
+    def test_float_out_of_range(self):
+        images = torch.full((1, 3, 64, 64), 0.5)
+        images[..., 0] = 1.5
+        images[..., 1] = -0.5
+        out = render_overlays(images)
+        self.assertEqual(out[0, 0, :3, 0].tolist(), [255, 0, 127])
+        out = render_overlays(images.permute(0, 2, 3, 1).numpy())
+        self.assertEqual(out[0, 0, :3, 0].tolist(), [255, 0, 127])
+
+    def test_boxes_off_image(self):
+        boxes = [BoxArray(np.array([[-30.0, 10.0, -5.0, 20.0], [70.0, 5, 90, 9]]))]
+        out = render_overlays(self.images[:1], boxes)
+        self.assertEqual(out.sum(), 0)
+
+    def test_matches_thickness(self):
+        thin = render_overlays(self.images.copy(), self.boxes, thickness=1)
+        thick = render_overlays(self.images.copy(), self.boxes, thickness=3)
+        self.assertGreater((thick.sum(-1) > 0).sum(), (thin.sum(-1) > 0).sum())
+        self.assertColor(thick[0, 12, 12:29], DEFAULT_PALETTE[3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+from PIL import Image
+from torch.utils.data import DataLoader
+from torchvision.transforms import v2
+
+from yolo.data import collate_fn
+from yolo.shards import TarShardDataset, convert_voc
+
+ANNOTATION = """<annotation>
+    <filename>{name}.jpg</filename>
+    <size><width>64</width><height>48</height><depth>3</depth></size>
+    <object>
+        <name>cat</name>
+        <bndbox><xmin>{n}</xmin><ymin>2</ymin><xmax>30</xmax><ymax>40</ymax></bndbox>
+    </object>
+</annotation>
+"""
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = os.path.join(self.tmp.name, "VOC2012")
+        for sub in ("JPEGImages", "Annotations", os.path.join("ImageSets", "Main")):
+            os.makedirs(os.path.join(root, sub))
+        self.ids = [f"2012_{n:06d}" for n in range(10)]
+        for n, image_id in enumerate(self.ids):
+            pixels = np.full((48, 64, 3), n * 20, dtype=np.uint8)
+            Image.fromarray(pixels).save(
+                os.path.join(root, "JPEGImages", image_id + ".jpg")
+            )
+            with open(os.path.join(root, "Annotations", image_id + ".xml"), "w") as f:
+                f.write(ANNOTATION.format(name=image_id, n=n))
+        with open(os.path.join(root, "ImageSets", "Main", "train.txt"), "w") as f:
+            f.write("\n".join(self.ids) + "\n")
+
+        self.shards_dir = os.path.join(self.tmp.name, "shards")
+        self.shards = convert_voc(
+            root, self.shards_dir, "train", samples_per_shard=3, num_workers=0
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def image_ids(self, dataset):
+        return [target.image_id for _, target in dataset]
+
+    def test_convert(self):
+        self.assertEqual(len(self.shards), 4)
+        dataset = TarShardDataset(self.shards_dir, (32, 32), shuffle_buffer=0)
+        self.assertEqual(len(dataset), 10)
+
+    def test_samples(self):
+        dataset = TarShardDataset(self.shards_dir, (32, 24), shuffle_buffer=0)
+        samples = list(dataset)
+        self.assertEqual(sorted(t.image_id for _, t in samples), self.ids)
+        for image, target in samples:
+            n = self.ids.index(target.image_id)
+            self.assertEqual(image.size, (32, 24))
+            self.assertLessEqual(abs(int(np.asarray(image)[5, 5, 0]) - n * 20), 2)
+            self.assertEqual(target.labels.tolist(), [7])
+            np.testing.assert_allclose(target.boxes, [[n, 2, 30, 40]])
+            self.assertEqual(target.size, (64, 48))
+
+    def test_shuffle(self):
+        dataset = TarShardDataset(self.shards_dir, (8, 8), shuffle_buffer=4)
+        first = self.image_ids(dataset)
+        self.assertEqual(sorted(first), self.ids)
+        self.assertEqual(first, self.image_ids(dataset))
+        dataset.set_epoch(1)
+        second = self.image_ids(dataset)
+        self.assertEqual(sorted(second), self.ids)
+        self.assertNotEqual(first, second)
+
+    def test_workers(self):
+        transform = v2.ToImage()
+        for shards_per_worker in (True, False):
+            dataset = TarShardDataset(self.shards_dir, (8, 8), transform)
+            if not shards_per_worker:
+                dataset.shards = dataset.shards[:1]
+            loader = DataLoader(
+                dataset, batch_size=2, num_workers=2, collate_fn=collate_fn
+            )
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                ids = [t.image_id for _, targets in loader for t in targets]
+            expected = self.ids if shards_per_worker else self.ids[:3]
+            self.assertEqual(sorted(ids), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
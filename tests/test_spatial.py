@@ -0,0 +1,143 @@
+import unittest
+
+import numpy as np
+
+from yolo.base import BoxArray, GridIndex, RTreeIndex, match_boxes
+from yolo.base.spatial import IGNORED, _SpatialIndex
+
+
+def random_boxes(rng: np.random.Generator, count: int) -> BoxArray:
+    centers = rng.uniform(0, 500, size=(count, 2))
+    sizes = rng.uniform(2, 120, size=(count, 2))
+    return BoxArray(np.concatenate([centers, sizes], axis=1), "cxcywh")
+
+
+class TestSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.boxes = random_boxes(rng, 500)
+        self.xyxy = self.boxes.xyxy()
+        self.queries = rng.uniform(0, 500, size=(50, 2))
+        self.indices = [GridIndex((500, 375), (7, 7)), RTreeIndex(node_capacity=8)]
+        for index in self.indices:
+            index.insert(self.boxes[:250])
+            index.insert(self.boxes[250:])
+
+    def test_query(self):
+        for index in self.indices:
+            for x, y in self.queries:
+                region = (x, y, x + 40, y + 25)
+                expected = np.nonzero(
+                    (self.xyxy[:, 0] <= region[2])
+                    & (self.xyxy[:, 2] >= region[0])
+                    & (self.xyxy[:, 1] <= region[3])
+                    & (self.xyxy[:, 3] >= region[1])
+                )[0]
+                np.testing.assert_array_equal(index.query(region), expected)
+
+    def test_query_point(self):
+        rects = self.boxes.to_rects()
+        for index in self.indices:
+            for x, y in self.queries:
+                expected = [k for k, r in enumerate(rects) if r.contains(x, y)]
+                self.assertEqual(index.query_point(x, y).tolist(), expected)
+
+    def test_nearest_center(self):
+        centers = self.boxes.cxcywh()[:, :2]
+        for index in self.indices:
+            for x, y in self.queries:
+                expected = np.argmin(np.hypot(centers[:, 0] - x, centers[:, 1] - y))
+                self.assertEqual(index.nearest_center(x, y), expected)
+
+    def test_join(self):
+        regions = random_boxes(np.random.default_rng(1), 80).xyxy()
+        regions[0] = (-50, -50, -10, -10)
+        expected = set()
+        for q, region in enumerate(regions):
+            expected.update((q, k) for k in self.indices[1].query(region))
+        for index in self.indices:
+            q, k = index.join(regions)
+            self.assertEqual(len(q), len(expected))
+            self.assertEqual(set(zip(q.tolist(), k.tolist())), expected)
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            _SpatialIndex()
+
+    def test_empty(self):
+        for index in (GridIndex((448, 448), (7, 7)), RTreeIndex()):
+            self.assertEqual(len(index.query((0, 0, 448, 448))), 0)
+            self.assertEqual(index.nearest_center(10, 10), -1)
+            self.assertEqual(len(index.join(np.array([[0, 0, 448, 448]]))[0]), 0)
+
+    def test_cell_assignment(self):
+        index = self.indices[0]
+        i, j = index.assign()
+        centers = self.boxes.cxcywh()[:, :2]
+        # 500 // 7 = 71 pixels per column, the last one is 74 pixels wide
+        np.testing.assert_array_equal(i, np.minimum(centers[:, 0] // 71, 6))
+        members = index.cell_members(3, 2)
+        np.testing.assert_array_equal(members, np.nonzero((i == 3) & (j == 2))[0])
+
+
+class TestMatchBoxes(unittest.TestCase):
+    def test_match(self):
+        gt = BoxArray([[0, 0, 10, 10], [20, 20, 30, 30]], labels=[1, 2])
+        det = BoxArray(
+            [[1, 1, 10, 10], [0, 0, 9, 10], [20, 20, 30, 30], [50, 50, 60, 60]],
+            conf=[0.9, 0.95, 0.5, 0.7],
+            labels=[1, 1, 1, 1],
+        )
+        matches = match_boxes(det, gt)
+        # the second detection is more confident and takes the first box,
+        # the third has the wrong class
+        self.assertEqual(matches.tolist(), [-1, 0, -1, -1])
+
+    def test_difficult(self):
+        gt = BoxArray([[0, 0, 10, 10], [20, 20, 30, 30]], labels=[1, 1])
+        det = BoxArray(
+            [[0, 0, 10, 10], [1, 1, 10, 10], [20, 20, 30, 30], [21, 21, 30, 30]],
+            conf=[0.9, 0.8, 0.7, 0.6],
+            labels=[1, 1, 1, 1],
+        )
+        matches = match_boxes(det, gt, difficult=np.array([True, False]))
+        # Both detections of the difficult box are ignored, not only the
+        # first one, while the duplicate of the other box is a false positive
+        self.assertEqual(matches.tolist(), [IGNORED, IGNORED, 1, -1])
+
+    def test_greedy(self):
+        rng = np.random.default_rng(0)
+        gt = random_boxes(rng, 60)
+        gt.labels = rng.integers(3, size=60)
+        det = random_boxes(rng, 200)
+        det.conf = rng.uniform(size=200)
+        det.labels = rng.integers(3, size=200)
+        iou = det.iou(gt)
+        expected = np.full(200, -1)
+        taken = set()
+        for d in np.argsort(-det.conf, kind="stable"):
+            row = np.where(gt.labels == det.labels[d], iou[d], -1)
+            best = int(np.argmax(row))
+            if row[best] >= 0.3 and best not in taken:
+                expected[d] = best
+                taken.add(best)
+        self.assertGreater((expected >= 0).sum(), 0)
+        np.testing.assert_array_equal(match_boxes(det, gt, 0.3), expected)
+        difficult = rng.uniform(size=60) < 0.2
+        dense = match_boxes(det, gt, 0.3, difficult)
+        for index in (GridIndex((500, 500), (16, 16)), RTreeIndex(node_capacity=4)):
+            np.testing.assert_array_equal(
+                match_boxes(det, gt, 0.3, difficult, index), dense
+            )
+        with self.assertRaises(ValueError):
+            match_boxes(det, gt, index=index)
+
+    def test_empty(self):
+        det = BoxArray(np.zeros((0, 4)))
+        gt = BoxArray([[0, 0, 10, 10]])
+        self.assertEqual(len(match_boxes(det, gt)), 0)
+        self.assertEqual(match_boxes(gt, det).tolist(), [-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
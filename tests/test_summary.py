@@ -0,0 +1,131 @@
+import copy
+import logging
+import unittest
+
+import torch
+
+from tests.test_model import CONFIG
+from yolo.model import Yolo
+from yolo.summary import (
+    ConfigError,
+    checkpoint_cost,
+    format_summary,
+    infer_layers,
+    profile_modules,
+)
+
+
+class TestInferLayers(unittest.TestCase):
+    def config(self, **changes):
+        config = copy.deepcopy(CONFIG)
+        config["grid_size"] = 4
+        for index, layer in changes.items():
+            config["layers"][int(index[1:])].update(layer)
+        return config
+
+    def test_shapes_and_costs(self):
+        infos = infer_layers(self.config())
+        self.assertEqual(
+            [info.output_shape for info in infos],
+            [(8, 32, 32), (8, 16, 16), (16, 16, 16), (16, 8, 8), (32,), (480,)],
+        )
+        model = Yolo(self.config(), logging.getLogger(__name__))
+        self.assertEqual(
+            sum(info.params for info in infos),
+            sum(p.numel() for p in model.parameters()),
+        )
+        # 8 filters of 3x7x7 over a 32x32 output
+        self.assertEqual(infos[0].macs, 8 * 32 * 32 * 3 * 7 * 7)
+        self.assertEqual(infos[0].activation_bytes, 8 * 32 * 32 * 4)
+        self.assertIn("c1", format_summary(infos, batch_size=2))
+
+    def test_reshape(self):
+        config = self.config()
+        config["layers"].append({"type": "reshape", "name": "r", "shape": [4, 4, 30]})
+        self.assertEqual(infer_layers(config)[-1].output_shape, (4, 4, 30))
+        config["layers"][-1]["shape"] = [4, 4, 31]
+        with self.assertRaisesRegex(ConfigError, "layer 6 \\(r\\)"):
+            infer_layers(config)
+
+    def test_builder_agrees(self):
+        conv_after_reshape = self.config()
+        conv_after_reshape["layers"] += [
+            {"type": "reshape", "name": "r", "shape": [30, 4, 4]},
+            {
+                "type": "conv",
+                "name": "c4",
+                "kernel_size": 3,
+                "filters": 30,
+                "stride": 1,
+            },
+        ]
+        fc_after_reshape = self.config()
+        fc_after_reshape["layers"].insert(
+            5, {"type": "reshape", "name": "r", "shape": [2, 4, 4]}
+        )
+        images = torch.rand(2, 3, 64, 64)
+        for config, shape in (
+            (conv_after_reshape, (2, 30, 4, 4)),
+            (fc_after_reshape, (2, 480)),
+        ):
+            infos = infer_layers(config)
+            model = Yolo(config, logging.getLogger(__name__)).eval()
+            self.assertEqual(model.predict(images).shape, shape)
+            self.assertEqual(
+                sum(info.params for info in infos),
+                sum(p.numel() for p in model.parameters()),
+            )
+
+        conv_after_fc = self.config()
+        conv_after_fc["layers"].append(conv_after_reshape["layers"][-1])
+        with self.assertRaisesRegex(ConfigError, "conv needs a \\(C, H, W\\) input"):
+            infer_layers(conv_after_fc)
+        with self.assertRaises(ValueError):
+            Yolo(conv_after_fc, logging.getLogger(__name__))
+
+    def test_errors(self):
+        bad = [
+            self.config(l1={"kernel_size": 64}),
+            self.config(l5={"filters": 100}),
+            self.config(l1={"type": "avgpool"}),
+            self.config(l0={"activation": "gelu"}),
+            self.config(l4={"kernel_size": None, "filters": 0}),
+            self.config(l0={"checkpoint": [1]}),
+            dict(self.config(l0={"checkpoint": True}), compile=True),
+        ]
+        for config in bad:
+            with self.assertRaises(ConfigError):
+                infer_layers(config)
+
+    def test_checkpoint_cost(self):
+        infos = infer_layers(
+            self.config(l0={"checkpoint": True}, l1={"checkpoint": True})
+        )
+        cost = checkpoint_cost(infos)
+        self.assertEqual(cost["segments"], 1)
+        # The conv output is dropped, the pool output is kept
+        kept = sum(info.activation_bytes for info in infos)
+        self.assertEqual(cost["kept_bytes"], kept)
+        self.assertEqual(cost["checkpointed_bytes"], kept - infos[0].activation_bytes)
+        # Both outputs exist again while the segment is rebuilt, once the
+        # later outputs are freed
+        self.assertEqual(
+            cost["peak_bytes"], infos[0].activation_bytes + infos[1].activation_bytes
+        )
+        self.assertEqual(cost["recomputed_macs"], infos[0].macs)
+        self.assertIn("checkpointing 1 segments", format_summary(infos))
+
+        # Distinct values split adjacent layers into segments
+        infos = infer_layers(self.config(l0={"checkpoint": 1}, l1={"checkpoint": 2}))
+        self.assertEqual(checkpoint_cost(infos)["segments"], 2)
+        self.assertNotIn("checkpointing", format_summary(infer_layers(self.config())))
+
+
+class TestProfile(unittest.TestCase):
+    def test_every_module_timed(self):
+        model = Yolo(CONFIG, logging.getLogger(__name__))
+        profile = profile_modules(model, torch.rand(2, 3, 64, 64), repeat=1)
+        self.assertEqual(len(profile), len(model.layers))
+        self.assertEqual(profile[0]["module"], "Conv2d")
+        self.assertTrue(all(p["forward_ms"] > 0 for p in profile))
+        self.assertGreater(profile[0]["backward_ms"], 0)
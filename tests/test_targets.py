@@ -0,0 +1,87 @@
+import unittest
+import os
+import json
+
+import torch
+
+from yolo.loss import YoloLoss
+from yolo.postprocess import decode_outputs
+from yolo.targets import YoloCollate, encode_targets
+
+
+class TestEncodeTargets(unittest.TestCase):
+    def setUp(self):
+        self.boxes = torch.tensor(
+            [[10.0, 20.0, 110.0, 220.0], [300.0, 300.0, 340.0, 320.0]]
+        )
+        self.labels = torch.tensor([3, 19])
+        self.image_idx = torch.tensor([0, 1])
+
+    def test_round_trip(self):
+        targets, mask = encode_targets(self.boxes, self.labels, self.image_idx, 2)
+
+        self.assertEqual(targets.shape, (2, 7, 7, 30))
+        self.assertEqual(mask.sum().item(), 2)
+        # the first box is centered at (60, 120), in cell (0, 1)
+        self.assertTrue(mask[0, 0, 1])
+
+        boxes, scores, classes = decode_outputs(targets.flatten(1))
+        for n in range(2):
+            best = scores[n].argmax()
+            torch.testing.assert_close(boxes[n, best], self.boxes[n])
+            self.assertEqual(classes[n, best], self.labels[n])
+
+    def test_round_trip_uneven_grid(self):
+        # 450 / 7 is not a whole number of pixels, the box sits in the last
+        # column where integer cells and decoded cells drift apart
+        size = (450, 450)
+        boxes = torch.tensor([[400.0, 10.0, 440.0, 50.0]])
+        targets, mask = encode_targets(
+            boxes, torch.tensor([0]), torch.tensor([0]), 1, image_size=size
+        )
+        self.assertTrue(mask[0, 6, 0])
+        decoded, scores, _ = decode_outputs(targets.flatten(1), image_size=size)
+        torch.testing.assert_close(decoded[0, scores[0].argmax()], boxes[0])
+
+    def test_largest_box_wins_cell(self):
+        boxes = torch.tensor([[0.0, 0.0, 60.0, 60.0], [20.0, 20.0, 40.0, 40.0]])
+        targets, mask = encode_targets(
+            boxes, torch.tensor([1, 2]), torch.tensor([0, 0]), 1
+        )
+        self.assertEqual(mask.sum().item(), 1)
+        self.assertEqual(targets[0, 0, 0, 10:].argmax().item(), 1)
+
+
+class TestYoloCollate(unittest.TestCase):
+    def test_collate(self):
+        path = os.path.join("tests", "data", "single-bbox.json")
+        with open(path) as file:
+            target = json.load(file)
+        batch = [(torch.zeros(3, 448, 448), target)] * 3
+
+        features, targets, mask = YoloCollate()(batch)
+
+        self.assertEqual(features.shape, (3, 3, 448, 448))
+        self.assertEqual(targets.shape, (3, 7, 7, 30))
+        self.assertEqual(mask.sum().item(), 3)
+
+
+class TestYoloLoss(unittest.TestCase):
+    def test_loss_prefers_targets(self):
+        targets, mask = encode_targets(
+            torch.tensor([[10.0, 20.0, 110.0, 220.0]]),
+            torch.tensor([3]),
+            torch.tensor([0]),
+            1,
+        )
+        criterion = YoloLoss()
+        outputs = torch.rand(1, 7 * 7 * 30, requires_grad=True)
+        loss = criterion(outputs, targets, mask)
+        loss.backward()
+
+        self.assertIsNotNone(outputs.grad)
+        self.assertLess(criterion(targets.flatten(1), targets, mask), loss)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,7 +5,7 @@ import PIL.Image as Image
 
 import yolo.utils
 from yolo.base.rect import Rectangle
-from yolo.base.gridcell import GridCell
+from yolo.base import BoxArray
 
 
 class TestUtils(unittest.TestCase):
@@ -44,13 +44,34 @@ class TestUtils(unittest.TestCase):
         # Check if the grid cells are of the correct size
         assert grids.shape == grid_size
 
-        grid: GridCell
-        count = 0
         # Check that we didn't lose any pixels
-        for grid in grids.flatten():
-            count += grid.width * grid.height
+        count = (grids.sizes[..., 0] * grids.sizes[..., 1]).sum()
         assert count == image_size[0] * image_size[1]
 
+        # Check that the last row and column absorb the remainder
+        assert grids.cell(6, 7).width == 450 // 7 + 450 % 7
+        assert grids.cell(6, 7).height == 513 // 8 + 513 % 8
+
+    def test_grid_is_memoized(self):
+        grid = yolo.utils.generate_grid_cells((448, 448), (7, 7))
+        assert yolo.utils.generate_grid_cells((448, 448), (7, 7)) is grid
+
+    def test_grid_cell_of(self):
+        grid = yolo.utils.generate_grid_cells((450, 513), (7, 8))
+        i, j = grid.cell_of(
+            np.array([0, 63.9, 64, 449, 500]), np.array([0, 0, 64, 512, -5])
+        )
+        assert i.tolist() == [0, 0, 1, 6, 6]
+        assert j.tolist() == [0, 0, 1, 7, 0]
+
+    def test_grid_assign(self):
+        grid = yolo.utils.generate_grid_cells((448, 448), (7, 7))
+        boxes = BoxArray.from_rects([self.bbox1, self.bbox2, self.bbox3, self.bbox4])
+        slots = grid.assign(boxes, max_slots=2)
+        assert slots.counts.sum() == 4
+        assert slots.counts[2, 2] == 1
+        assert slots.cell_boxes(2, 2).to_rects()[0].center == self.bbox1.center
+
     def test_draw_grid_on_image(self):
         input_image = os.path.join(os.path.dirname(__file__), "../images/example.jpg")
         with open(input_image, "rb") as f:
@@ -59,9 +80,11 @@ class TestUtils(unittest.TestCase):
         grids = yolo.utils.generate_grid_cells(
             (image_buf.shape[1], image_buf.shape[0]), (7, 7)
         )
+        boxes = BoxArray.from_rects([self.bbox1, self.bbox2, self.bbox3, self.bbox4])
         image_buf = yolo.utils.draw_grid_on_image(
             image_buf,
             grids,
+            grids.assign(boxes),
         )
         image = Image.fromarray(image_buf, "RGB")
         image.save("images/test2.png")
@@ -0,0 +1,125 @@
+import copy
+import logging
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import torch
+
+from tests.test_model import CONFIG
+from yolo.model import Yolo
+from yolo.weights import (
+    WeightsError,
+    file_sha256,
+    load_state_dict,
+    save_state_dict,
+    verify_weights,
+)
+
+try:
+    import safetensors
+except ImportError:
+    safetensors = None
+
+
+class TestWeights(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.config = copy.deepcopy(CONFIG)
+        self.config["layers"][2]["batch_norm"] = True
+        torch.manual_seed(0)
+        self.model = Yolo(self.config, logging.getLogger(__name__)).eval()
+        self.images = torch.rand(2, 3, 64, 64)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def test_save_with_hash(self):
+        path = self.path("yolo.pt")
+        self.model.save_weights(path)
+        self.assertEqual(sorted(os.listdir(self.dir)), ["yolo.pt", "yolo.pt.sha256"])
+        with open(path + ".sha256") as file:
+            self.assertEqual(file.read(), f"{file_sha256(path)}  yolo.pt\n")
+        self.assertTrue(verify_weights(path))
+
+    def test_failed_save_keeps_file(self):
+        path = self.path("yolo.pt")
+        self.model.save_weights(path)
+        with open(path, "rb") as file:
+            saved = file.read()
+
+        def partial_save(state_dict, file):
+            with open(file, "wb") as f:
+                f.write(b"partial")
+            raise OSError("disk full")
+
+        with patch("torch.save", side_effect=partial_save):
+            with self.assertRaises(OSError):
+                save_state_dict(self.model.state_dict(), path)
+        with open(path, "rb") as file:
+            self.assertEqual(file.read(), saved)
+        self.assertTrue(verify_weights(path))
+        self.assertEqual(sorted(os.listdir(self.dir)), ["yolo.pt", "yolo.pt.sha256"])
+
+    def test_verify(self):
+        path = self.path("yolo.pt")
+        torch.save(self.model.state_dict(), path)
+        self.assertFalse(verify_weights(path))
+        with self.assertRaises(WeightsError):
+            load_state_dict(path, verify=True)
+
+        save_state_dict(self.model.state_dict(), path)
+        with open(path, "r+b") as file:
+            file.seek(-100, os.SEEK_END)
+            file.write(b"\0" * 10)
+        with self.assertRaises(WeightsError):
+            load_state_dict(path, verify=True)
+
+    def test_from_weights(self):
+        path = self.path("yolo.pt")
+        self.model.save_weights(path)
+        loaded = Yolo.from_weights(self.config, path, logging.getLogger(__name__))
+        self.assertFalse(any(p.is_meta for p in loaded.parameters()))
+        loaded.eval()
+        torch.testing.assert_close(
+            loaded.predict(self.images), self.model.predict(self.images)
+        )
+        # Still trainable
+        loaded.train()
+        loaded(self.images).sum().backward()
+        self.assertTrue(all(p.grad is not None for p in loaded.parameters()))
+
+    def test_channels_last(self):
+        path = self.path("yolo.pt")
+        self.model.save_weights(path)
+        config = dict(self.config, channels_last=True)
+        loaded = Yolo.from_weights(config, path, logging.getLogger(__name__))
+        weight = loaded.layers[0].weight
+        self.assertTrue(weight.is_contiguous(memory_format=torch.channels_last))
+
+    @unittest.skipIf(safetensors is None, "safetensors is not installed")
+    def test_safetensors(self):
+        path = self.path("yolo.safetensors")
+        # Channels last weights are saved in order
+        self.model.to(memory_format=torch.channels_last).save_weights(path)
+        self.assertTrue(verify_weights(path))
+        for loaded in (
+            Yolo(self.config, logging.getLogger(__name__)).load_weights(path),
+            Yolo.from_weights(self.config, path, logging.getLogger(__name__)),
+        ):
+            torch.testing.assert_close(
+                loaded.eval().predict(self.images), self.model.predict(self.images)
+            )
+
+    @unittest.skipIf(safetensors is None, "safetensors is not installed")
+    def test_safetensors_needs_tensors(self):
+        with self.assertRaises(ValueError):
+            save_state_dict({"format": "yolo-int8"}, self.path("yolo.safetensors"))
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,13 +4,10 @@ import sys
 from yolo.parser import get_parser
 from yolo.logger import get_root_logger, ROOT_LOGGER_NAME
 import yolo.functional as fn
+from yolo.summary import ConfigError
 
 
-def main():
-    parser = get_parser()
-    args = parser.parse_args()
-    logger = get_root_logger(ROOT_LOGGER_NAME, args.log_level, args.verbose)
-
+def run(args, logger):
     if args.prog == "train":
         logger.info("Training...")
         fn.train_model(args, logger)
@@ -19,10 +16,55 @@ def main():
         logger.info("Testing...")
         fn.test_model(args, logger)
 
+    elif args.prog == "predict":
+        fn.predict(args, logger)
+
+    elif args.prog == "bench":
+        logger.info("Benchmarking...")
+        if fn.bench(args, logger) != 0:
+            sys.exit(1)
+
+    elif args.prog == "summary":
+        if fn.summarize(args, logger) != 0:
+            sys.exit(1)
+
+    elif args.prog == "freeze":
+        logger.info("Freezing model...")
+        fn.freeze_model(args, logger)
+
+    elif args.prog == "export":
+        logger.info("Exporting model...")
+        fn.export_model(args, logger)
+
+    elif args.prog == "quantize":
+        logger.info("Quantizing model...")
+        fn.quantize_model(args, logger)
+
+    elif args.prog == "tune":
+        logger.info("Tuning dataloader...")
+        fn.tune_loader(args, logger)
+
+    elif args.prog == "shards":
+        logger.info("Converting dataset to shards...")
+        fn.make_shards(args, logger)
+
     else:
         logger.error(f"Unknown program: {args.prog}")
         sys.exit(1)
 
+
+def main():
+    parser = get_parser()
+    args = parser.parse_args()
+    logger = get_root_logger(ROOT_LOGGER_NAME, args.log_level, args.verbose)
+
+    try:
+        run(args, logger)
+    except ConfigError as error:
+        # Raised by the model config check, before any data is loaded
+        logger.error(f"Invalid model config: {error}")
+        sys.exit(1)
+
     logger.info("Yolo finished successfully.")
 
 
@@ -0,0 +1,342 @@
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, NamedTuple, Sequence
+
+import numpy as np
+from PIL import Image
+from torch.utils.data import Dataset
+
+from yolo.base import BoxArray
+from yolo.utils.convert import VOC_CLASSES
+from yolo.utils.io import files_key
+
+INDEX_VERSION = 1
+
+
+class AnnotationTarget(NamedTuple):
+    """Annotations of one image as views into an :class:`AnnotationIndex`"""
+
+    image_id: str
+    boxes: np.ndarray  # (K, 4) xyxy float32
+    labels: np.ndarray  # (K,) int64 class ids
+    difficult: np.ndarray  # (K,) bool
+    size: tuple[int, int]  # (width, height) of the image
+
+    def box_array(self) -> BoxArray:
+        """
+        :returns: the boxes with their class ids as labels
+        :rtype: :class:`BoxArray`
+        """
+        return BoxArray(self.boxes, "xyxy", labels=self.labels)
+
+
+def parse_annotation(
+    path: str, class_names: tuple[str, ...] = VOC_CLASSES
+) -> tuple[str, tuple[int, int], np.ndarray, np.ndarray, np.ndarray]:
+    """Parses a VOC XML file straight into arrays
+
+    :param path: path of the annotation file
+    :type path: str
+
+    :param class_names: class names, the index of a name is its class id
+    :type class_names: tuple[str, ...]
+
+    :returns: image id, (width, height), (K, 4) xyxy boxes, (K,) class ids
+              and (K,) difficult flags
+    :rtype: tuple
+    """
+    class_ids = {name: i for i, name in enumerate(class_names)}
+    root = ET.parse(path).getroot()
+    filename = root.findtext("filename") or os.path.basename(path)
+    size = root.find("size")
+    width, height = int(size.findtext("width")), int(size.findtext("height"))
+
+    boxes, labels, difficult = [], [], []
+    for obj in root.iter("object"):
+        bbox = obj.find("bndbox")
+        if bbox is None:
+            continue
+        name = obj.findtext("name")
+        if name not in class_ids:
+            raise ValueError(f"Unknown class {name!r} in {path}")
+        boxes.append(
+            [float(bbox.findtext(k)) for k in ("xmin", "ymin", "xmax", "ymax")]
+        )
+        labels.append(class_ids[name])
+        difficult.append(obj.findtext("difficult", "0").strip() == "1")
+
+    return (
+        os.path.splitext(filename)[0],
+        (width, height),
+        np.array(boxes, dtype=np.float32).reshape(-1, 4),
+        np.array(labels, dtype=np.int64),
+        np.array(difficult, dtype=bool),
+    )
+
+
+def _parse_chunk(args) -> list:
+    paths, class_names = args
+    return [parse_annotation(path, class_names) for path in paths]
+
+
+class AnnotationIndex:
+    """Columnar store of the annotations of a whole dataset
+
+    The boxes, class ids and difficult flags of all images are concatenated
+    into flat arrays; ``offsets[n]:offsets[n + 1]`` are the rows of image
+    ``n``. Looking up an image is two slices, without any parsing or
+    per-object allocation.
+    """
+
+    def __init__(
+        self,
+        image_ids: np.ndarray,
+        sizes: np.ndarray,
+        offsets: np.ndarray,
+        boxes: np.ndarray,
+        labels: np.ndarray,
+        difficult: np.ndarray,
+        class_names: tuple[str, ...] = VOC_CLASSES,
+        key: str = "",
+    ):
+        """Constructor for an index over existing columns
+
+        :param image_ids: (N,) image ids
+        :type image_ids: numpy.ndarray
+
+        :param sizes: (N, 2) width and height of every image
+        :type sizes: numpy.ndarray
+
+        :param offsets: (N + 1,) first box row of every image
+        :type offsets: numpy.ndarray
+
+        :param boxes: (K, 4) xyxy boxes of all images
+        :type boxes: numpy.ndarray
+
+        :param labels: (K,) class ids
+        :type labels: numpy.ndarray
+
+        :param difficult: (K,) difficult flags
+        :type difficult: numpy.ndarray
+
+        :param class_names: class names, the index of a name is its class id
+        :type class_names: tuple[str, ...]
+
+        :param key: hash of the source files, see :func:`files_key`
+        :type key: str
+
+        :returns: instance of the AnnotationIndex class
+        :rtype: :class:`AnnotationIndex`
+        """
+        self.image_ids = np.asarray(image_ids, dtype=str)
+        self.sizes = np.asarray(sizes, dtype=np.int64).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.labels = np.asarray(labels, dtype=np.int64)
+        self.difficult = np.asarray(difficult, dtype=bool)
+        self.class_names = tuple(class_names)
+        self.key = key
+        if len(self.offsets) != len(self.image_ids) + 1:
+            raise ValueError("There must be one offset per image plus one")
+
+    @staticmethod
+    def build(
+        annotation_paths: Sequence[str],
+        class_names: tuple[str, ...] = VOC_CLASSES,
+        num_workers: int = 8,
+    ) -> "AnnotationIndex":
+        """Parses all annotation files, in parallel processes
+
+        :param annotation_paths: paths of the VOC annotation files
+        :type annotation_paths: Sequence[str]
+
+        :param class_names: class names, the index of a name is its class id
+        :type class_names: tuple[str, ...]
+
+        :param num_workers: number of parsing processes, 0 parses in the
+                            calling process
+        :type num_workers: int
+
+        :returns: index over all files, in the given order
+        :rtype: :class:`AnnotationIndex`
+        """
+        paths = list(annotation_paths)
+        key = files_key(paths, {"version": INDEX_VERSION, "classes": class_names})
+        if num_workers > 0 and len(paths) > 1:
+            chunk = max(1, len(paths) // (num_workers * 4))
+            chunks = [
+                (paths[k : k + chunk], class_names) for k in range(0, len(paths), chunk)
+            ]
+            with ProcessPoolExecutor(num_workers) as pool:
+                parsed = [
+                    p for result in pool.map(_parse_chunk, chunks) for p in result
+                ]
+        else:
+            parsed = _parse_chunk((paths, class_names))
+
+        counts = [len(p[3]) for p in parsed]
+        return AnnotationIndex(
+            image_ids=[p[0] for p in parsed],
+            sizes=[p[1] for p in parsed],
+            offsets=np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]),
+            boxes=np.concatenate([p[2] for p in parsed] or [np.zeros((0, 4))]),
+            labels=np.concatenate([p[3] for p in parsed] or [np.zeros(0)]),
+            difficult=np.concatenate([p[4] for p in parsed] or [np.zeros(0)]),
+            class_names=class_names,
+            key=key,
+        )
+
+    def save(self, path: str):
+        """Saves the index to a ``.npz`` file, atomically
+
+        :param path: path of the file
+        :type path: str
+        """
+        tmp = path + ".tmp.npz"
+        np.savez(
+            tmp,
+            image_ids=self.image_ids,
+            sizes=self.sizes,
+            offsets=self.offsets,
+            boxes=self.boxes,
+            labels=self.labels,
+            difficult=self.difficult,
+            class_names=np.asarray(self.class_names, dtype=str),
+            key=np.asarray(self.key),
+        )
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path: str) -> "AnnotationIndex":
+        """
+        :param path: path of a file written by :meth:`save`
+        :type path: str
+
+        :returns: the loaded index
+        :rtype: :class:`AnnotationIndex`
+        """
+        with np.load(path) as data:
+            return AnnotationIndex(
+                data["image_ids"],
+                data["sizes"],
+                data["offsets"],
+                data["boxes"],
+                data["labels"],
+                data["difficult"],
+                tuple(data["class_names"].tolist()),
+                str(data["key"]),
+            )
+
+    def __len__(self) -> int:
+        return len(self.image_ids)
+
+    def __getitem__(self, index: int) -> AnnotationTarget:
+        lo, hi = self.offsets[index], self.offsets[index + 1]
+        width, height = self.sizes[index]
+        return AnnotationTarget(
+            str(self.image_ids[index]),
+            self.boxes[lo:hi],
+            self.labels[lo:hi],
+            self.difficult[lo:hi],
+            (int(width), int(height)),
+        )
+
+    def image_of_box(self) -> np.ndarray:
+        """
+        :returns: (K,) index of the image every box belongs to
+        :rtype: numpy.ndarray
+        """
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+
+def open_annotation_index(
+    annotation_paths: Sequence[str],
+    path: str,
+    class_names: tuple[str, ...] = VOC_CLASSES,
+    num_workers: int = 8,
+    logger=None,
+) -> AnnotationIndex:
+    """Loads the index saved at ``path``, building and saving it first if it
+    is missing or the annotation files changed
+
+    :param annotation_paths: paths of the VOC annotation files
+    :type annotation_paths: Sequence[str]
+
+    :param path: path of the ``.npz`` index file
+    :type path: str
+
+    :param class_names: class names, the index of a name is its class id
+    :type class_names: tuple[str, ...]
+
+    :param num_workers: number of parsing processes
+    :type num_workers: int
+
+    :param logger: logger to report rebuilds to
+    :type logger: :class:`logging.Logger`
+
+    :returns: index over all files, in the given order
+    :rtype: :class:`AnnotationIndex`
+    """
+    key = files_key(
+        annotation_paths, {"version": INDEX_VERSION, "classes": class_names}
+    )
+    if os.path.exists(path):
+        index = AnnotationIndex.load(path)
+        if index.key == key:
+            return index
+    if logger is not None:
+        logger.info(f"Indexing {len(annotation_paths)} annotations into {path}")
+    index = AnnotationIndex.build(annotation_paths, class_names, num_workers)
+    index.save(path)
+    return index
+
+
+class IndexedVOCDataset(Dataset):
+    """VOC images with their annotations taken from an
+    :class:`AnnotationIndex`, so loading a sample only decodes the image"""
+
+    def __init__(
+        self,
+        image_paths: Sequence[str],
+        annotations: AnnotationIndex,
+        transform: Callable = None,
+        loader: Callable = None,
+    ):
+        """Constructor for the dataset
+
+        :param image_paths: paths of the images, in index order
+        :type image_paths: Sequence[str]
+
+        :param annotations: annotations of the images
+        :type annotations: :class:`AnnotationIndex`
+
+        :param transform: applied to every loaded image
+        :type transform: Callable
+
+        :param loader: loads the image at a path, by default as a full size
+                       RGB PIL image. Pass a :class:`yolo.decode.DraftDecoder`
+                       to decode straight to the model input size.
+        :type loader: Callable
+
+        :returns: instance of the IndexedVOCDataset class
+        :rtype: :class:`IndexedVOCDataset`
+        """
+        if len(image_paths) != len(annotations):
+            raise ValueError("Every image needs exactly one annotation")
+        self.images = list(image_paths)
+        self.annotations = annotations
+        self.transform = transform
+        self.loader = loader
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+    def __getitem__(self, index: int) -> tuple:
+        if self.loader is None:
+            image = Image.open(self.images[index]).convert("RGB")
+        else:
+            image = self.loader(self.images[index])
+        if self.transform is not None:
+            image = self.transform(image)
+        return image, self.annotations[index]
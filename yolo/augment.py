@@ -0,0 +1,301 @@
+import math
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from yolo.base import BoxArray
+
+# Gray the uncovered parts of translated or shrunk images are filled with
+FILL = 114 / 255
+# Luma weights of the RGB channels, the axis saturation jitter moves along
+LUMA = (0.299, 0.587, 0.114)
+# Boxes keeping less than this fraction of their area inside the image are
+# dropped, as are boxes thinner than MIN_SIZE pixels
+MIN_VISIBILITY = 0.2
+MIN_SIZE = 2.0
+
+
+def _rand(n: int, low: float, high: float, generator=None) -> torch.Tensor:
+    return torch.rand(n, generator=generator, dtype=torch.float64) * (high - low) + low
+
+
+def _concat_boxes(boxes: list[BoxArray]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Concatenates the xyxy boxes and labels of all images with the index of
+    the image of every box"""
+    boxes = [b.numpy() for b in boxes]
+    xyxy = np.concatenate([b.xyxy() for b in boxes] + [np.zeros((0, 4))])
+    labels = np.concatenate(
+        [b.labels if b.labels is not None else np.full(len(b), -1) for b in boxes]
+        + [np.zeros(0, dtype=np.int64)]
+    ).astype(np.int64)
+    image_idx = np.repeat(np.arange(len(boxes)), [len(b) for b in boxes])
+    return xyxy.astype(np.float32), labels, image_idx
+
+
+def _split_boxes(
+    xyxy: np.ndarray, labels: np.ndarray, image_idx: np.ndarray, n: int
+) -> list[BoxArray]:
+    order = np.argsort(image_idx, kind="stable")
+    counts = np.bincount(image_idx, minlength=n)
+    xyxy, labels = xyxy[order], labels[order]
+    return [
+        BoxArray(b, "xyxy", labels=l)
+        for b, l in zip(
+            np.split(xyxy, np.cumsum(counts)[:-1]),
+            np.split(labels, np.cumsum(counts)[:-1]),
+        )
+    ]
+
+
+def color_matrices(
+    hue: torch.Tensor, saturation: torch.Tensor, value: torch.Tensor
+) -> torch.Tensor:
+    """Builds one RGB color matrix per image that rotates the hue, scales
+    the saturation and scales the value.
+
+    The hue is rotated around the gray axis and the saturation moves every
+    color towards or away from its luma, which approximates HSV jitter with
+    a single linear map per image.
+
+    :param hue: (N,) hue rotations in fractions of a full turn
+    :type hue: torch.Tensor
+
+    :param saturation: (N,) saturation factors
+    :type saturation: torch.Tensor
+
+    :param value: (N,) value factors
+    :type value: torch.Tensor
+
+    :returns: (N, 3, 3) color matrices
+    :rtype: torch.Tensor
+    """
+    angle = hue * 2 * math.pi
+    cos, sin = torch.cos(angle).view(-1, 1, 1), torch.sin(angle).view(-1, 1, 1)
+    eye = torch.eye(3, dtype=hue.dtype)
+    ones = torch.full((3, 3), 1 / 3, dtype=hue.dtype)
+    cross = torch.tensor(
+        [[0, -1, 1], [1, 0, -1], [-1, 1, 0]], dtype=hue.dtype
+    ) / math.sqrt(3)
+    rotation = cos * eye + (1 - cos) * ones + sin * cross
+
+    luma = torch.tensor(LUMA, dtype=hue.dtype).expand(3, 3)
+    s = saturation.view(-1, 1, 1)
+    saturate = s * eye + (1 - s) * luma
+    return value.view(-1, 1, 1) * saturate @ rotation
+
+
+class BatchAugment:
+    """Augments whole batches of images and their boxes with tensor ops.
+
+    In order, every image may be replaced by a 2x2 mosaic of batch images,
+    is scaled, translated and flipped by a single affine resample, and gets
+    its colors jittered by a single color matrix. The boxes follow every
+    geometric step and are clipped to the image; boxes that end up mostly
+    outside are dropped.
+
+    Call it in the collate function to run in the DataLoader workers, or
+    on the batch in the main process, possibly on the GPU.
+    """
+
+    def __init__(
+        self,
+        scale: float = 0.2,
+        translate: float = 0.2,
+        flip: float = 0.5,
+        hue: float = 0.015,
+        saturation: float = 0.5,
+        value: float = 0.5,
+        mosaic: float = 0.0,
+        generator: torch.Generator = None,
+    ):
+        """Constructor for the augmentation
+
+        :param scale: images are scaled by a random factor in 1 +- scale
+        :type scale: float
+
+        :param translate: images are moved by up to this fraction of their
+                          size
+        :type translate: float
+
+        :param flip: probability of a horizontal flip
+        :type flip: float
+
+        :param hue: hue is rotated by up to this fraction of a turn
+        :type hue: float
+
+        :param saturation: saturation is scaled by a factor in 1 +- this
+        :type saturation: float
+
+        :param value: value is scaled by a factor in 1 +- this
+        :type value: float
+
+        :param mosaic: probability of replacing an image by a mosaic
+        :type mosaic: float
+
+        :param generator: random number generator, the global torch one by
+                          default, which DataLoader seeds per worker
+        :type generator: torch.Generator
+
+        :returns: instance of the BatchAugment class
+        :rtype: :class:`BatchAugment`
+        """
+        self.scale = scale
+        self.translate = translate
+        self.flip = flip
+        self.hue = hue
+        self.saturation = saturation
+        self.value = value
+        self.mosaic = mosaic
+        self.generator = generator
+
+    @staticmethod
+    def from_config(config) -> "BatchAugment":
+        """
+        :param config: the ``[augment]`` section of the configuration
+        :type config: dict
+
+        :returns: augmentation with the configured strengths
+        :rtype: :class:`BatchAugment`
+        """
+        keys = ("scale", "translate", "flip", "hue", "saturation", "value", "mosaic")
+        return BatchAugment(**{k: config[k] for k in keys if k in config})
+
+    def __call__(
+        self, images: torch.Tensor, boxes: list[BoxArray]
+    ) -> tuple[torch.Tensor, list[BoxArray]]:
+        """
+        :param images: (N, 3, H, W) uint8 images, or float images in [0, 1]
+        :type images: torch.Tensor
+
+        :param boxes: boxes of every image in pixels, with class ids as labels
+        :type boxes: list[:class:`BoxArray`]
+
+        :returns: augmented images of the input dtype and their boxes
+        :rtype: tuple (torch.Tensor, list[:class:`BoxArray`])
+        """
+        n = images.shape[0]
+        if n == 0:
+            return images, boxes
+        dtype = images.dtype
+        x = images.float()
+        if dtype == torch.uint8:
+            x /= 255
+        xyxy, labels, image_idx = _concat_boxes(boxes)
+
+        if self.mosaic > 0:
+            x, xyxy, labels, image_idx = self._mosaic(x, xyxy, labels, image_idx)
+        x, xyxy = self._affine(x, xyxy, image_idx)
+        x = self._color(x)
+
+        keep = self._visible(xyxy, x.shape[-1], x.shape[-2])
+        xyxy = np.clip(xyxy, 0, [x.shape[-1], x.shape[-2]] * 2).astype(np.float32)
+        boxes = _split_boxes(xyxy[keep], labels[keep], image_idx[keep], n)
+
+        if dtype == torch.uint8:
+            x = x.mul_(255).round_().to(torch.uint8)
+        else:
+            x = x.to(dtype)
+        return x, boxes
+
+    @staticmethod
+    def _visible(xyxy: np.ndarray, width: int, height: int) -> np.ndarray:
+        clipped = np.clip(xyxy, 0, [width, height] * 2)
+        area = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+        cw = clipped[:, 2] - clipped[:, 0]
+        ch = clipped[:, 3] - clipped[:, 1]
+        return (cw >= MIN_SIZE) & (ch >= MIN_SIZE) & (cw * ch >= MIN_VISIBILITY * area)
+
+    def _mosaic(self, x, xyxy, labels, image_idx):
+        """Replaces some images by 2x2 tiles of half size images: the image
+        itself in the top left and three random images of the batch"""
+        n, _, height, width = x.shape
+        chosen = torch.nonzero(
+            torch.rand(n, generator=self.generator) < self.mosaic
+        ).flatten()
+        m = len(chosen)
+        if m == 0:
+            return x, xyxy, labels, image_idx
+
+        others = torch.randint(0, n, (m, 3), generator=self.generator)
+        sources = torch.cat([chosen[:, None], others], 1)  # (M, 4)
+        h2, w2 = height // 2, width // 2
+        tiles = F.interpolate(
+            x[sources.flatten()], size=(h2, w2), mode="bilinear", antialias=True
+        ).view(m, 4, 3, h2, w2)
+        canvas = torch.full((m, 3, height, width), FILL, dtype=x.dtype, device=x.device)
+        offsets = ((0, 0), (0, w2), (h2, 0), (h2, w2))
+        for k, (top, left) in enumerate(offsets):
+            canvas[:, :, top : top + h2, left : left + w2] = tiles[:, k]
+        x = x.clone()
+        x[chosen] = canvas
+
+        # Boxes of the mosaic images are replaced by the scaled boxes of
+        # their four sources
+        is_mosaic = np.zeros(n, dtype=bool)
+        is_mosaic[chosen.numpy()] = True
+        kept = ~is_mosaic[image_idx]
+        new_xyxy, new_labels, new_idx = [xyxy[kept]], [labels[kept]], [image_idx[kept]]
+        sx, sy = w2 / width, h2 / height
+        for row, target in enumerate(chosen.tolist()):
+            for k, source in enumerate(sources[row].tolist()):
+                top, left = offsets[k]
+                rows = image_idx == source
+                b = xyxy[rows] * np.float32([sx, sy, sx, sy])
+                new_xyxy.append(b + np.float32([left, top, left, top]))
+                new_labels.append(labels[rows])
+                new_idx.append(np.full(rows.sum(), target))
+        return (
+            x,
+            np.concatenate(new_xyxy),
+            np.concatenate(new_labels),
+            np.concatenate(new_idx),
+        )
+
+    def _affine(self, x, xyxy, image_idx):
+        """Scales around the center, translates and flips every image with
+        one resample of the whole batch"""
+        n, _, height, width = x.shape
+        g = self.generator
+        s = _rand(n, 1 - self.scale, 1 + self.scale, g)
+        flip = torch.rand(n, generator=g, dtype=torch.float64) < self.flip
+        a = torch.where(flip, -s, s)
+        # Translation in normalized coordinates, where the image spans [-1, 1]
+        tx = _rand(n, -self.translate, self.translate, g) * 2
+        ty = _rand(n, -self.translate, self.translate, g) * 2
+
+        # The grid maps output to input coordinates, the inverse of
+        # u_out = a * u_in + t
+        theta = torch.zeros(n, 2, 3, dtype=torch.float64)
+        theta[:, 0, 0] = 1 / a
+        theta[:, 0, 2] = -tx / a
+        theta[:, 1, 1] = 1 / s
+        theta[:, 1, 2] = -ty / s
+        theta = theta.to(x.device, x.dtype)
+        grid = F.affine_grid(theta, list(x.shape), align_corners=False)
+        x = F.grid_sample(x - FILL, grid, "bilinear", "zeros", align_corners=False)
+        x += FILL
+
+        # Same map in pixels: p_out = a * (p_in - c) + c + t * size / 2
+        a_b, s_b = a.numpy()[image_idx], s.numpy()[image_idx]
+        tx_b = tx.numpy()[image_idx] * width / 2
+        ty_b = ty.numpy()[image_idx] * height / 2
+        cx, cy = width / 2, height / 2
+        x1 = a_b * (xyxy[:, 0] - cx) + cx + tx_b
+        x2 = a_b * (xyxy[:, 2] - cx) + cx + tx_b
+        y1 = s_b * (xyxy[:, 1] - cy) + cy + ty_b
+        y2 = s_b * (xyxy[:, 3] - cy) + cy + ty_b
+        xyxy = np.stack(
+            [np.minimum(x1, x2), y1, np.maximum(x1, x2), y2], axis=1
+        ).astype(np.float32)
+        return x, xyxy
+
+    def _color(self, x):
+        n = x.shape[0]
+        g = self.generator
+        matrices = color_matrices(
+            _rand(n, -self.hue, self.hue, g),
+            _rand(n, 1 - self.saturation, 1 + self.saturation, g),
+            _rand(n, 1 - self.value, 1 + self.value, g),
+        ).to(x.device, x.dtype)
+        return torch.einsum("nij,njhw->nihw", matrices, x).clamp_(0, 1)
@@ -0,0 +1,288 @@
+import json
+import os
+import socket
+import time
+from typing import Callable, NamedTuple, Optional
+
+import torch
+from torch.utils.data import DataLoader
+
+# Used when a loader is neither given explicit settings nor tuned
+FALLBACK_WORKERS = 4
+FALLBACK_PREFETCH = 2
+
+
+class LoaderSettings(NamedTuple):
+    """DataLoader settings chosen by :func:`autotune`"""
+
+    num_workers: int
+    prefetch_factor: int
+    persistent_workers: bool
+    # Intra-op threads of the main process. None for untuned settings, which
+    # leave the thread count of the process as it is.
+    torch_threads: Optional[int]
+
+    @staticmethod
+    def fallback(num_workers: int = FALLBACK_WORKERS) -> "LoaderSettings":
+        """
+        :param num_workers: number of worker processes
+        :type num_workers: int
+
+        :returns: untuned settings for the given number of workers, which
+                  leave the threads of the main process as they are
+        :rtype: :class:`LoaderSettings`
+        """
+        return LoaderSettings(num_workers, FALLBACK_PREFETCH, False, None)
+
+    def loader_kwargs(self, persistent: bool = True) -> dict:
+        """
+        :param persistent: allow persistent workers. Workers hold a copy of
+                           the dataset made when they start, so datasets
+                           changed between epochs, e.g. with ``set_epoch``,
+                           need new workers every epoch.
+        :type persistent: bool
+
+        :returns: keyword arguments for :class:`torch.utils.data.DataLoader`
+        :rtype: dict
+        """
+        if self.num_workers == 0:
+            return {"num_workers": 0}
+        return {
+            "num_workers": self.num_workers,
+            "prefetch_factor": self.prefetch_factor,
+            "persistent_workers": self.persistent_workers and persistent,
+        }
+
+    def apply(self):
+        """Sets the intra-op threads of the main process, if they were tuned"""
+        if self.torch_threads is not None:
+            torch.set_num_threads(self.torch_threads)
+
+
+def candidate_settings(cpu_count: int = None) -> list[LoaderSettings]:
+    """Settings worth trying on a host, from no workers to one per core
+
+    The main process gets the intra-op threads of the cores the workers
+    leave free.
+
+    :param cpu_count: number of cores, defaults to the cores of this host
+    :type cpu_count: int
+
+    :returns: candidate settings
+    :rtype: list[:class:`LoaderSettings`]
+    """
+    cpus = cpu_count or os.cpu_count() or 1
+    workers = sorted({0, 1, max(1, cpus // 4), max(1, cpus // 2), max(1, cpus - 1)})
+    candidates = [LoaderSettings(0, 2, False, cpus)]
+    for n in workers[1:]:
+        for prefetch in (2, 4):
+            candidates.append(LoaderSettings(n, prefetch, True, max(1, cpus - n)))
+    return candidates
+
+
+def measure(
+    make_loader: Callable[[LoaderSettings], DataLoader],
+    settings: LoaderSettings,
+    num_batches: int = 20,
+    warmup: int = 2,
+    step: Callable = None,
+) -> dict:
+    """Measures how fast a loader delivers batches
+
+    :param make_loader: builds the loader for some settings
+    :type make_loader: Callable
+
+    :param settings: settings to measure
+    :type settings: :class:`LoaderSettings`
+
+    :param num_batches: number of timed batches
+    :type num_batches: int
+
+    :param warmup: number of batches loaded before timing, which covers
+                   the worker start up
+    :type warmup: int
+
+    :param step: called with every batch, like the training step would
+    :type step: Callable
+
+    :returns: batches per second, and the mean and total time the main
+              process spent waiting for a batch, in milliseconds
+    :rtype: dict
+    """
+    settings.apply()
+    loader = make_loader(settings)
+    batches = iter(loader)
+    stall = 0.0
+    timed = 0
+    start = None
+    try:
+        for n in range(warmup + num_batches):
+            if n == warmup:
+                start = time.perf_counter()
+            before = time.perf_counter()
+            try:
+                batch = next(batches)
+            except StopIteration:
+                break
+            if n >= warmup:
+                stall += time.perf_counter() - before
+                timed += 1
+            if step is not None:
+                step(batch)
+        elapsed = time.perf_counter() - start if start is not None else 0.0
+    finally:
+        del batches
+    return {
+        "batches_per_s": timed / elapsed if elapsed > 0 else 0.0,
+        "stall_ms": stall * 1000 / max(timed, 1),
+        "stall_total_ms": stall * 1000,
+    }
+
+
+def autotune(
+    make_loader: Callable[[LoaderSettings], DataLoader],
+    candidates: list[LoaderSettings] = None,
+    num_batches: int = 20,
+    step: Callable = None,
+    logger=None,
+) -> LoaderSettings:
+    """Picks the settings that deliver the most batches per second. Ties
+    within 5% go to fewer workers.
+
+    :param make_loader: builds the loader for some settings
+    :type make_loader: Callable
+
+    :param candidates: settings to try, see :func:`candidate_settings`
+    :type candidates: list[:class:`LoaderSettings`]
+
+    :param num_batches: number of timed batches per candidate
+    :type num_batches: int
+
+    :param step: called with every batch, like the training step would
+    :type step: Callable
+
+    :param logger: logger to report every measurement to
+    :type logger: :class:`logging.Logger`
+
+    :returns: the fastest settings
+    :rtype: :class:`LoaderSettings`
+    """
+    threads = torch.get_num_threads()
+    best, best_rate = None, -1.0
+    try:
+        for settings in candidates or candidate_settings():
+            result = measure(make_loader, settings, num_batches, step=step)
+            if logger is not None:
+                logger.info(
+                    f"{settings}: {result['batches_per_s']:.2f} batches/s, "
+                    f"stall {result['stall_ms']:.1f} ms/batch"
+                )
+            if result["batches_per_s"] > best_rate * 1.05:
+                best, best_rate = settings, result["batches_per_s"]
+    finally:
+        torch.set_num_threads(threads)
+    return best
+
+
+def settings_path(cache_dir: str = None) -> str:
+    """
+    :param cache_dir: directory of the file, defaults to ``~/.cache/yolo``
+    :type cache_dir: str
+
+    :returns: path of the tuned settings of this host
+    :rtype: str
+    """
+    if cache_dir is None:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+        cache_dir = os.path.join(base, "yolo")
+    return os.path.join(cache_dir, f"loader-{socket.gethostname()}.json")
+
+
+def load_settings(key: str, path: str = None) -> LoaderSettings:
+    """
+    :param key: identifies the loader configuration that was tuned
+    :type key: str
+
+    :param path: settings file, see :func:`settings_path`
+    :type path: str
+
+    :returns: the cached settings, or None if this host has none for ``key``
+    :rtype: :class:`LoaderSettings`
+    """
+    try:
+        with open(path or settings_path()) as file:
+            entry = json.load(file).get(key)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if entry is None or entry.get("cpu_count") != os.cpu_count():
+        return None
+    return LoaderSettings(**entry["settings"])
+
+
+def save_settings(key: str, settings: LoaderSettings, path: str = None):
+    """Stores tuned settings, keeping the entries of other keys
+
+    :param key: identifies the loader configuration that was tuned
+    :type key: str
+
+    :param settings: settings to store
+    :type settings: :class:`LoaderSettings`
+
+    :param path: settings file, see :func:`settings_path`
+    :type path: str
+    """
+    path = path or settings_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        with open(path) as file:
+            entries = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        entries = {}
+    entries[key] = {"cpu_count": os.cpu_count(), "settings": settings._asdict()}
+    with open(path + ".tmp", "w") as file:
+        json.dump(entries, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def resolve_settings(
+    key: str,
+    make_loader: Callable[[LoaderSettings], DataLoader],
+    num_workers: int = None,
+    tune: bool = False,
+    path: str = None,
+    logger=None,
+) -> LoaderSettings:
+    """Settings for a loader: explicit workers win, then the cached tuning
+    of this host, then a fresh tuning if ``tune`` is set, then the fallback
+
+    :param key: identifies the loader configuration
+    :type key: str
+
+    :param make_loader: builds the loader for some settings
+    :type make_loader: Callable
+
+    :param num_workers: explicit number of workers
+    :type num_workers: int
+
+    :param tune: tune and cache the settings, even if cached ones exist
+    :type tune: bool
+
+    :param path: settings file, see :func:`settings_path`
+    :type path: str
+
+    :param logger: logger to report the tuning to
+    :type logger: :class:`logging.Logger`
+
+    :returns: settings to build the loader with
+    :rtype: :class:`LoaderSettings`
+    """
+    if num_workers is not None:
+        return LoaderSettings.fallback(num_workers)
+    if not tune:
+        cached = load_settings(key, path)
+        return cached if cached is not None else LoaderSettings.fallback()
+    settings = autotune(make_loader, logger=logger)
+    save_settings(key, settings, path)
+    if logger is not None:
+        logger.info(f"Tuned loader settings: {settings}")
+    return settings
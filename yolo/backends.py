@@ -0,0 +1,211 @@
+import os
+import tempfile
+from abc import ABC, abstractmethod
+
+import torch
+
+from yolo.model import DEFAULT_IN_CHANNELS, _InferenceNet, load_frozen
+
+BACKENDS = ("torch", "torchscript", "onnxruntime")
+ONNX_OPSET = 17
+ONNX_INPUT = "images"
+ONNX_OUTPUT = "outputs"
+
+
+def export_onnx(model, path: str, opset: int = ONNX_OPSET):
+    """Exports the inference layers of a model to ONNX, with a dynamic
+    batch size. The file is written atomically. The model is left in
+    evaluation mode.
+
+    :param model: model to export, built without ``compile``
+    :type model: :class:`yolo.model.Yolo`
+
+    :param path: path of the ``.onnx`` file
+    :type path: str
+
+    :param opset: ONNX operator set version
+    :type opset: int
+    """
+    # Batch norms are folded, and channels last has no meaning in ONNX.
+    # The exporter holds copies of the weights itself, so the layers of the
+    # model are not copied once more.
+    net = _InferenceNet(model.inference_layers(share=True)).eval()
+    size = model.input_size
+    example = torch.rand(1, DEFAULT_IN_CHANNELS, size, size)
+    with torch.no_grad():
+        torch.onnx.export(
+            net,
+            (example,),
+            path + ".tmp",
+            input_names=[ONNX_INPUT],
+            output_names=[ONNX_OUTPUT],
+            dynamic_axes={ONNX_INPUT: {0: "batch"}, ONNX_OUTPUT: {0: "batch"}},
+            opset_version=opset,
+            dynamo=False,
+        )
+    os.replace(path + ".tmp", path)
+
+
+def _import_onnxruntime():
+    try:
+        import onnxruntime
+    except ImportError as error:
+        raise ImportError(
+            "The onnxruntime backend needs the onnxruntime package, "
+            "install it with: pip install onnx onnxruntime"
+        ) from error
+    return onnxruntime
+
+
+class InferenceBackend(ABC):
+    """Runs a model for inference only.
+
+    Backends follow the inference interface of :class:`yolo.model.Yolo`,
+    ``predict`` and switching to ``eval``, so they replace the model in the
+    test loop and in :class:`yolo.proxy.ProxyEvaluator`.
+    """
+
+    name = ""
+    training = False
+
+    @abstractmethod
+    def predict(self, images: torch.Tensor) -> torch.Tensor:
+        """
+        :param images: (N, 3, H, W) normalized float batch
+        :type images: torch.Tensor
+
+        :returns: raw outputs of the model
+        :rtype: torch.Tensor
+        """
+
+    def eval(self) -> "InferenceBackend":
+        return self
+
+    def train(self, mode: bool = True) -> "InferenceBackend":
+        if mode:
+            raise ValueError(f"The {self.name} backend can not be trained")
+        return self
+
+
+class TorchBackend(InferenceBackend):
+    """Eager PyTorch, in the execution mode the model was built with"""
+
+    name = "torch"
+
+    def __init__(self, model):
+        """Constructor for a backend over a model
+
+        :param model: model to run
+        :type model: :class:`yolo.model.Yolo`
+
+        :returns: instance of the TorchBackend class
+        :rtype: :class:`TorchBackend`
+        """
+        self.model = model.eval()
+
+    def predict(self, images: torch.Tensor) -> torch.Tensor:
+        return self.model.predict(images)
+
+
+class TorchScriptBackend(InferenceBackend):
+    """Frozen TorchScript graph of :meth:`yolo.model.Yolo.freeze`"""
+
+    name = "torchscript"
+
+    def __init__(self, module: torch.jit.ScriptModule):
+        """Constructor for a backend over a frozen graph
+
+        :param module: graph from :meth:`yolo.model.Yolo.freeze` or
+                       :func:`yolo.model.load_frozen`
+        :type module: torch.jit.ScriptModule
+
+        :returns: instance of the TorchScriptBackend class
+        :rtype: :class:`TorchScriptBackend`
+        """
+        self.module = module
+
+    def predict(self, images: torch.Tensor) -> torch.Tensor:
+        with torch.inference_mode():
+            return self.module(images)
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """ONNX Runtime session on the CPU execution provider"""
+
+    name = "onnxruntime"
+
+    def __init__(self, path: str, threads: int = None):
+        """Constructor for a session over an exported model
+
+        :param path: file written by :func:`export_onnx`
+        :type path: str
+
+        :param threads: threads of the operators, the number of physical
+                        cores if None
+        :type threads: int
+
+        :returns: instance of the OnnxRuntimeBackend class
+        :rtype: :class:`OnnxRuntimeBackend`
+        :raises ImportError: if onnxruntime is not installed
+        """
+        ort = _import_onnxruntime()
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = threads or 0
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, images: torch.Tensor) -> torch.Tensor:
+        array = images.detach().float().contiguous().cpu().numpy()
+        outputs = self.session.run(None, {self.input_name: array})[0]
+        return torch.from_numpy(outputs)
+
+
+def open_backend(
+    name: str, model=None, path: str = None, threads: int = None
+) -> InferenceBackend:
+    """Opens an inference backend over a saved file, or over a model that
+    is frozen or exported on the fly
+
+    :param name: one of :data:`BACKENDS`
+    :type name: str
+
+    :param model: model to run, needed by ``torch`` and when no ``path`` is
+                  given
+    :type model: :class:`yolo.model.Yolo`
+
+    :param path: frozen TorchScript file for ``torchscript``, ONNX file for
+                 ``onnxruntime``
+    :type path: str
+
+    :param threads: number of CPU threads, the default of the backend if
+                    None
+    :type threads: int
+
+    :returns: the backend
+    :rtype: :class:`InferenceBackend`
+    :raises ValueError: if the name is unknown or there is nothing to run
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {BACKENDS}")
+    if model is None and (name == "torch" or path is None):
+        raise ValueError(f"The {name} backend needs a model")
+    if threads and name != "onnxruntime":
+        torch.set_num_threads(threads)
+
+    if name == "torch":
+        return TorchBackend(model)
+    if name == "torchscript":
+        return TorchScriptBackend(load_frozen(path) if path else model.freeze())
+    if path is not None:
+        return OnnxRuntimeBackend(path, threads)
+    # The session holds the model in memory once it is created
+    _import_onnxruntime()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "yolo.onnx")
+        export_onnx(model, path)
+        return OnnxRuntimeBackend(path, threads)
@@ -1,3 +1,6 @@
 from yolo.base.gridcell import GridCell
 from yolo.base.rect import Rectangle
 from yolo.base.point import Point
+from yolo.base.boxarray import BoxArray
+from yolo.base.grid import Grid, GridSlots, get_grid
+from yolo.base.spatial import GridIndex, RTreeIndex, match_boxes
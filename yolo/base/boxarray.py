@@ -0,0 +1,358 @@
+import operator
+
+import numpy as np
+import torch
+
+from yolo.base.rect import Rectangle
+
+BOX_FORMATS = ("xyxy", "cxcywh")
+
+
+def _is_tensor(data) -> bool:
+    return isinstance(data, torch.Tensor)
+
+
+def _scalar_index(index):
+    """Integer value of an index selecting a single box, or None. Besides
+    ints, numpy integers and 0-d integer arrays and tensors select one box."""
+    if isinstance(index, (bool, np.bool_)):
+        return None
+    if isinstance(index, (np.ndarray, torch.Tensor)):
+        if index.ndim != 0 or index.dtype in (np.bool_, torch.bool):
+            return None
+    try:
+        return operator.index(index)
+    except TypeError:
+        return None
+
+
+def _stack(columns: list, like):
+    if _is_tensor(like):
+        return torch.stack(columns, dim=-1)
+    return np.stack(columns, axis=-1)
+
+
+def _maximum(a, b):
+    return torch.maximum(a, b) if _is_tensor(a) else np.maximum(a, b)
+
+
+def _minimum(a, b):
+    return torch.minimum(a, b) if _is_tensor(a) else np.minimum(a, b)
+
+
+def _clip_min(a, low: float):
+    return a.clamp(min=low) if _is_tensor(a) else np.clip(a, low, None)
+
+
+def _convert(data, src: str, dst: str):
+    """Converts an (N, 4) array between box formats
+
+    :param data: boxes in the ``src`` format
+    :type data: numpy.ndarray or torch.Tensor
+
+    :param src: format of ``data``
+    :type src: str
+
+    :param dst: format to convert to
+    :type dst: str
+
+    :returns: boxes in the ``dst`` format
+    :rtype: numpy.ndarray or torch.Tensor
+    """
+    if src == dst:
+        return data
+    a, b, c, d = data[:, 0], data[:, 1], data[:, 2], data[:, 3]
+    if src == "xyxy":
+        return _stack([(a + c) / 2, (b + d) / 2, c - a, d - b], data)
+    return _stack([a - c / 2, b - d / 2, a + c / 2, b + d / 2], data)
+
+
+class BoxArray:
+    """A batch of bounding boxes stored as a single (N, 4) array
+
+    The array is either a :class:`numpy.ndarray` or a :class:`torch.Tensor`
+    and every operation stays on the backend it was created with, so boxes
+    coming out of the model never leave the tensor world.
+    """
+
+    def __init__(self, data, fmt: str = "xyxy", conf=None, labels=None):
+        """Constructor for a box array
+
+        :param data: (N, 4) array of box coordinates
+        :type data: numpy.ndarray or torch.Tensor or list
+
+        :param fmt: coordinate format, either ``"xyxy"`` or ``"cxcywh"``
+        :type fmt: str
+
+        :param conf: optional (N,) array of box confidences
+        :type conf: numpy.ndarray or torch.Tensor or list
+
+        :param labels: optional (N,) array of class names or class ids
+        :type labels: numpy.ndarray or torch.Tensor or list
+
+        :returns: instance of the BoxArray class
+        :rtype: :class:`BoxArray`
+        """
+        if fmt not in BOX_FORMATS:
+            raise ValueError(f"Unsupported box format: {fmt}")
+        if not _is_tensor(data):
+            data = np.asarray(data, dtype=np.float64)
+        if data.ndim == 1 and data.shape[0] == 0:
+            data = data.reshape(0, 4)
+        if data.ndim != 2 or data.shape[1] != 4:
+            raise ValueError(f"Expected an (N, 4) array, got {tuple(data.shape)}")
+        if conf is not None and not _is_tensor(conf):
+            conf = np.asarray(conf, dtype=np.float64)
+        if labels is not None and not _is_tensor(labels):
+            labels = np.asarray(labels)
+        for name, column in (("conf", conf), ("labels", labels)):
+            if column is not None and len(column) != len(data):
+                raise ValueError(
+                    f"Length of {name} ({len(column)}) does not match "
+                    f"number of boxes ({len(data)})"
+                )
+
+        self.data = data
+        self.fmt = fmt
+        self.conf = conf
+        self.labels = labels
+
+    @staticmethod
+    def from_rects(rects: list[Rectangle], labels=None) -> "BoxArray":
+        """Creates a box array from a list of rectangles
+
+        The boxes are stored in ``cxcywh`` format, which is what
+        :class:`Rectangle` stores, so the conversion is lossless.
+
+        :param rects: list of rectangles
+        :type rects: list[:class:`Rectangle`]
+
+        :param labels: optional class names or ids, one per rectangle
+        :type labels: list
+
+        :returns: box array holding the rectangles
+        :rtype: :class:`BoxArray`
+        """
+        data = np.array(
+            [(r.x(), r.y(), r.w, r.h) for r in rects], dtype=np.float64
+        ).reshape(-1, 4)
+        conf = np.array([r.c for r in rects], dtype=np.float64)
+        return BoxArray(data, "cxcywh", conf=conf, labels=labels)
+
+    @staticmethod
+    def from_labeled_rects(pairs: list[tuple[str, Rectangle]]) -> "BoxArray":
+        """Creates a box array from the output of
+        :func:`yolo.utils.objects_to_rects`
+
+        :param pairs: list of (name, rectangle) pairs
+        :type pairs: list[tuple(str, :class:`Rectangle`)]
+
+        :returns: box array with the names stored as labels
+        :rtype: :class:`BoxArray`
+        """
+        names = [name for name, _ in pairs]
+        return BoxArray.from_rects([rect for _, rect in pairs], labels=names)
+
+    def to_rects(self) -> list[Rectangle]:
+        """Converts the box array back to a list of rectangles
+
+        :returns: list of rectangles
+        :rtype: list[:class:`Rectangle`]
+        """
+        boxes = self.convert("cxcywh")
+        rows = boxes.data.tolist()
+        confs = [1.0] * len(rows) if self.conf is None else self.conf.tolist()
+        return [Rectangle((x, y), w, h, c) for (x, y, w, h), c in zip(rows, confs)]
+
+    def to_labeled_rects(self) -> list[tuple[str, Rectangle]]:
+        """Converts the box array back to (name, rectangle) pairs
+
+        :returns: list of (name, rectangle) pairs
+        :rtype: list[tuple(str, :class:`Rectangle`)]
+        """
+        if self.labels is None:
+            raise ValueError("BoxArray has no labels")
+        return list(zip(self.labels.tolist(), self.to_rects()))
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def __getitem__(self, index) -> "BoxArray":
+        scalar = _scalar_index(index)
+        if scalar is not None:
+            # Keep the (N, 4) shape for a single box
+            index = slice(scalar, scalar + 1 if scalar != -1 else None)
+        return BoxArray(
+            self.data[index],
+            self.fmt,
+            conf=None if self.conf is None else self.conf[index],
+            labels=None if self.labels is None else self.labels[index],
+        )
+
+    def __str__(self) -> str:
+        return f"BoxArray({len(self)}, fmt={self.fmt})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    def _replace(self, data, fmt: str) -> "BoxArray":
+        return BoxArray(data, fmt, conf=self.conf, labels=self.labels)
+
+    def convert(self, fmt: str) -> "BoxArray":
+        """Returns the boxes in another coordinate format
+
+        :param fmt: format to convert to
+        :type fmt: str
+
+        :returns: box array in the requested format
+        :rtype: :class:`BoxArray`
+        """
+        if fmt not in BOX_FORMATS:
+            raise ValueError(f"Unsupported box format: {fmt}")
+        if fmt == self.fmt:
+            return self
+        return self._replace(_convert(self.data, self.fmt, fmt), fmt)
+
+    def xyxy(self):
+        """
+        :returns: (N, 4) array of corner coordinates
+        :rtype: numpy.ndarray or torch.Tensor
+        """
+        return _convert(self.data, self.fmt, "xyxy")
+
+    def cxcywh(self):
+        """
+        :returns: (N, 4) array of center, width and height
+        :rtype: numpy.ndarray or torch.Tensor
+        """
+        return _convert(self.data, self.fmt, "cxcywh")
+
+    def numpy(self) -> "BoxArray":
+        """
+        :returns: box array backed by numpy arrays
+        :rtype: :class:`BoxArray`
+        """
+        to_np = lambda a: a.detach().cpu().numpy() if _is_tensor(a) else a
+        return BoxArray(
+            to_np(self.data),
+            self.fmt,
+            conf=None if self.conf is None else to_np(self.conf),
+            labels=None if self.labels is None else to_np(self.labels),
+        )
+
+    def tensor(self, device=None) -> "BoxArray":
+        """
+        :param device: device to place the tensors on
+        :type device: torch.device or str
+
+        :returns: box array backed by torch tensors
+        :rtype: :class:`BoxArray`
+        """
+        to_t = lambda a: torch.as_tensor(a, device=device)
+        labels = self.labels
+        if labels is not None and labels.dtype.kind in "iub":
+            labels = to_t(labels)
+        return BoxArray(
+            to_t(self.data),
+            self.fmt,
+            conf=None if self.conf is None else to_t(self.conf),
+            labels=labels,
+        )
+
+    def area(self):
+        """
+        :returns: (N,) array of box areas
+        :rtype: numpy.ndarray or torch.Tensor
+        """
+        if self.fmt == "cxcywh":
+            return self.data[:, 2] * self.data[:, 3]
+        return (self.data[:, 2] - self.data[:, 0]) * (self.data[:, 3] - self.data[:, 1])
+
+    def intersection(self, other: "BoxArray"):
+        """Pairwise intersection areas between two box arrays
+
+        :param other: boxes to intersect with
+        :type other: :class:`BoxArray`
+
+        :returns: (N, M) array of intersection areas
+        :rtype: numpy.ndarray or torch.Tensor
+        """
+        a = self.xyxy()
+        b = other.xyxy()
+        top_left = _maximum(a[:, None, :2], b[None, :, :2])
+        bottom_right = _minimum(a[:, None, 2:], b[None, :, 2:])
+        wh = _clip_min(bottom_right - top_left, 0.0)
+        return wh[..., 0] * wh[..., 1]
+
+    def union(self, other: "BoxArray", intersection=None):
+        """Pairwise union areas between two box arrays
+
+        :param other: boxes to unite with
+        :type other: :class:`BoxArray`
+
+        :param intersection: precomputed result of :meth:`intersection`
+        :type intersection: numpy.ndarray or torch.Tensor
+
+        :returns: (N, M) array of union areas
+        :rtype: numpy.ndarray or torch.Tensor
+        """
+        if intersection is None:
+            intersection = self.intersection(other)
+        return self.area()[:, None] + other.area()[None, :] - intersection
+
+    def iou(self, other: "BoxArray"):
+        """Pairwise intersection over union between two box arrays
+
+        :param other: boxes to compare against
+        :type other: :class:`BoxArray`
+
+        :returns: (N, M) array of IoU values, 0 where the union is empty
+        :rtype: numpy.ndarray or torch.Tensor
+        """
+        inter = self.intersection(other)
+        union = self.union(other, inter)
+        if _is_tensor(union):
+            return torch.where(union > 0, inter / union.clamp(min=1e-12), 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(union > 0, inter / union, 0.0)
+
+    def clip(self, width: float, height: float) -> "BoxArray":
+        """Clips the boxes to the image bounds
+
+        :param width: image width
+        :type width: float
+
+        :param height: image height
+        :type height: float
+
+        :returns: clipped boxes in the same format
+        :rtype: :class:`BoxArray`
+        """
+        xyxy = self.xyxy()
+        if _is_tensor(xyxy):
+            upper = xyxy.new_tensor([width, height, width, height])
+            clipped = torch.minimum(xyxy.clamp(min=0.0), upper)
+        else:
+            clipped = np.clip(xyxy, 0.0, [width, height, width, height])
+        return self._replace(_convert(clipped, "xyxy", self.fmt), self.fmt)
+
+    def scale(self, sx: float, sy: float = None) -> "BoxArray":
+        """Scales the box coordinates, e.g. to follow an image resize
+
+        Unlike :meth:`Rectangle.__mul__`, which scales the area, this
+        scales every coordinate.
+
+        :param sx: horizontal scale factor
+        :type sx: float
+
+        :param sy: vertical scale factor, defaults to ``sx``
+        :type sy: float
+
+        :returns: scaled boxes in the same format
+        :rtype: :class:`BoxArray`
+        """
+        sy = sx if sy is None else sy
+        factors = [sx, sy, sx, sy]
+        if _is_tensor(self.data):
+            factors = self.data.new_tensor(factors)
+        return self._replace(self.data * factors, self.fmt)
@@ -0,0 +1,203 @@
+import functools
+
+import numpy as np
+
+from yolo.base.boxarray import BoxArray
+from yolo.base.gridcell import GridCell
+
+
+class GridSlots:
+    """Boxes assigned to the cells of a :class:`Grid`
+
+    Every cell owns ``max_slots`` consecutive rows of a single array, so
+    the boxes of a whole grid live in one contiguous block of memory.
+    """
+
+    def __init__(self, grid_size: tuple[int, int], max_slots: int):
+        """Constructor for empty grid slots
+
+        :param grid_size: number of cells along the width and height
+        :type grid_size: tuple (int, int)
+
+        :param max_slots: maximum number of boxes per cell
+        :type max_slots: int
+
+        :returns: instance of the GridSlots class
+        :rtype: :class:`GridSlots`
+        """
+        gx, gy = grid_size
+        self.boxes = np.zeros((gx, gy, max_slots, 4), dtype=np.float32)
+        self.labels = np.full((gx, gy, max_slots), -1, dtype=np.int64)
+        self.counts = np.zeros((gx, gy), dtype=np.int64)
+
+    def cell_boxes(self, i: int, j: int) -> BoxArray:
+        """
+        :param i: cell index along the width
+        :type i: int
+
+        :param j: cell index along the height
+        :type j: int
+
+        :returns: xyxy boxes assigned to the cell
+        :rtype: :class:`BoxArray`
+        """
+        count = self.counts[i, j]
+        return BoxArray(
+            self.boxes[i, j, :count], "xyxy", labels=self.labels[i, j, :count]
+        )
+
+    def all_boxes(self) -> BoxArray:
+        """
+        :returns: xyxy boxes of all cells, in cell order
+        :rtype: :class:`BoxArray`
+        """
+        used = np.arange(self.boxes.shape[2]) < self.counts[..., None]
+        return BoxArray(self.boxes[used], "xyxy", labels=self.labels[used])
+
+
+class Grid:
+    """Grid of cells over an image, stored as flat arrays
+
+    Every cell is ``image_size // grid_size`` pixels and the remainder of a
+    non-divisible image size goes to the last row and column, like
+    :class:`GridCell` grids always had. Grids are immutable; use
+    :func:`get_grid` to share one between all images of the same size.
+    """
+
+    def __init__(self, image_size: tuple[int, int], grid_size: tuple[int, int]):
+        """Constructor for a grid
+
+        :param image_size: (width, height) of the image
+        :type image_size: tuple (int, int)
+
+        :param grid_size: number of cells along the width and height
+        :type grid_size: tuple (int, int)
+
+        :returns: instance of the Grid class
+        :rtype: :class:`Grid`
+        """
+        width, height = image_size
+        gx, gy = grid_size
+        if gx <= 0 or gy <= 0 or gx > width or gy > height:
+            raise ValueError(f"Cannot split a {image_size} image into {grid_size}")
+
+        self.image_size = (width, height)
+        self.grid_size = (gx, gy)
+        self.cell_width = width // gx
+        self.cell_height = height // gy
+
+        widths = np.full(gx, self.cell_width, dtype=np.int64)
+        widths[-1] += width % gx
+        heights = np.full(gy, self.cell_height, dtype=np.int64)
+        heights[-1] += height % gy
+
+        self.x_edges = np.concatenate([[0], np.cumsum(widths)])
+        self.y_edges = np.concatenate([[0], np.cumsum(heights)])
+        # (gx, gy, 2) arrays of the top left corner and size of every cell
+        self.origins = np.stack(
+            np.meshgrid(self.x_edges[:-1], self.y_edges[:-1], indexing="ij"), -1
+        )
+        self.sizes = np.stack(np.meshgrid(widths, heights, indexing="ij"), -1)
+
+        for array in (self.x_edges, self.y_edges, self.origins, self.sizes):
+            array.setflags(write=False)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.grid_size
+
+    def __str__(self):
+        return f"Grid({self.image_size}, {self.grid_size})"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def cell_of(self, x, y) -> tuple[np.ndarray, np.ndarray]:
+        """Finds the cells holding the given points. Points outside the image
+        are assigned to the nearest border cell.
+
+        :param x: x coordinates
+        :type x: float or numpy.ndarray
+
+        :param y: y coordinates
+        :type y: float or numpy.ndarray
+
+        :returns: (i, j) cell indices along the width and height
+        :rtype: tuple (numpy.ndarray, numpy.ndarray)
+        """
+        i = np.floor_divide(x, self.cell_width).astype(np.int64)
+        j = np.floor_divide(y, self.cell_height).astype(np.int64)
+        return (
+            np.clip(i, 0, self.grid_size[0] - 1),
+            np.clip(j, 0, self.grid_size[1] - 1),
+        )
+
+    def cell(self, i: int, j: int) -> GridCell:
+        """
+        :param i: cell index along the width
+        :type i: int
+
+        :param j: cell index along the height
+        :type j: int
+
+        :returns: the cell as a standalone :class:`GridCell`
+        :rtype: :class:`GridCell`
+        """
+        width, height = self.sizes[i, j]
+        return GridCell(int(width), int(height), i, j)
+
+    def assign(self, boxes: BoxArray, max_slots: int = 4) -> GridSlots:
+        """Assigns every box to the cell holding its center
+
+        :param boxes: boxes to assign, the labels are kept if present
+        :type boxes: :class:`BoxArray`
+
+        :param max_slots: maximum number of boxes per cell, the boxes after
+                          that are dropped in input order
+        :type max_slots: int
+
+        :returns: the boxes of every cell
+        :rtype: :class:`GridSlots`
+        """
+        boxes = boxes.numpy()
+        xyxy = boxes.xyxy()
+        i, j = self.cell_of(
+            (xyxy[:, 0] + xyxy[:, 2]) / 2, (xyxy[:, 1] + xyxy[:, 3]) / 2
+        )
+        cell = i * self.grid_size[1] + j
+        order = np.argsort(cell, kind="stable")
+        counts = np.bincount(cell, minlength=self.grid_size[0] * self.grid_size[1])
+        starts = np.cumsum(counts) - counts
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order)) - starts[cell[order]]
+        kept = rank < max_slots
+
+        slots = GridSlots(self.grid_size, max_slots)
+        slots.boxes[i[kept], j[kept], rank[kept]] = xyxy[kept]
+        if boxes.labels is not None and boxes.labels.dtype.kind in "iu":
+            slots.labels[i[kept], j[kept], rank[kept]] = boxes.labels[kept]
+        slots.counts[:] = np.minimum(counts, max_slots).reshape(self.grid_size)
+        return slots
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_grid(image_size: tuple[int, int], grid_size: tuple[int, int]) -> Grid:
+    return Grid(image_size, grid_size)
+
+
+def get_grid(image_size: tuple[int, int], grid_size: tuple[int, int]) -> Grid:
+    """Returns the grid for an image size, building it only the first time
+
+    :param image_size: (width, height) of the image
+    :type image_size: tuple (int, int)
+
+    :param grid_size: number of cells along the width and height
+    :type grid_size: tuple (int, int)
+
+    :returns: shared, immutable grid
+    :rtype: :class:`Grid`
+    """
+    return _cached_grid(
+        (int(image_size[0]), int(image_size[1])),
+        (int(grid_size[0]), int(grid_size[1])),
+    )
@@ -1,9 +1,15 @@
 import math
-from cv2.typing import Point as _Point
 
 
-class Point(_Point):
-    """Point in an image"""
+class Point:
+    """Point in an image
+
+    Points are immutable value objects, so they can be shared and hashed
+    freely. They behave like a ``(x, y)`` sequence, which lets them be
+    passed directly to OpenCV drawing functions.
+    """
+
+    __slots__ = ("x", "y")
 
     def __init__(self, x: float, y: float):
         """Constructor for a point
@@ -17,8 +23,17 @@ class Point(_Point):
         :returns: instance of the Point class
         :rtype: :class:`Point`
         """
-        self.x: float = x
-        self.y: float = y
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Point is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Point is immutable")
+
+    def __reduce__(self):
+        return (Point, (self.x, self.y))
 
     def __getitem__(self, item: int):
         """Returns the x or y coordinate of the point
@@ -39,6 +54,12 @@ class Point(_Point):
     def __len__(self):
         return 2
 
+    def __iter__(self):
+        return iter((self.x, self.y))
+
+    def __hash__(self):
+        return hash((self.x, self.y))
+
     def __str__(self):
         return f"({self.x}, {self.y})"
 
@@ -78,7 +99,7 @@ class Point(_Point):
         """
         return Point(self.x * scalar, self.y * scalar)
 
-    def __div__(self, scalar: float):
+    def __truediv__(self, scalar: float):
         """Divides a point by a scalar
 
         :param scalar: scalar to divide by
@@ -89,6 +110,8 @@ class Point(_Point):
         """
         return Point(self.x / scalar, self.y / scalar)
 
+    __div__ = __truediv__
+
     def __eq__(self, other: "Point"):
         """Tests if two points are equal
 
@@ -98,6 +121,8 @@ class Point(_Point):
         :returns: True if the two points are equal
         :rtype: bool
         """
+        if not isinstance(other, Point):
+            return NotImplemented
         return self.x == other.x and self.y == other.y
 
     def __ne__(self, other: "Point"):
@@ -109,7 +134,9 @@ class Point(_Point):
         :returns: True if the two points are not equal
         :rtype: bool
         """
-        return not self.__eq__(other)
+        if not isinstance(other, Point):
+            return NotImplemented
+        return self.x != other.x or self.y != other.y
 
     def integral(self):
         """Returns the integral of the point
@@ -119,13 +146,6 @@ class Point(_Point):
         """
         return Point(int(self.x), int(self.y))
 
-    def integralize(self):
-        """
-        Converts the point to an integral point in place
-        """
-        self.x = int(self.x)
-        self.y = int(self.y)
-
     def real(self):
         """Returns the real value of the point
 
@@ -134,13 +154,6 @@ class Point(_Point):
         """
         return Point(float(self.x), float(self.y))
 
-    def realize(self):
-        """
-        Converts the point to a real point in place
-        """
-        self.x = float(self.x)
-        self.y = float(self.y)
-
     def distance(self, other: "Point"):
         """Calculates the distance between two points
 
@@ -150,7 +163,7 @@ class Point(_Point):
         :returns: distance between the two points
         :rtype: float
         """
-        return math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2)
+        return math.hypot(self.x - other.x, self.y - other.y)
 
     def as_tuple(self):
         """Returns the point as a tuple
@@ -3,7 +3,14 @@ from yolo.base.point import Point
 
 
 class Rectangle:
-    """Bounding box around an object in an image"""
+    """Bounding box around an object in an image
+
+    Rectangles are immutable. The corners are computed once on
+    construction, so the geometry queries below only compare floats and
+    never build intermediate :class:`Point` objects.
+    """
+
+    __slots__ = ("center", "w", "h", "c", "xmin", "ymin", "xmax", "ymax")
 
     def __init__(self, p: tuple[float, float], w: float, h: float, c: float):
         """Constructor for a bounding box
@@ -23,10 +30,25 @@ class Rectangle:
         :returns: instance of the BoundingBox class
         :rtype: :class:`BoundingBox`
         """
-        self.center: Point = Point(p[0], p[1])
-        self.w = w
-        self.h = h
-        self.c = c
+        center = p if isinstance(p, Point) else Point(p[0], p[1])
+        init = object.__setattr__
+        init(self, "center", center)
+        init(self, "w", w)
+        init(self, "h", h)
+        init(self, "c", c)
+        init(self, "xmin", center.x - w / 2)
+        init(self, "ymin", center.y - h / 2)
+        init(self, "xmax", center.x + w / 2)
+        init(self, "ymax", center.y + h / 2)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Rectangle is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Rectangle is immutable")
+
+    def __reduce__(self):
+        return (Rectangle, (self.center, self.w, self.h, self.c))
 
     @staticmethod
     def from_corners(top_left: Point, bottom_right: Point) -> "Rectangle":
@@ -41,12 +63,14 @@ class Rectangle:
         )
 
     def __str__(self) -> str:
-        return f"({self.x()}, {self.y()}, {self.w}, {self.h}, {self.c})"
+        return f"({self.center.x}, {self.center.y}, {self.w}, {self.h}, {self.c})"
 
     def __repr__(self) -> str:
-        return f"({self.x()}, {self.y()}, {self.w}, {self.h}, {self.c})"
+        return self.__str__()
 
     def __eq__(self, other: "Rectangle") -> bool:
+        if not isinstance(other, Rectangle):
+            return NotImplemented
         return (
             self.center == other.center
             and self.w == other.w
@@ -54,11 +78,14 @@ class Rectangle:
             and self.c == other.c
         )
 
+    def __hash__(self):
+        return hash((self.center, self.w, self.h, self.c))
+
     def __mul__(self, scalar: float) -> "Rectangle":
         s = math.sqrt(math.fabs(scalar))
         w = self.w * s
         h = self.h * s
-        return Rectangle((self.center[0], self.center[1]), w, h, self.c)
+        return Rectangle(self.center, w, h, self.c)
 
     def x(self) -> float:
         return self.center.x
@@ -67,36 +94,24 @@ class Rectangle:
         return self.center.y
 
     def get_top_left_pixel(self) -> Point:
-        return Point(
-            math.floor(self.x() - self.w / 2) + 1,
-            math.floor(self.y() - self.h / 2) + 1,
-        )
+        return Point(math.floor(self.xmin) + 1, math.floor(self.ymin) + 1)
 
     def get_bottom_right_pixel(self) -> Point:
-        return Point(
-            math.ceil(self.x() + self.w / 2),
-            math.ceil(self.y() + self.h / 2),
-        )
+        return Point(math.ceil(self.xmax), math.ceil(self.ymax))
 
     def get_top_left(self) -> Point:
         """
         :returns: top left corner of the bounding box
         :rtype: tuple (float, float)
         """
-        return Point(
-            self.x() - self.w / 2,
-            self.y() - self.h / 2,
-        )
+        return Point(self.xmin, self.ymin)
 
     def get_bottom_right(self) -> Point:
         """
         :returns: bottom right corner of the bounding box
         :rtype: tuple (float, float)
         """
-        return Point(
-            self.x() + self.w / 2,
-            self.y() + self.h / 2,
-        )
+        return Point(self.xmax, self.ymax)
 
     def get_center(self) -> Point:
         """
@@ -138,28 +153,28 @@ class Rectangle:
         :returns: x coordinate of top left corner of the bounding box
         :rtype: float
         """
-        return self.get_top_left().x
+        return self.xmin
 
     def get_ymin(self):
         """
         :returns: y coordinate of top left corner of the bounding box
         :rtype: float
         """
-        return self.get_top_left().y
+        return self.ymin
 
     def get_xmax(self):
         """
         :returns: x coordinate of bottom right corner of the bounding box
         :rtype: float
         """
-        return self.get_bottom_right().x
+        return self.xmax
 
     def get_ymax(self):
         """
         :returns: y coordinate of bottom right corner of the bounding box
         :rtype: float
         """
-        return self.get_bottom_right().y
+        return self.ymax
 
     def intersects(self, other: "Rectangle"):
         """Tests if this bounding box intersects another bounding box
@@ -168,10 +183,10 @@ class Rectangle:
         :rtype: bool
         """
         return (
-            self.get_xmin() <= other.get_xmax()
-            and self.get_xmax() >= other.get_xmin()
-            and self.get_ymin() <= other.get_ymax()
-            and self.get_ymax() >= other.get_ymin()
+            self.xmin <= other.xmax
+            and self.xmax >= other.xmin
+            and self.ymin <= other.ymax
+            and self.ymax >= other.ymin
         )
 
     def contains(self, x, y):
@@ -180,12 +195,7 @@ class Rectangle:
         :returns: True if this bounding box contains a point
         :rtype: bool
         """
-        return (
-            self.get_top_left().x < x
-            and self.get_top_left().y < y
-            and self.get_bottom_right().x > x
-            and self.get_bottom_right().y > y
-        )
+        return self.xmin < x < self.xmax and self.ymin < y < self.ymax
 
     def on_edge(self, p: Point, delta: float):
         """Tests if a given (x,y) point is on the edge of this bounding box
@@ -193,13 +203,11 @@ class Rectangle:
         :returns: True if a given (x,y) point is on the edge of this bounding box
         :rtype: bool
         """
-        inclsv_bb = Rectangle(
-            self.x(), self.y(), self.w + delta, self.h + delta, self.c
-        )
-        exclsv_bb = Rectangle(
-            self.x(), self.y(), self.w - delta, self.h - delta, self.c
-        )
-        return inclsv_bb.contains(p.x, p.y) and not exclsv_bb.contains(p.x, p.y)
+        dx = abs(p.x - self.center.x)
+        dy = abs(p.y - self.center.y)
+        inside_outer = dx < (self.w + delta) / 2 and dy < (self.h + delta) / 2
+        inside_inner = dx < (self.w - delta) / 2 and dy < (self.h - delta) / 2
+        return inside_outer and not inside_inner
 
     def union_area(self, other: "Rectangle"):
         """Performs the union of this bounding box and another bounding box
@@ -208,10 +216,7 @@ class Rectangle:
         :returns: the union of this bounding box and another bounding box
         :rtype: float
         """
-        if self.intersects(other):
-            return self.get_area() + other.get_area() - self.int_area(other)
-        else:
-            return self.get_area() + other.get_area()
+        return self.w * self.h + other.w * other.h - self.int_area(other)
 
     def int_area(self, other: "Rectangle"):
         """Performs the intersection of this bounding box and another bounding box
@@ -220,18 +225,11 @@ class Rectangle:
         :returns: the intersection of this bounding box and another bounding box
         :rtype: float
         """
-        if self.intersects(other):
-            top_left = Point(
-                max(self.get_top_left().x, other.get_top_left().x),
-                max(self.get_top_left().y, other.get_top_left().y),
-            )
-            bottom_right = Point(
-                min(self.get_bottom_right().x, other.get_bottom_right().x),
-                min(self.get_bottom_right().y, other.get_bottom_right().y),
-            )
-            return (bottom_right.x - top_left.x) * (bottom_right.y - top_left.y)
-        else:
+        iw = min(self.xmax, other.xmax) - max(self.xmin, other.xmin)
+        ih = min(self.ymax, other.ymax) - max(self.ymin, other.ymin)
+        if iw < 0 or ih < 0:
             return 0.0
+        return iw * ih
 
     def iou(self, other: "Rectangle"):
         """Calculates the intersection over union of this bounding box and another bounding box
@@ -239,4 +237,5 @@ class Rectangle:
         :returns: intersection over union of this bounding box and another bounding box
         :rtype: float
         """
-        return self.int_area(other) / self.union_area(other)
+        inter = self.int_area(other)
+        return inter / (self.w * self.h + other.w * other.h - inter)
@@ -0,0 +1,553 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from yolo.base.boxarray import BoxArray
+from yolo.base.grid import get_grid
+
+# Match of detections that hit a ground truth box flagged as difficult
+IGNORED = -2
+
+
+def _ragged_arange(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Concatenates ``arange(lo[k], hi[k])`` for every k without a loop"""
+    counts = hi - lo
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    ends = np.cumsum(counts)
+    return np.repeat(lo - ends + counts, counts) + np.arange(total)
+
+
+def _as_xyxy(boxes) -> np.ndarray:
+    if isinstance(boxes, BoxArray):
+        boxes = boxes.numpy().xyxy()
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+
+def _overlapping(xyxy: np.ndarray, box) -> np.ndarray:
+    """Mask of the boxes touching ``box``, with the same inclusive edges
+    as :meth:`yolo.base.Rectangle.intersects`. ``box`` is one region, or
+    one region per box."""
+    box = np.asarray(box)
+    return (
+        (xyxy[:, 0] <= box[..., 2])
+        & (xyxy[:, 2] >= box[..., 0])
+        & (xyxy[:, 1] <= box[..., 3])
+        & (xyxy[:, 3] >= box[..., 1])
+    )
+
+
+def _pair_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU of every row of ``a`` with the same row of ``b``"""
+    iw = np.clip(np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]), 0, None)
+    ih = np.clip(np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def _no_pairs() -> tuple[np.ndarray, np.ndarray]:
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+
+def _containing(xyxy: np.ndarray, x: float, y: float) -> np.ndarray:
+    """Mask of the boxes strictly containing a point, like
+    :meth:`yolo.base.Rectangle.contains`"""
+    return (xyxy[:, 0] < x) & (xyxy[:, 1] < y) & (xyxy[:, 2] > x) & (xyxy[:, 3] > y)
+
+
+class _SpatialIndex(ABC):
+    """Storage shared by the spatial indices. Boxes are only ever added in
+    bulk, after which the index is rebuilt in one vectorized pass.
+
+    Single queries pay a fixed numpy overhead that a linear scan of a few
+    thousand boxes does not, so batches of regions should go through
+    :meth:`join`, which answers all of them in one pass."""
+
+    def __init__(self):
+        self.xyxy = np.empty((0, 4), dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.xyxy)
+
+    def insert(self, boxes: BoxArray) -> np.ndarray:
+        """Adds boxes to the index
+
+        :param boxes: boxes to add
+        :type boxes: :class:`BoxArray`
+
+        :returns: ids assigned to the new boxes, ids are positions in
+                  insertion order
+        :rtype: numpy.ndarray
+        """
+        start = len(self.xyxy)
+        self.xyxy = np.concatenate([self.xyxy, _as_xyxy(boxes)])
+        self._build()
+        return np.arange(start, len(self.xyxy))
+
+    def centers(self) -> np.ndarray:
+        """
+        :returns: (N, 2) array of box centers
+        :rtype: numpy.ndarray
+        """
+        return (self.xyxy[:, :2] + self.xyxy[:, 2:]) / 2
+
+    @abstractmethod
+    def _build(self):
+        """Rebuilds the search structure from ``self.xyxy``"""
+
+    @abstractmethod
+    def join(self, boxes) -> tuple[np.ndarray, np.ndarray]:
+        """Finds every overlapping pair of a batch of regions and the
+        indexed boxes, with the edges of :meth:`query`
+
+        :param boxes: regions to look up
+        :type boxes: :class:`BoxArray` or (Q, 4) xyxy numpy.ndarray
+
+        :returns: region ids and box ids of the overlapping pairs, in no
+                  particular order
+        :rtype: tuple (numpy.ndarray, numpy.ndarray)
+        """
+
+
+class GridIndex(_SpatialIndex):
+    """Uniform grid hash over an image
+
+    The cells are those of :class:`yolo.base.Grid`: every cell is
+    ``image_size // grid_size`` pixels and the remainder goes to the last
+    row and column. Every box is bucketed into each cell it overlaps, and
+    separately into the single cell holding its center, which is the cell
+    responsible for detecting it.
+    """
+
+    def __init__(self, image_size: tuple[int, int], grid_size: tuple[int, int]):
+        """Constructor for a grid index
+
+        :param image_size: (width, height) of the image
+        :type image_size: tuple (int, int)
+
+        :param grid_size: number of cells along the width and height
+        :type grid_size: tuple (int, int)
+
+        :returns: instance of the GridIndex class
+        :rtype: :class:`GridIndex`
+        """
+        super().__init__()
+        self.grid = get_grid(image_size, grid_size)
+        self.image_size = self.grid.image_size
+        self.grid_size = self.grid.grid_size
+        self.cell_width = self.grid.cell_width
+        self.cell_height = self.grid.cell_height
+        self._build()
+
+    def cell_of(self, x, y) -> tuple[np.ndarray, np.ndarray]:
+        """See :meth:`yolo.base.Grid.cell_of`"""
+        return self.grid.cell_of(x, y)
+
+    def assign(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        :returns: (i, j) index of the cell responsible for every box
+        :rtype: tuple (numpy.ndarray, numpy.ndarray)
+        """
+        centers = self.centers()
+        return self.cell_of(centers[:, 0], centers[:, 1])
+
+    def _flat(self, i, j):
+        return i * self.grid_size[1] + j
+
+    def _buckets(self, cells: np.ndarray, ids: np.ndarray):
+        order = np.argsort(cells, kind="stable")
+        num_cells = self.grid_size[0] * self.grid_size[1]
+        starts = np.searchsorted(cells[order], np.arange(num_cells + 1))
+        return ids[order], starts
+
+    def _build(self):
+        i0, j0 = self.cell_of(self.xyxy[:, 0], self.xyxy[:, 1])
+        i1, j1 = self.cell_of(self.xyxy[:, 2], self.xyxy[:, 3])
+        rows = j1 - j0 + 1
+        counts = (i1 - i0 + 1) * rows
+        local = _ragged_arange(np.zeros_like(counts), counts)
+        ci = np.repeat(i0, counts) + local // np.repeat(rows, counts)
+        cj = np.repeat(j0, counts) + local % np.repeat(rows, counts)
+        ids = np.repeat(np.arange(len(self.xyxy)), counts)
+        self._entries, self._starts = self._buckets(self._flat(ci, cj), ids)
+        self._first_i = i0[self._entries]
+        self._first_j = j0[self._entries]
+
+        ci, cj = self.assign()
+        self._members, self._member_starts = self._buckets(
+            self._flat(ci, cj), np.arange(len(self.xyxy))
+        )
+
+    def _candidates(self, i0, j0, i1, j1) -> np.ndarray:
+        ci, cj = np.meshgrid(
+            np.arange(i0, i1 + 1), np.arange(j0, j1 + 1), indexing="ij"
+        )
+        ci, cj = ci.ravel(), cj.ravel()
+        cells = self._flat(ci, cj)
+        lo, hi = self._starts[cells], self._starts[cells + 1]
+        hits = _ragged_arange(lo, hi)
+        # a box spanning several cells of the range is only reported by the
+        # first of them, which avoids deduplicating with a sort
+        first = (np.repeat(ci, hi - lo) == np.maximum(self._first_i[hits], i0)) & (
+            np.repeat(cj, hi - lo) == np.maximum(self._first_j[hits], j0)
+        )
+        return np.sort(self._entries[hits[first]])
+
+    def cell_members(self, i: int, j: int) -> np.ndarray:
+        """
+        :param i: cell index along the width
+        :type i: int
+
+        :param j: cell index along the height
+        :type j: int
+
+        :returns: ids of the boxes whose center lies in the cell
+        :rtype: numpy.ndarray
+        """
+        cell = self._flat(i, j)
+        return self._members[self._member_starts[cell] : self._member_starts[cell + 1]]
+
+    def query(self, box) -> np.ndarray:
+        """Finds the boxes overlapping a region
+
+        :param box: (xmin, ymin, xmax, ymax) of the region
+        :type box: sequence of float
+
+        :returns: sorted ids of the overlapping boxes
+        :rtype: numpy.ndarray
+        """
+        i0, j0 = self.cell_of(box[0], box[1])
+        i1, j1 = self.cell_of(box[2], box[3])
+        candidates = self._candidates(i0, j0, i1, j1)
+        return candidates[_overlapping(self.xyxy[candidates], box)]
+
+    def join(self, boxes) -> tuple[np.ndarray, np.ndarray]:
+        regions = _as_xyxy(boxes)
+        if len(regions) == 0 or len(self.xyxy) == 0:
+            return _no_pairs()
+        i0, j0 = self.cell_of(regions[:, 0], regions[:, 1])
+        i1, j1 = self.cell_of(regions[:, 2], regions[:, 3])
+        rows = j1 - j0 + 1
+        counts = (i1 - i0 + 1) * rows
+        region = np.repeat(np.arange(len(regions)), counts)
+        local = _ragged_arange(np.zeros_like(counts), counts)
+        ci = i0[region] + local // rows[region]
+        cj = j0[region] + local % rows[region]
+
+        cells = self._flat(ci, cj)
+        lo, hi = self._starts[cells], self._starts[cells + 1]
+        hits = _ragged_arange(lo, hi)
+        region = np.repeat(region, hi - lo)
+        # Like in query, a pair is only reported by the first cell the box
+        # and the region share
+        first = (
+            np.repeat(ci, hi - lo) == np.maximum(self._first_i[hits], i0[region])
+        ) & (np.repeat(cj, hi - lo) == np.maximum(self._first_j[hits], j0[region]))
+        region, ids = region[first], self._entries[hits[first]]
+        keep = _overlapping(self.xyxy[ids], regions[region])
+        return region[keep], ids[keep]
+
+    def query_point(self, x: float, y: float) -> np.ndarray:
+        """Finds the boxes containing a point
+
+        :param x: x coordinate of the point
+        :type x: float
+
+        :param y: y coordinate of the point
+        :type y: float
+
+        :returns: sorted ids of the boxes containing the point
+        :rtype: numpy.ndarray
+        """
+        i, j = self.cell_of(x, y)
+        candidates = self._candidates(i, j, i, j)
+        return candidates[_containing(self.xyxy[candidates], x, y)]
+
+    def nearest_center(self, x: float, y: float) -> int:
+        """Finds the box whose center is closest to a point by searching rings
+        of cells outwards from the cell holding the point
+
+        :param x: x coordinate of the point
+        :type x: float
+
+        :param y: y coordinate of the point
+        :type y: float
+
+        :returns: id of the nearest box, or -1 if the index is empty
+        :rtype: int
+        """
+        if len(self.xyxy) == 0:
+            return -1
+        gx, gy = self.grid_size
+        i, j = (int(v) for v in self.cell_of(x, y))
+        min_step = min(self.cell_width, self.cell_height)
+        centers = self.centers()
+        best, best_dist = -1, np.inf
+        for ring in range(max(gx, gy)):
+            # every cell in the next ring is at least this far away
+            if best >= 0 and (ring - 1) * min_step > best_dist:
+                break
+            ci, cj = np.meshgrid(
+                np.arange(max(i - ring, 0), min(i + ring, gx - 1) + 1),
+                np.arange(max(j - ring, 0), min(j + ring, gy - 1) + 1),
+                indexing="ij",
+            )
+            on_ring = np.maximum(np.abs(ci - i), np.abs(cj - j)) == ring
+            cells = self._flat(ci[on_ring], cj[on_ring])
+            ids = self._members[
+                _ragged_arange(
+                    self._member_starts[cells], self._member_starts[cells + 1]
+                )
+            ]
+            if len(ids) == 0:
+                continue
+            dist = np.hypot(centers[ids, 0] - x, centers[ids, 1] - y)
+            k = int(np.argmin(dist))
+            if dist[k] < best_dist:
+                best, best_dist = int(ids[k]), dist[k]
+        return best
+
+
+class RTreeIndex(_SpatialIndex):
+    """Static R-tree bulk loaded with Sort-Tile-Recursive packing
+
+    Unlike :class:`GridIndex` it needs no image geometry and stays
+    efficient when box sizes vary a lot. Every level of the tree is
+    searched with one vectorized test over the surviving nodes.
+    """
+
+    def __init__(self, node_capacity: int = 16):
+        """Constructor for an R-tree index
+
+        :param node_capacity: maximum number of children of a node
+        :type node_capacity: int
+
+        :returns: instance of the RTreeIndex class
+        :rtype: :class:`RTreeIndex`
+        """
+        super().__init__()
+        self.node_capacity = node_capacity
+        self._build()
+
+    def _pack(self, xyxy: np.ndarray) -> tuple[np.ndarray, list[np.ndarray]]:
+        cap = self.node_capacity
+        n = len(xyxy)
+        centers = (xyxy[:, :2] + xyxy[:, 2:]) / 2
+        num_slices = max(1, int(np.ceil(np.sqrt(np.ceil(n / cap)))))
+        slice_size = num_slices * cap
+        order = np.argsort(centers[:, 0], kind="stable")
+        slice_ids = np.arange(n) // slice_size
+        order = order[np.lexsort((centers[order, 1], slice_ids))]
+
+        levels = [xyxy[order]]
+        while len(levels[-1]) > 1:
+            child = levels[-1]
+            starts = np.arange(0, len(child), cap)
+            levels.append(
+                np.concatenate(
+                    [
+                        np.minimum.reduceat(child[:, :2], starts),
+                        np.maximum.reduceat(child[:, 2:], starts),
+                    ],
+                    axis=1,
+                )
+            )
+        return order, levels
+
+    def _build(self):
+        self._order, self._levels = self._pack(self.xyxy)
+        centers = self.centers()
+        self._center_order, self._center_levels = self._pack(
+            np.concatenate([centers, centers], axis=1)
+        )
+
+    def _children(self, nodes: np.ndarray, num_children: int) -> np.ndarray:
+        cap = self.node_capacity
+        return _ragged_arange(nodes * cap, np.minimum((nodes + 1) * cap, num_children))
+
+    def _search(self, node_test, leaf_test) -> np.ndarray:
+        if len(self.xyxy) == 0:
+            return np.empty(0, dtype=np.int64)
+        nodes = np.arange(len(self._levels[-1]))
+        for level in range(len(self._levels) - 1, 0, -1):
+            nodes = nodes[node_test(self._levels[level][nodes])]
+            nodes = self._children(nodes, len(self._levels[level - 1]))
+        nodes = nodes[leaf_test(self._levels[0][nodes])]
+        return np.sort(self._order[nodes])
+
+    def query(self, box) -> np.ndarray:
+        """Finds the boxes overlapping a region
+
+        :param box: (xmin, ymin, xmax, ymax) of the region
+        :type box: sequence of float
+
+        :returns: sorted ids of the overlapping boxes
+        :rtype: numpy.ndarray
+        """
+        test = lambda bounds: _overlapping(bounds, box)
+        return self._search(test, test)
+
+    def join(self, boxes) -> tuple[np.ndarray, np.ndarray]:
+        regions = _as_xyxy(boxes)
+        if len(regions) == 0 or len(self.xyxy) == 0:
+            return _no_pairs()
+        # Every level is searched for all regions at once, on (region, node)
+        # pairs that survived the level above
+        roots = len(self._levels[-1])
+        region = np.repeat(np.arange(len(regions)), roots)
+        nodes = np.tile(np.arange(roots), len(regions))
+        for level in range(len(self._levels) - 1, 0, -1):
+            keep = _overlapping(self._levels[level][nodes], regions[region])
+            region, nodes = region[keep], nodes[keep]
+            lo = nodes * self.node_capacity
+            hi = np.minimum(lo + self.node_capacity, len(self._levels[level - 1]))
+            region = np.repeat(region, hi - lo)
+            nodes = _ragged_arange(lo, hi)
+        keep = _overlapping(self._levels[0][nodes], regions[region])
+        return region[keep], self._order[nodes[keep]]
+
+    def query_point(self, x: float, y: float) -> np.ndarray:
+        """Finds the boxes containing a point
+
+        :param x: x coordinate of the point
+        :type x: float
+
+        :param y: y coordinate of the point
+        :type y: float
+
+        :returns: sorted ids of the boxes containing the point
+        :rtype: numpy.ndarray
+        """
+        return self._search(
+            lambda bounds: _overlapping(bounds, (x, y, x, y)),
+            lambda bounds: _containing(bounds, x, y),
+        )
+
+    def nearest_center(self, x: float, y: float) -> int:
+        """Finds the box whose center is closest to a point. At every level,
+        nodes that are further away than the farthest corner of some other
+        node cannot hold the nearest center and are pruned.
+
+        :param x: x coordinate of the point
+        :type x: float
+
+        :param y: y coordinate of the point
+        :type y: float
+
+        :returns: id of the nearest box, or -1 if the index is empty
+        :rtype: int
+        """
+        if len(self.xyxy) == 0:
+            return -1
+        levels = self._center_levels
+        nodes = np.arange(len(levels[-1]))
+        for level in range(len(levels) - 1, 0, -1):
+            bounds = levels[level][nodes]
+            near_x = np.clip(x, bounds[:, 0], bounds[:, 2]) - x
+            near_y = np.clip(y, bounds[:, 1], bounds[:, 3]) - y
+            far_x = np.maximum(np.abs(bounds[:, 0] - x), np.abs(bounds[:, 2] - x))
+            far_y = np.maximum(np.abs(bounds[:, 1] - y), np.abs(bounds[:, 3] - y))
+            min_dist = near_x**2 + near_y**2
+            nodes = nodes[min_dist <= np.min(far_x**2 + far_y**2)]
+            nodes = self._children(nodes, len(levels[level - 1]))
+        points = levels[0][nodes]
+        dist = (points[:, 0] - x) ** 2 + (points[:, 1] - y) ** 2
+        return int(self._center_order[nodes[np.argmin(dist)]])
+
+
+def match_boxes(
+    detections: BoxArray,
+    ground_truth: BoxArray,
+    iou_threshold: float = 0.5,
+    difficult: np.ndarray = None,
+    index: _SpatialIndex = None,
+) -> np.ndarray:
+    """Matches detections to ground truth boxes the way VOC evaluation does
+
+    Detections are visited in order of decreasing confidence. Each one
+    takes the ground truth box of the same label it overlaps most, if the
+    IoU reaches the threshold and that box is not already taken. The
+    assignment is vectorized: of all the detections whose best box is the
+    same, the most confident one wins. Like VOC, a detection whose best box
+    is difficult is ignored, whether or not another detection hit that box
+    first, and difficult boxes are never taken.
+
+    Without an index the full IoU matrix is computed, which is fastest for
+    the tens of boxes of a VOC image. With an index only the overlapping
+    pairs found by :meth:`GridIndex.join` are compared, which wins on
+    dense scenes of thousands of boxes, see :mod:`yolo.bench.spatial`.
+
+    :param detections: detected boxes, optionally with ``conf`` and ``labels``
+    :type detections: :class:`BoxArray`
+
+    :param ground_truth: ground truth boxes, with ``labels`` if the
+                         detections have them
+    :type ground_truth: :class:`BoxArray`
+
+    :param iou_threshold: minimum IoU of a match, above 0
+    :type iou_threshold: float
+
+    :param difficult: (M,) mask of the ground truth boxes to ignore
+    :type difficult: numpy.ndarray
+
+    :param index: empty index to load the ground truth into
+    :type index: :class:`GridIndex` or :class:`RTreeIndex`
+
+    :returns: (N,) array with the matched ground truth id of every
+              detection, -1 for false positives and :data:`IGNORED` for
+              detections of difficult boxes
+    :rtype: numpy.ndarray
+    """
+    if index is not None and len(index):
+        raise ValueError("match_boxes needs an empty index")
+    detections = detections.numpy()
+    ground_truth = ground_truth.numpy()
+    matches = np.full(len(detections), -1, dtype=np.int64)
+    if len(detections) == 0 or len(ground_truth) == 0:
+        return matches
+    use_labels = detections.labels is not None and ground_truth.labels is not None
+
+    if index is None:
+        iou = np.asarray(detections.iou(ground_truth), dtype=np.float64)
+        if use_labels:
+            same = detections.labels[:, None] == ground_truth.labels[None, :]
+            iou = np.where(same, iou, -1.0)
+        best = np.argmax(iou, axis=1)
+        best_iou = iou[np.arange(len(detections)), best]
+    else:
+        index.insert(ground_truth)
+        det_xyxy = _as_xyxy(detections)
+        d, g = index.join(det_xyxy)
+        if use_labels:
+            same = detections.labels[d] == ground_truth.labels[g]
+            d, g = d[same], g[same]
+        iou = _pair_iou(det_xyxy[d], index.xyxy[g])
+        # Best pair of every detection first, ties to the lowest box id like
+        # argmax on the matrix
+        order = np.lexsort((g, -iou, d))
+        d, g, iou = d[order], g[order], iou[order]
+        _, first = np.unique(d, return_index=True)
+        best = np.zeros(len(detections), dtype=np.int64)
+        best_iou = np.full(len(detections), -1.0)
+        best[d[first]] = g[first]
+        best_iou[d[first]] = iou[first]
+
+    if detections.conf is None:
+        order = np.arange(len(detections))
+    else:
+        order = np.argsort(-detections.conf, kind="stable")
+    candidates = order[best_iou[order] >= iou_threshold]
+    if difficult is not None:
+        ignored = np.asarray(difficult, dtype=bool)[best[candidates]]
+        matches[candidates[ignored]] = IGNORED
+        candidates = candidates[~ignored]
+    # np.unique returns the first position of every box, which is the most
+    # confident detection claiming it
+    _, first = np.unique(best[candidates], return_index=True)
+    winners = candidates[first]
+    matches[winners] = best[winners]
+    return matches
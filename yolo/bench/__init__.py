@@ -0,0 +1,203 @@
+import importlib
+import json
+import os
+import platform
+import random
+import socket
+import time
+import statistics
+from typing import Callable
+
+import numpy as np
+import torch
+
+# Suite name -> module with a ``run()`` function returning nested results.
+# A module may define ``QUICK``, the keyword arguments of a shorter run.
+SUITES = {
+    "data": "yolo.bench.data",
+    "collate": "yolo.bench.collate",
+    "model": "yolo.bench.model",
+    "geometry": "yolo.bench.geometry",
+    "render": "yolo.bench.render",
+    "postprocess": "yolo.bench.postprocess",
+    "spatial": "yolo.bench.spatial",
+    "decode": "yolo.bench.decode",
+    "augment": "yolo.bench.augment",
+    "backends": "yolo.bench.backends",
+}
+DEFAULT_SUITES = ("data", "collate", "model", "geometry", "render")
+# Metrics compared against a baseline, by suffix. Latencies regress when
+# they grow, throughputs when they shrink.
+LOWER_IS_BETTER = ("p50_ms",)
+HIGHER_IS_BETTER = ("per_s",)
+REGRESSION_THRESHOLD = 0.10
+
+
+def time_fn(fn: Callable, repeat: int = 50, warmup: int = 5) -> dict:
+    """Times repeated calls of a function.
+
+    :param fn: function to call without arguments
+    :type fn: Callable
+
+    :param repeat: number of timed calls
+    :type repeat: int
+
+    :param warmup: number of untimed calls made first
+    :type warmup: int
+
+    :returns: mean, p50, p90 and p99 latency of a call in milliseconds
+    :rtype: dict
+    """
+    for _ in range(warmup):
+        fn()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+
+    times.sort()
+    percentile = lambda p: times[min(len(times) - 1, int(p * len(times)))]
+    return {
+        "mean_ms": statistics.fmean(times),
+        "p50_ms": percentile(0.50),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def environment() -> dict:
+    """
+    :returns: versions and host details that affect the timings
+    :rtype: dict
+    """
+    return {
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def run_suites(names=DEFAULT_SUITES, quick: bool = False, seed: int = 0) -> dict:
+    """Runs benchmark suites one after the other, each from the same seed
+
+    :param names: names of the suites, see ``SUITES``
+    :type names: Iterable[str]
+
+    :param quick: run the shorter version of the suites that have one
+    :type quick: bool
+
+    :param seed: seed of the random number generators
+    :type seed: int
+
+    :returns: the environment and the results of every suite
+    :rtype: dict
+    """
+    unknown = [name for name in names if name not in SUITES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark suites: {', '.join(unknown)}")
+
+    results = {"environment": environment(), "suites": {}}
+    for name in names:
+        random.seed(seed)
+        np.random.seed(seed)
+        torch.manual_seed(seed)
+        module = importlib.import_module(SUITES[name])
+        kwargs = getattr(module, "QUICK", {}) if quick else {}
+        results["suites"][name] = module.run(**kwargs)
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """
+    :param results: nested results
+    :type results: dict
+
+    :param prefix: prefix of the keys
+    :type prefix: str
+
+    :returns: the numeric leaves keyed by their dotted path
+    :rtype: dict
+    """
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def compare(
+    results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD
+) -> list[dict]:
+    """Finds the metrics that got worse than the baseline by more than the
+    threshold. Metrics missing from either side are skipped.
+
+    :param results: results of :func:`run_suites`
+    :type results: dict
+
+    :param baseline: earlier results of :func:`run_suites`
+    :type baseline: dict
+
+    :param threshold: tolerated relative slowdown
+    :type threshold: float
+
+    :returns: metric name, baseline and current value and relative change
+              of every regression
+    :rtype: list[dict]
+    """
+    current = flatten(results["suites"])
+    previous = flatten(baseline["suites"])
+    regressions = []
+    for metric in sorted(current.keys() & previous.keys()):
+        now, before = current[metric], previous[metric]
+        if metric.endswith(LOWER_IS_BETTER) and before > 0:
+            change = now / before - 1
+        elif metric.endswith(HIGHER_IS_BETTER) and now > 0:
+            change = before / now - 1
+        else:
+            continue
+        if change > threshold:
+            regressions.append(
+                {
+                    "metric": metric,
+                    "baseline": before,
+                    "current": now,
+                    "slowdown": change,
+                }
+            )
+    return regressions
+
+
+def save_results(results: dict, path: str):
+    """
+    :param results: results of :func:`run_suites`
+    :type results: dict
+
+    :param path: JSON file to write
+    :type path: str
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def load_results(path: str) -> dict:
+    """
+    :param path: JSON file written by :func:`save_results`
+    :type path: str
+
+    :returns: the stored results
+    :rtype: dict
+    """
+    with open(path) as file:
+        return json.load(file)
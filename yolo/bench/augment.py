@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import torch
+
+from yolo.augment import BatchAugment
+from yolo.base import BoxArray
+from yolo.bench import time_fn
+from yolo.targets import YoloCollate
+
+INPUT_SIZE = 448
+BOXES_PER_IMAGE = 3
+
+QUICK = {"batch_size": 16, "repeat": 3}
+
+
+def run(batch_size: int = 64, repeat: int = 10) -> dict:
+    """Times :class:`BatchAugment` on a batch of uint8 images, with and
+    without mosaic, against the target encoding it is added to.
+
+    :param batch_size: number of images per batch
+    :type batch_size: int
+
+    :param repeat: number of timed batches
+    :type repeat: int
+
+    :returns: batch latency and images per second of every variant
+    :rtype: dict
+    """
+    rng = np.random.default_rng(0)
+    images = torch.randint(
+        0, 256, (batch_size, 3, INPUT_SIZE, INPUT_SIZE), dtype=torch.uint8
+    )
+    boxes = []
+    for _ in range(batch_size):
+        xy = rng.uniform(0, 300, (BOXES_PER_IMAGE, 2))
+        wh = rng.uniform(20, 140, (BOXES_PER_IMAGE, 2))
+        xyxy = np.concatenate([xy, xy + wh], axis=1).astype(np.float32)
+        boxes.append(
+            BoxArray(xyxy, "xyxy", labels=rng.integers(0, 20, BOXES_PER_IMAGE))
+        )
+
+    collate = YoloCollate()
+    variants = {
+        "encode": lambda: collate.encode(boxes),
+        "augment": lambda: BatchAugment()(images, boxes),
+        "augment_mosaic": lambda: BatchAugment(mosaic=0.5)(images, boxes),
+    }
+    results = {}
+    for name, fn in variants.items():
+        timing = time_fn(fn, repeat=repeat, warmup=1)
+        timing["images_per_s"] = batch_size / timing["p50_ms"] * 1000
+        results[name] = timing
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,94 @@
+import gc
+import json
+import logging
+import os
+import tempfile
+
+import torch
+
+from yolo.backends import _import_onnxruntime, export_onnx, open_backend
+from yolo.bench import time_fn
+from yolo.bench.model import load_model_config
+from yolo.model import Yolo
+from yolo.targets import YoloCollate
+
+QUICK = {"batch_size": 1, "repeat": 2}
+
+
+def _max_diff(a: torch.Tensor, b: torch.Tensor) -> float:
+    return (a.float() - b.float()).abs().max().item()
+
+
+def run(
+    batch_size: int = 4,
+    repeat: int = 5,
+    threads: int = None,
+    config_path: str = None,
+    backends: tuple[str, ...] = ("torch", "torchscript", "onnxruntime"),
+) -> dict:
+    """Times the inference of the configured :class:`Yolo` model in every
+    backend of :mod:`yolo.backends`, on the same weights and inputs.
+
+    :param batch_size: number of images per batch
+    :type batch_size: int
+
+    :param repeat: number of timed batches
+    :type repeat: int
+
+    :param threads: CPU threads of every backend, their defaults if None
+    :type threads: int
+
+    :param config_path: configuration file, defaults to config/default.toml
+    :type config_path: str
+
+    :param backends: names of the backends, onnxruntime is skipped if it is
+                     not installed
+    :type backends: tuple[str, ...]
+
+    :returns: per backend, the batch latency, the images per second and the
+              largest output difference to the first backend
+    :rtype: dict
+    """
+    config = load_model_config(config_path)
+    collate = YoloCollate.from_config(config)
+    size = collate.image_size
+    images = torch.rand(batch_size, 3, size[1], size[0])
+
+    torch.manual_seed(0)
+    model = Yolo(dict(config, compile=False), logging.getLogger(__name__)).eval()
+    reference = None
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        onnx_path = None
+        if "onnxruntime" in backends:
+            try:
+                _import_onnxruntime()
+                # Exported first, the exporter holds several copies of the
+                # weights at its peak
+                onnx_path = os.path.join(tmp, "yolo.onnx")
+                export_onnx(model, onnx_path)
+            except ImportError as error:
+                results["onnxruntime"] = {"skipped": str(error)}
+
+        for name in backends:
+            if name in results:
+                continue
+            if name == "onnxruntime":
+                backend = open_backend(name, path=onnx_path, threads=threads)
+            else:
+                backend = open_backend(name, model, threads=threads)
+            outputs = backend.predict(images)
+            forward = time_fn(lambda: backend.predict(images), repeat=repeat, warmup=1)
+            forward["images_per_s"] = batch_size / forward["p50_ms"] * 1000
+            results[name] = {"forward": forward}
+            if reference is None:
+                reference = outputs
+            else:
+                results[name]["max_output_diff"] = _max_diff(outputs, reference)
+            del backend
+            gc.collect()
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
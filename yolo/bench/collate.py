@@ -0,0 +1,51 @@
+import json
+
+import numpy as np
+import torch
+
+from yolo.annotations import AnnotationTarget
+from yolo.bench import time_fn
+from yolo.targets import YoloCollate
+
+INPUT_SIZE = 448
+BOXES_PER_IMAGE = 3
+
+QUICK = {"repeat": 5}
+
+
+def run(batch_size: int = 64, repeat: int = 20) -> dict:
+    """Times :class:`YoloCollate` on a batch of uint8 images: stacking the
+    images and encoding the targets.
+
+    :param batch_size: number of samples per batch
+    :type batch_size: int
+
+    :param repeat: number of timed batches
+    :type repeat: int
+
+    :returns: batch latency and samples per second
+    :rtype: dict
+    """
+    rng = np.random.default_rng(0)
+    samples = []
+    for n in range(batch_size):
+        xy = rng.uniform(0, 300, (BOXES_PER_IMAGE, 2))
+        wh = rng.uniform(20, 200, (BOXES_PER_IMAGE, 2))
+        target = AnnotationTarget(
+            f"{n:06d}",
+            np.concatenate([xy, xy + wh], axis=1).astype(np.float32),
+            rng.integers(0, 20, BOXES_PER_IMAGE),
+            np.zeros(BOXES_PER_IMAGE, dtype=bool),
+            (500, 375),
+        )
+        image = torch.randint(0, 256, (3, INPUT_SIZE, INPUT_SIZE), dtype=torch.uint8)
+        samples.append((image, target))
+
+    collate = YoloCollate()
+    timing = time_fn(lambda: collate(samples), repeat=repeat)
+    timing["samples_per_s"] = batch_size / timing["p50_ms"] * 1000
+    return timing
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
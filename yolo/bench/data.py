@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader
+from torchvision.transforms import v2
+
+from yolo.annotations import AnnotationIndex, IndexedVOCDataset
+from yolo.bench import time_fn
+from yolo.data import collate_fn
+from yolo.decode import DraftDecoder
+
+# Size of a typical VOC image
+SOURCE_SIZE = (500, 375)
+INPUT_SIZE = 448
+ANNOTATION = """<annotation>
+    <filename>{name}.jpg</filename>
+    <size><width>{width}</width><height>{height}</height><depth>3</depth></size>
+    <object>
+        <name>dog</name>
+        <bndbox><xmin>48</xmin><ymin>240</ymin><xmax>195</xmax><ymax>371</ymax></bndbox>
+    </object>
+    <object>
+        <name>person</name>
+        <bndbox><xmin>8</xmin><ymin>12</ymin><xmax>352</xmax><ymax>498</ymax></bndbox>
+    </object>
+</annotation>
+"""
+
+QUICK = {"num_images": 16, "repeat": 2}
+
+
+def write_voc_like(directory: str, num_images: int) -> tuple[list, list]:
+    """Writes VOC sized JPEGs with annotation files
+
+    :param directory: directory to write to
+    :type directory: str
+
+    :param num_images: number of images
+    :type num_images: int
+
+    :returns: image and annotation paths
+    :rtype: tuple (list[str], list[str])
+    """
+    rng = np.random.default_rng(0)
+    width, height = SOURCE_SIZE
+    low = rng.integers(0, 256, (height // 16 + 1, width // 16 + 1, 3), dtype=np.uint8)
+    images, annotations = [], []
+    for n in range(num_images):
+        name = f"{n:06d}"
+        image = Image.fromarray(np.roll(low, n, axis=1)).resize(SOURCE_SIZE)
+        images.append(os.path.join(directory, name + ".jpg"))
+        image.save(images[-1], quality=90)
+        annotations.append(os.path.join(directory, name + ".xml"))
+        with open(annotations[-1], "w") as file:
+            file.write(ANNOTATION.format(name=name, width=width, height=height))
+    return images, annotations
+
+
+def run(num_images: int = 64, batch_size: int = 16, repeat: int = 5) -> dict:
+    """Loads batches of VOC sized images in the main process, the path every
+    DataLoader worker runs: decode, annotation lookup and collate.
+
+    :param num_images: number of images per pass
+    :type num_images: int
+
+    :param batch_size: number of images per batch
+    :type batch_size: int
+
+    :param repeat: number of timed passes
+    :type repeat: int
+
+    :returns: latency of a pass and images per second for float and uint8
+              batches
+    :rtype: dict
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        images, annotations = write_voc_like(directory, num_images)
+        index = AnnotationIndex.build(annotations, num_workers=0)
+        transforms = {
+            "float": v2.Compose([v2.ToImage(), v2.ToDtype(torch.float32, scale=True)]),
+            "uint8": v2.ToImage(),
+        }
+        decode = DraftDecoder((INPUT_SIZE, INPUT_SIZE))
+        for name, transform in transforms.items():
+            dataset = IndexedVOCDataset(images, index, transform, loader=decode)
+            loader = DataLoader(dataset, batch_size, collate_fn=collate_fn)
+            timing = time_fn(lambda: [b for b in loader], repeat=repeat, warmup=1)
+            timing["images_per_s"] = num_images / timing["p50_ms"] * 1000
+            results[name] = timing
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
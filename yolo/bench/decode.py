@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import torch
+from PIL import Image
+from torchvision.transforms import v2
+
+from yolo.bench import time_fn
+from yolo.decode import DraftDecoder
+
+INPUT_SIZE = 448
+# VOC images are about 500x375, camera images are much larger
+SOURCE_SIZES = ((500, 375), (1920, 1080), (4032, 3024))
+
+QUICK = {"images_per_size": 4, "repeat": 2}
+
+
+def _write_jpegs(directory: str, size: tuple[int, int], count: int) -> list[str]:
+    rng = np.random.default_rng(0)
+    width, height = size
+    # Smooth images compress like photos, unlike uniform noise
+    low = rng.integers(0, 256, (height // 16 + 1, width // 16 + 1, 3), dtype=np.uint8)
+    paths = []
+    for n in range(count):
+        image = Image.fromarray(np.roll(low, n, axis=0)).resize(size)
+        path = os.path.join(directory, f"{width}x{height}-{n}.jpg")
+        image.save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def run(images_per_size: int = 16, repeat: int = 5) -> dict:
+    """Compares the transform chain that decodes at full resolution and
+    resizes float tensors with the reduced scale decode that resizes uint8
+    images, on the same JPEG files.
+
+    :param images_per_size: number of images per source size
+    :type images_per_size: int
+
+    :param repeat: number of timed passes over the images
+    :type repeat: int
+
+    :returns: images per second of both paths for every source size
+    :rtype: dict
+    """
+    full = v2.Compose(
+        [
+            v2.ToImage(),
+            v2.ToDtype(torch.float32, scale=True),
+            v2.Resize((INPUT_SIZE, INPUT_SIZE)),
+        ]
+    )
+    decode = DraftDecoder((INPUT_SIZE, INPUT_SIZE))
+    to_float = v2.Compose([v2.ToImage(), v2.ToDtype(torch.float32, scale=True)])
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SOURCE_SIZES:
+            paths = _write_jpegs(directory, size, images_per_size)
+
+            def full_decode():
+                for path in paths:
+                    full(Image.open(path).convert("RGB"))
+
+            def draft_decode():
+                for path in paths:
+                    to_float(decode(path))
+
+            timings = {
+                "full": time_fn(full_decode, repeat=repeat, warmup=1),
+                "draft": time_fn(draft_decode, repeat=repeat, warmup=1),
+            }
+            for t in timings.values():
+                t["images_per_s"] = len(paths) / t["p50_ms"] * 1000
+            timings["speedup"] = timings["full"]["p50_ms"] / timings["draft"]["p50_ms"]
+            results[f"{size[0]}x{size[1]}"] = timings
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
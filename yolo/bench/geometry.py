@@ -0,0 +1,153 @@
+import json
+import random
+
+from cv2.typing import Point as _CvPoint
+
+from yolo.base import Rectangle
+from yolo.bench import time_fn
+
+NUM_PAIRS = 1000
+
+QUICK = {"num_pairs": 200, "repeat": 5}
+
+
+class _LegacyPoint(_CvPoint):
+    """The point implementation before the slotted rewrite, kept only as a
+    reference for the benchmark."""
+
+    def __init__(self, x: float, y: float):
+        self.x = x
+        self.y = y
+
+    def __getitem__(self, item: int):
+        return (self.x, self.y)[item]
+
+    def __len__(self):
+        return 2
+
+
+class _LegacyRectangle:
+    """The rectangle implementation before the slotted rewrite, reduced to
+    the methods the benchmark exercises."""
+
+    def __init__(self, p: tuple[float, float], w: float, h: float, c: float):
+        self.center = _LegacyPoint(p[0], p[1])
+        self.w = w
+        self.h = h
+        self.c = c
+
+    def x(self):
+        return self.center.x
+
+    def y(self):
+        return self.center.y
+
+    def get_top_left(self):
+        return _LegacyPoint(self.x() - self.w / 2, self.y() - self.h / 2)
+
+    def get_bottom_right(self):
+        return _LegacyPoint(self.x() + self.w / 2, self.y() + self.h / 2)
+
+    def get_area(self):
+        return self.w * self.h
+
+    def get_xmin(self):
+        return self.get_top_left().x
+
+    def get_ymin(self):
+        return self.get_top_left().y
+
+    def get_xmax(self):
+        return self.get_bottom_right().x
+
+    def get_ymax(self):
+        return self.get_bottom_right().y
+
+    def intersects(self, other):
+        return (
+            self.get_xmin() <= other.get_xmax()
+            and self.get_xmax() >= other.get_xmin()
+            and self.get_ymin() <= other.get_ymax()
+            and self.get_ymax() >= other.get_ymin()
+        )
+
+    def contains(self, x, y):
+        return (
+            self.get_top_left().x < x
+            and self.get_top_left().y < y
+            and self.get_bottom_right().x > x
+            and self.get_bottom_right().y > y
+        )
+
+    def union_area(self, other):
+        if self.intersects(other):
+            return self.get_area() + other.get_area() - self.int_area(other)
+        else:
+            return self.get_area() + other.get_area()
+
+    def int_area(self, other):
+        if self.intersects(other):
+            top_left = _LegacyPoint(
+                max(self.get_top_left().x, other.get_top_left().x),
+                max(self.get_top_left().y, other.get_top_left().y),
+            )
+            bottom_right = _LegacyPoint(
+                min(self.get_bottom_right().x, other.get_bottom_right().x),
+                min(self.get_bottom_right().y, other.get_bottom_right().y),
+            )
+            return (bottom_right.x - top_left.x) * (bottom_right.y - top_left.y)
+        else:
+            return 0.0
+
+    def iou(self, other):
+        return self.int_area(other) / self.union_area(other)
+
+
+def _random_boxes(cls, count: int, rng: random.Random) -> list:
+    return [
+        cls(
+            (rng.uniform(0, 448), rng.uniform(0, 448)),
+            rng.uniform(10, 200),
+            rng.uniform(10, 200),
+            1.0,
+        )
+        for _ in range(count)
+    ]
+
+
+def run(num_pairs: int = NUM_PAIRS, repeat: int = 20) -> dict:
+    """Compares the legacy and slotted rectangles on ``iou``,
+    ``intersects`` and ``contains``.
+
+    :param num_pairs: number of box pairs evaluated per timed call
+    :type num_pairs: int
+
+    :param repeat: number of timed calls
+    :type repeat: int
+
+    :returns: latency statistics per operation and implementation, plus
+              the speedup of the slotted implementation
+    :rtype: dict
+    """
+    results = {}
+    for name, cls in (("legacy", _LegacyRectangle), ("slotted", Rectangle)):
+        rng = random.Random(0)
+        a = _random_boxes(cls, num_pairs, rng)
+        b = _random_boxes(cls, num_pairs, rng)
+        points = [(rng.uniform(0, 448), rng.uniform(0, 448)) for _ in a]
+        pairs = list(zip(a, b))
+        ops = {
+            "iou": lambda: [r.iou(s) for r, s in pairs],
+            "intersects": lambda: [r.intersects(s) for r, s in pairs],
+            "contains": lambda: [r.contains(x, y) for r, (x, y) in zip(a, points)],
+        }
+        for op, fn in ops.items():
+            results.setdefault(op, {})[name] = time_fn(fn, repeat=repeat)
+
+    for op in results.values():
+        op["speedup"] = op["legacy"]["p50_ms"] / op["slotted"]["p50_ms"]
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+
+import torch
+
+from yolo import ROOT_DIR
+from yolo.bench import time_fn
+from yolo.config import Config
+from yolo.loss import YoloLoss
+from yolo.model import Yolo
+from yolo.targets import YoloCollate
+
+# Execution options of every timed mode, see :class:`yolo.model.Yolo`
+MODES = {
+    "eager": {},
+    "channels_last": {"channels_last": True},
+    "fused": {"fuse": True},
+    "channels_last_fused": {"channels_last": True, "fuse": True},
+    "compiled": {"compile": True},
+    "frozen": {},
+    "int8": {},
+}
+# Modes timed for inference only, on the graph of :meth:`Yolo.freeze` and
+# on the model of :meth:`Yolo.quantize` calibrated on the timed batch
+FROZEN = ("frozen",)
+QUANTIZED = ("int8",)
+
+# Larger gradients, the first fully connected layer, are not compared to
+# keep a single extra copy of the gradients in memory
+MAX_COMPARED = 1 << 22
+
+QUICK = {
+    "batch_size": 1,
+    "repeat": 2,
+    "modes": ("eager", "channels_last", "fused", "frozen"),
+}
+
+
+def load_model_config(config_path: str = None) -> dict:
+    """
+    :param config_path: configuration file, defaults to config/default.toml
+    :type config_path: str
+
+    :returns: the ``[model]`` section
+    :rtype: dict
+    """
+    config_path = config_path or os.path.join(ROOT_DIR, "config", "default.toml")
+    return Config(config_path)["model"]
+
+
+def _max_diff(a: torch.Tensor, b: torch.Tensor) -> float:
+    return (a.float() - b.float()).abs().max().item()
+
+
+def run(
+    batch_size: int = 4,
+    repeat: int = 5,
+    config_path: str = None,
+    modes: tuple[str, ...] = tuple(MODES),
+) -> dict:
+    """Times the forward pass and a full training step (forward, loss and
+    backward) of the configured :class:`Yolo` model on the CPU, in every
+    execution mode.
+
+    Every mode runs with the weights of the eager model, and reports the
+    largest difference of its inference outputs and of its training
+    gradients to eager.
+
+    :param batch_size: number of images per batch
+    :type batch_size: int
+
+    :param repeat: number of timed batches
+    :type repeat: int
+
+    :param config_path: configuration file, defaults to config/default.toml
+    :type config_path: str
+
+    :param modes: names of the modes out of :data:`MODES`
+    :type modes: tuple[str, ...]
+
+    :returns: per mode, the batch latency and images per second of both
+              passes, only of the forward pass for frozen and quantized modes, and the
+              differences to eager
+    :rtype: dict
+    """
+    config = load_model_config(config_path)
+    collate = YoloCollate.from_config(config)
+    criterion = YoloLoss(collate.grid_size, collate.num_boxes, collate.num_classes)
+
+    size = collate.image_size
+    images = torch.rand(batch_size, 3, size[1], size[0])
+    s = collate.grid_size
+    targets = torch.rand(batch_size, s, s, collate.num_boxes * 5 + collate.num_classes)
+    mask = torch.rand(batch_size, s, s) > 0.8
+
+    options = ("channels_last", "fuse", "compile")
+    eager_config = {k: v for k, v in config.items() if k not in options}
+    reference = None
+    results = {}
+    for name in modes:
+        # Same seed, same weights, without holding a copy of them
+        torch.manual_seed(0)
+        model = Yolo({**eager_config, **MODES[name]}, logging.getLogger(__name__))
+
+        def train_step():
+            model.zero_grad(set_to_none=True)
+            criterion(model(images), targets, mask).backward()
+
+        model.eval()
+        if name in FROZEN + QUANTIZED:
+            if name in FROZEN:
+                net = model.freeze(batch_size, optimize=True)
+            else:
+                net = model.quantize([images]).predict
+            del model
+            outputs = net(images)
+            forward = time_fn(lambda: net(images), repeat=repeat, warmup=1)
+            forward["images_per_s"] = batch_size / forward["p50_ms"] * 1000
+            results[name] = {"forward": forward}
+            if reference is not None:
+                results[name]["max_output_diff"] = _max_diff(outputs, reference[0])
+            del net
+            continue
+        outputs = model.predict(images)
+        forward = time_fn(lambda: model.predict(images), repeat=repeat, warmup=1)
+        # Dropout is off, so the gradients are comparable between modes
+        train_step()
+        grads = [
+            p.grad.clone() for p in model.parameters() if p.numel() <= MAX_COMPARED
+        ]
+        model.train()
+        backward = time_fn(train_step, repeat=repeat, warmup=1)
+        for timing in (forward, backward):
+            timing["images_per_s"] = batch_size / timing["p50_ms"] * 1000
+        results[name] = {"forward": forward, "train_step": backward}
+        if reference is None:
+            reference = (outputs, grads)
+        else:
+            results[name]["max_output_diff"] = _max_diff(outputs, reference[0])
+            results[name]["max_grad_diff"] = max(
+                _max_diff(g, r) for g, r in zip(grads, reference[1])
+            )
+        del model, grads
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,46 @@
+import json
+
+import torch
+
+from yolo.bench import time_fn
+from yolo.postprocess import (
+    postprocess,
+    DEFAULT_GRID_SIZE,
+    DEFAULT_NUM_BOXES,
+    DEFAULT_NUM_CLASSES,
+)
+
+TARGET_MS_PER_IMAGE = 1.0
+
+QUICK = {"repeat": 10}
+
+
+def run(batch_size: int = 64, repeat: int = 50) -> dict:
+    """Benchmarks decoding and NMS of a 7x7x30 head on the CPU.
+
+    :param batch_size: number of images per batch
+    :type batch_size: int
+
+    :param repeat: number of timed batches
+    :type repeat: int
+
+    :returns: batch latency statistics plus the per-image latency
+    :rtype: dict
+    """
+    torch.manual_seed(0)
+    depth = DEFAULT_NUM_BOXES * 5 + DEFAULT_NUM_CLASSES
+    outputs = torch.rand(batch_size, DEFAULT_GRID_SIZE, DEFAULT_GRID_SIZE, depth)
+    # Most cells of a trained network are confident there is no object
+    confidences = outputs[..., 4 : DEFAULT_NUM_BOXES * 5 : 5]
+    outputs[..., 4 : DEFAULT_NUM_BOXES * 5 : 5] = confidences**4
+    outputs = outputs.flatten(1)
+
+    stats = time_fn(lambda: postprocess(outputs), repeat=repeat)
+    stats["batch_size"] = batch_size
+    stats["ms_per_image"] = stats["p50_ms"] / batch_size
+    stats["target_ms_per_image"] = TARGET_MS_PER_IMAGE
+    return stats
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+
+from yolo.base import BoxArray
+from yolo.bench import time_fn
+from yolo.utils import draw_bbox_on_image, generate_grid_cells, render_overlays
+from yolo.utils.images import GRID_COLOR
+
+IMAGE_SIZE = 448
+BOXES_PER_IMAGE = 10
+
+QUICK = {"batch_size": 8, "repeat": 3}
+
+
+def run(batch_size: int = 64, repeat: int = 10) -> dict:
+    """Compares drawing grids and boxes image by image, the way
+    ``draw_grid_on_image`` used to, with the batched renderer.
+
+    :param batch_size: number of images per batch
+    :type batch_size: int
+
+    :param repeat: number of timed batches
+    :type repeat: int
+
+    :returns: batch latency of both paths and the speedup
+    :rtype: dict
+    """
+    rng = np.random.default_rng(0)
+    images = rng.integers(
+        0, 256, (batch_size, IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.uint8
+    )
+    out = np.empty_like(images)
+    grid = generate_grid_cells((IMAGE_SIZE, IMAGE_SIZE), (7, 7))
+    boxes = []
+    for _ in range(batch_size):
+        centers = rng.uniform(0, IMAGE_SIZE, (BOXES_PER_IMAGE, 2))
+        sizes = rng.uniform(10, 200, (BOXES_PER_IMAGE, 2))
+        labels = rng.integers(0, 20, BOXES_PER_IMAGE)
+        data = np.concatenate([centers, sizes], axis=1)
+        boxes.append(BoxArray(data, "cxcywh", labels=labels))
+    rects = [b.to_rects() for b in boxes]
+
+    def per_image():
+        # The grid loop of draw_grid_on_image before the Grid rewrite, which
+        # repainted full lines for every cell
+        for image, image_rects in zip(out, rects):
+            for i in range(grid.shape[0]):
+                for j in range(grid.shape[1]):
+                    image[:, i * grid.cell_width] = GRID_COLOR
+                    image[j * grid.cell_height, :] = GRID_COLOR
+                    image[:, i * grid.cell_width] = GRID_COLOR
+                    image[j * grid.cell_height, :] = GRID_COLOR
+            draw_bbox_on_image(image, image_rects, draw_midpoint=False)
+
+    def batched():
+        render_overlays(out, boxes, grid)
+
+    results = {
+        "per_image": time_fn(per_image, repeat=repeat),
+        "batched": time_fn(batched, repeat=repeat),
+    }
+    results["speedup"] = results["per_image"]["p50_ms"] / results["batched"]["p50_ms"]
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,103 @@
+import json
+
+import numpy as np
+
+from yolo.base import BoxArray, GridIndex, RTreeIndex, match_boxes
+from yolo.bench import time_fn
+
+IMAGE_SIZE = (448, 448)
+# Cells of 14 pixels, about the median box size of the scenes
+GRID_SIZE = (32, 32)
+NUM_CLASSES = 20
+# Regions compared with the linear scan at once, which bounds its memory
+SCAN_CHUNK = 1024
+# Largest scene matched with the dense IoU matrix
+MAX_DENSE = 4000
+
+QUICK = {"counts": (100, 1000), "repeat": 3}
+
+
+def _dense_scene(count: int, rng: np.random.Generator) -> BoxArray:
+    centers = rng.uniform(0, IMAGE_SIZE[0], size=(count, 2))
+    sizes = rng.uniform(4, 48, size=(count, 2))
+    return BoxArray(
+        np.concatenate([centers, sizes], axis=1),
+        "cxcywh",
+        conf=rng.uniform(size=count),
+        labels=rng.integers(NUM_CLASSES, size=count),
+    )
+
+
+def _linear_join(regions: np.ndarray, xyxy: np.ndarray):
+    pairs = []
+    for start in range(0, len(regions), SCAN_CHUNK):
+        q = regions[start : start + SCAN_CHUNK, None]
+        mask = (
+            (xyxy[:, 0] <= q[..., 2])
+            & (xyxy[:, 2] >= q[..., 0])
+            & (xyxy[:, 1] <= q[..., 3])
+            & (xyxy[:, 3] >= q[..., 1])
+        )
+        pairs.append(np.nonzero(mask))
+    return pairs
+
+
+def run(counts: tuple[int, ...] = (100, 1000, 4000, 20000), repeat: int = 5) -> dict:
+    """Times overlap joins and detection matching against a linear scan as
+    the number of boxes in the scene grows.
+
+    Both sides of a scene hold ``count`` boxes: every detection is looked
+    up among as many ground truth boxes. The scan grows with the product of
+    the two, the indices with the number of overlapping pairs.
+
+    :param counts: numbers of boxes per scene
+    :type counts: tuple (int, ...)
+
+    :param repeat: number of timed calls
+    :type repeat: int
+
+    :returns: latency per scene size of the overlap join and of
+              :func:`yolo.base.match_boxes`, by method
+    :rtype: dict
+    """
+    results = {}
+    for count in counts:
+        rng = np.random.default_rng(0)
+        ground_truth = _dense_scene(count, rng)
+        detections = _dense_scene(count, rng)
+        xyxy = ground_truth.xyxy()
+        regions = detections.xyxy()
+
+        grid = GridIndex(IMAGE_SIZE, GRID_SIZE)
+        grid.insert(ground_truth)
+        rtree = RTreeIndex()
+        rtree.insert(ground_truth)
+
+        result = {
+            "join": {
+                "linear": time_fn(
+                    lambda: _linear_join(regions, xyxy), repeat=repeat, warmup=1
+                ),
+                "grid": time_fn(lambda: grid.join(regions), repeat=repeat, warmup=1),
+                "rtree": time_fn(lambda: rtree.join(regions), repeat=repeat, warmup=1),
+            },
+            "match": {
+                "grid": time_fn(
+                    lambda: match_boxes(
+                        detections, ground_truth, index=GridIndex(IMAGE_SIZE, GRID_SIZE)
+                    ),
+                    repeat=repeat,
+                    warmup=1,
+                ),
+            },
+        }
+        if count <= MAX_DENSE:
+            result["match"]["dense"] = time_fn(
+                lambda: match_boxes(detections, ground_truth), repeat=repeat, warmup=1
+            )
+        results[count] = result
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
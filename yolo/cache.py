@@ -0,0 +1,253 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Sequence
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from torchvision.datasets import VOCDetection
+from torchvision.transforms import v2
+
+from yolo.annotations import AnnotationIndex, AnnotationTarget
+from yolo.decode import RESAMPLE, DraftDecoder
+from yolo.utils.io import files_key
+
+CACHE_VERSION = 3
+INDEX_FILE = "index.json"
+SHARD_FILE = "images.u8"
+ANNOTATIONS_FILE = "annotations.npz"
+
+
+def cache_key(
+    image_paths: Sequence[str],
+    annotation_paths: Sequence[str],
+    image_size: tuple[int, int],
+) -> str:
+    """Hashes everything a cache depends on: the transform parameters and
+    the name, size and modification time of every source file
+
+    :param image_paths: paths of the source images
+    :type image_paths: Sequence[str]
+
+    :param annotation_paths: paths of the VOC annotation files
+    :type annotation_paths: Sequence[str]
+
+    :param image_size: (width, height) the images are resized to
+    :type image_size: tuple (int, int)
+
+    :returns: hex digest identifying the cache contents
+    :rtype: str
+    """
+    params = {
+        "version": CACHE_VERSION,
+        "image_size": list(image_size),
+        "resample": int(RESAMPLE),
+    }
+    return files_key((*image_paths, *annotation_paths), params)
+
+
+def build_shard_cache(
+    image_paths: Sequence[str],
+    annotation_paths: Sequence[str],
+    cache_dir: str,
+    image_size: tuple[int, int] = (448, 448),
+    num_threads: int = 8,
+) -> str:
+    """Decodes and resizes every image once into a single uint8 shard file.
+
+    Every sample takes the same number of bytes, so the index only needs
+    the byte offset of every sample, and the annotations are stored next
+    to the shard as an :class:`AnnotationIndex`. All files are written
+    under temporary names and renamed once complete, so an interrupted
+    build never leaves a valid looking cache behind.
+
+    :param image_paths: paths of the source images
+    :type image_paths: Sequence[str]
+
+    :param annotation_paths: paths of the VOC annotation files, one per image
+    :type annotation_paths: Sequence[str]
+
+    :param cache_dir: directory to write the cache to
+    :type cache_dir: str
+
+    :param image_size: (width, height) to resize the images to
+    :type image_size: tuple (int, int)
+
+    :param num_threads: number of threads decoding images
+    :type num_threads: int
+
+    :returns: path of the cache index
+    :rtype: str
+    """
+    if len(image_paths) != len(annotation_paths):
+        raise ValueError("Every image needs exactly one annotation file")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    image_size = (int(image_size[0]), int(image_size[1]))
+    width, height = image_size
+    stride = width * height * 3
+    count = len(image_paths)
+    key = cache_key(image_paths, annotation_paths, image_size)
+
+    shard_path = os.path.join(cache_dir, SHARD_FILE)
+    tmp_shard = shard_path + ".tmp"
+    shard = np.memmap(tmp_shard, np.uint8, "w+", shape=(max(count, 1), stride))
+    with ThreadPoolExecutor(max(num_threads, 1)) as pool:
+        decode = DraftDecoder(image_size, RESAMPLE)
+        decoded = pool.map(lambda p: np.asarray(decode(p)), image_paths)
+        for n, pixels in enumerate(decoded):
+            shard[n] = pixels.reshape(-1)
+    shard.flush()
+    del shard
+    os.replace(tmp_shard, shard_path)
+
+    annotations = AnnotationIndex.build(annotation_paths)
+    annotations.save(os.path.join(cache_dir, ANNOTATIONS_FILE))
+
+    index = {
+        "key": key,
+        "count": count,
+        "width": width,
+        "height": height,
+        "stride": stride,
+        "offsets": [n * stride for n in range(count)],
+    }
+    index_path = os.path.join(cache_dir, INDEX_FILE)
+    _write_json(index_path, index)
+    return index_path
+
+
+def _write_json(path: str, data):
+    with open(path + ".tmp", "w") as file:
+        json.dump(data, file)
+    os.replace(path + ".tmp", path)
+
+
+def read_index(cache_dir: str) -> dict:
+    """
+    :param cache_dir: directory of the cache
+    :type cache_dir: str
+
+    :returns: the cache index, or None if there is no complete cache
+    :rtype: dict
+    """
+    try:
+        with open(os.path.join(cache_dir, INDEX_FILE)) as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class ShardCacheDataset(Dataset):
+    """Dataset reading the samples of a shard cache straight from a memory
+    map.
+
+    Images are returned as (3, H, W) views into the mapped file, so reading
+    a sample costs no decode and no copy until the transform runs. The map
+    is opened lazily, so every DataLoader worker maps the file itself
+    instead of pickling it.
+    """
+
+    def __init__(self, cache_dir: str, transform: Callable = None):
+        """Constructor for a dataset over an existing cache
+
+        :param cache_dir: directory of the cache
+        :type cache_dir: str
+
+        :param transform: applied to the (3, H, W) uint8 image tensor, by
+                          default it is converted to float in [0, 1]
+        :type transform: Callable
+
+        :returns: instance of the ShardCacheDataset class
+        :rtype: :class:`ShardCacheDataset`
+        """
+        index = read_index(cache_dir)
+        if index is None:
+            raise FileNotFoundError(f"No shard cache in {cache_dir}")
+        self.annotations = AnnotationIndex.load(
+            os.path.join(cache_dir, ANNOTATIONS_FILE)
+        )
+
+        self.cache_dir = cache_dir
+        self.key = index["key"]
+        self.shape = (index["height"], index["width"], 3)
+        self.stride = index["stride"]
+        self.offsets = np.asarray(index["offsets"], dtype=np.int64)
+        if transform is None:
+            transform = v2.ToDtype(torch.float32, scale=True)
+        self.transform = transform
+        self._data = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+    def _map(self) -> np.memmap:
+        if self._data is None:
+            # Copy-on-write keeps the views writable for torch without ever
+            # touching the file
+            path = os.path.join(self.cache_dir, SHARD_FILE)
+            self._data = np.memmap(path, np.uint8, "c")
+        return self._data
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def image(self, index: int) -> torch.Tensor:
+        """
+        :param index: sample index
+        :type index: int
+
+        :returns: (3, H, W) uint8 view of the cached image
+        :rtype: torch.Tensor
+        """
+        offset = self.offsets[index]
+        pixels = self._map()[offset : offset + self.stride].reshape(self.shape)
+        return torch.from_numpy(pixels).permute(2, 0, 1)
+
+    def __getitem__(self, index: int) -> tuple[torch.Tensor, AnnotationTarget]:
+        image = self.image(index)
+        if self.transform is not None:
+            image = self.transform(image)
+        return image, self.annotations[index]
+
+
+def open_shard_cache(
+    dataset: VOCDetection,
+    cache_dir: str,
+    image_size: tuple[int, int] = (448, 448),
+    transform: Callable = None,
+    logger=None,
+) -> ShardCacheDataset:
+    """Opens the cache of a VOC dataset, building it first if it is missing
+    or was built from other files or transform parameters
+
+    :param dataset: source dataset, anything with ``images`` and
+                    ``annotations`` path lists
+    :type dataset: :class:`torchvision.datasets.VOCDetection` or
+                   :class:`yolo.manifest.VOCSplit`
+
+    :param cache_dir: directory of the cache
+    :type cache_dir: str
+
+    :param image_size: (width, height) to resize the images to
+    :type image_size: tuple (int, int)
+
+    :param transform: applied to the (3, H, W) uint8 image tensors
+    :type transform: Callable
+
+    :param logger: logger to report rebuilds to
+    :type logger: :class:`logging.Logger`
+
+    :returns: dataset reading from the cache
+    :rtype: :class:`ShardCacheDataset`
+    """
+    key = cache_key(dataset.images, dataset.annotations, image_size)
+    index = read_index(cache_dir)
+    if index is None or index["key"] != key:
+        if logger is not None:
+            logger.info(f"Building image cache in {cache_dir}")
+        build_shard_cache(dataset.images, dataset.annotations, cache_dir, image_size)
+    return ShardCacheDataset(cache_dir, transform)
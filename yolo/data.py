@@ -1,27 +1,157 @@
 import os
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 
 import torch
-from torch.utils.data import DataLoader, RandomSampler, SequentialSampler
+from torch.utils.data import (
+    DataLoader,
+    RandomSampler,
+    SequentialSampler,
+    get_worker_info,
+)
 from torch.nn.utils.rnn import pad_sequence
 
-from torchvision.datasets import VOCDetection
 from torchvision.transforms import v2
 
 from yolo import ROOT_DIR
+from yolo.annotations import (
+    AnnotationTarget,
+    IndexedVOCDataset,
+    open_annotation_index,
+)
+from yolo.autotune import LoaderSettings, resolve_settings
+from yolo.cache import open_shard_cache
+from yolo.decode import DraftDecoder
+from yolo.manifest import open_voc_split
+from yolo.memcache import MemoryCachedDataset
+from yolo.shards import DEFAULT_SHUFFLE_BUFFER, TarShardDataset
+
+# The normalization that used to be commented out of the sample transform
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+def stack_images(tensors: Tuple[torch.Tensor, ...]) -> torch.Tensor:
+    """Stacks images into one batch tensor. Inside a DataLoader worker the
+    batch is allocated in shared memory up front, so it is written once and
+    sent to the main process without another copy.
+
+    :param tensors: (3, H, W) images of the same shape and dtype
+    :type tensors: tuple[torch.Tensor]
+
+    :returns: (N, 3, H, W) batch
+    :rtype: torch.Tensor
+    """
+    first = tensors[0]
+    out = torch.empty((len(tensors), *first.shape), dtype=first.dtype)
+    if get_worker_info() is not None:
+        out.share_memory_()
+    return torch.stack([torch.as_tensor(t) for t in tensors], out=out)
 
 
 def collate_fn(
-    data: List[Tuple[torch.Tensor, dict]],
-) -> Tuple[torch.Tensor, Tuple[dict]]:
+    data: List[Tuple[torch.Tensor, AnnotationTarget]],
+) -> Tuple[torch.Tensor, Tuple[AnnotationTarget]]:
     tensors, targets = zip(*data)
-    features = torch.stack(tensors)
+    features = stack_images(tensors)
 
     return features, targets
 
 
+class BatchNormalizer:
+    """Converts and normalizes a whole batch at once.
+
+    With uint8 batches the workers only decode, and the scaling to [0, 1]
+    and the mean/std normalization run here in a single multiply-add over
+    the batch, on the training device if one is given. Float batches in
+    [0, 1] are normalized the same way.
+    """
+
+    def __init__(
+        self,
+        mean: Tuple[float, float, float] = None,
+        std: Tuple[float, float, float] = None,
+        device: torch.device = None,
+        dtype: torch.dtype = torch.float32,
+    ):
+        """Constructor for a normalizer
+
+        :param mean: per channel mean of the [0, 1] images, no shift if None
+        :type mean: tuple (float, float, float)
+
+        :param std: per channel standard deviation, no scaling if None
+        :type std: tuple (float, float, float)
+
+        :param device: device to move the batches to
+        :type device: torch.device
+
+        :param dtype: floating point type of the normalized batches
+        :type dtype: torch.dtype
+
+        :returns: instance of the BatchNormalizer class
+        :rtype: :class:`BatchNormalizer`
+        """
+        mean = torch.tensor(mean or (0.0, 0.0, 0.0), dtype=torch.float64)
+        std = torch.tensor(std or (1.0, 1.0, 1.0), dtype=torch.float64)
+        self.identity = bool((mean == 0).all() and (std == 1).all())
+        self.device = device
+        self.dtype = dtype
+        # x' = (x - mean) / std = x * scale + shift
+        self.scale = (1 / std).view(1, 3, 1, 1).to(dtype)
+        self.shift = (-mean / std).view(1, 3, 1, 1).to(dtype)
+
+    @staticmethod
+    def from_config(config, device: torch.device = None) -> "BatchNormalizer":
+        """
+        :param config: the ``[dataset]`` section of the configuration
+        :type config: dict
+
+        :param device: device to move the batches to
+        :type device: torch.device
+
+        :returns: normalizer with the ImageNet statistics if ``normalize``
+                  is set, otherwise one that only scales uint8 batches
+        :rtype: :class:`BatchNormalizer`
+        """
+        if config.get("normalize", False):
+            return BatchNormalizer(IMAGENET_MEAN, IMAGENET_STD, device)
+        return BatchNormalizer(device=device)
+
+    def __call__(self, images: torch.Tensor) -> torch.Tensor:
+        """
+        :param images: (N, 3, H, W) uint8 batch, or float batch in [0, 1]
+        :type images: torch.Tensor
+
+        :returns: normalized float batch
+        :rtype: torch.Tensor
+        """
+        if self.device is not None:
+            images = images.to(self.device, non_blocking=True)
+        if images.is_floating_point():
+            if self.identity:
+                return images.to(self.dtype)
+            scale = self.scale
+        else:
+            scale = self.scale / 255
+        scale = scale.to(images.device)
+        out = torch.mul(images, scale)
+        if not self.identity:
+            out.add_(self.shift.to(images.device))
+        return out
+
+
 def create_voc_dataloader(
-    batch_size: int, train: bool = True, num_workers: int = 8
+    batch_size: int,
+    train: bool = True,
+    num_workers: int = None,
+    collate: Callable = collate_fn,
+    cache_dir: str = None,
+    uint8: bool = False,
+    backend: str = "files",
+    shards_dir: str = None,
+    shuffle_buffer: int = DEFAULT_SHUFFLE_BUFFER,
+    memory_cache_bytes: int = 0,
+    tune: bool = False,
+    logger=None,
 ) -> DataLoader:
     """
     Create a DataLoader for the VOC dataset.
@@ -29,50 +159,140 @@ def create_voc_dataloader(
         batch_size (int): The batch size for the DataLoader.
         train (bool): If True, create a DataLoader for the training set.
                       If False, create a DataLoader for the validation set.
-        num_workers (int): Number of worker threads to use for data loading.
+        num_workers (int): Number of worker processes to use for data
+                           loading. If None, the settings tuned on this
+                           host for the same configuration are reused, see
+                           :mod:`yolo.autotune`.
+        collate (Callable): Function that merges samples into a batch. It runs
+                            in the worker processes, so pass
+                            :class:`yolo.targets.YoloCollate` to receive
+                            encoded target tensors.
+        cache_dir (str): If given, the images are decoded and resized once
+                         into a memory-mapped cache in this directory,
+                         which is rebuilt whenever the source files change.
+        uint8 (bool): If True, the images stay uint8 in the workers and the
+                      batches must be converted with a
+                      :class:`BatchNormalizer`, which moves 4 times less
+                      data between the processes.
+        backend (str): "files" reads the VOCdevkit files at random, "shards"
+                       streams the tar shards written by
+                       :func:`yolo.shards.convert_voc` sequentially.
+        shards_dir (str): Directory holding one shard directory per split,
+                          defaults to dataset/shards.
+        shuffle_buffer (int): Number of samples mixed in memory when
+                              streaming shards for training.
+        memory_cache_bytes (int): If positive, decoded images of the "files"
+                                  backend are kept in a shared memory cache
+                                  of this size that all workers and epochs
+                                  use, see :mod:`yolo.memcache`. Ignored
+                                  with a ``cache_dir``, whose files are
+                                  already memory mapped.
+        tune (bool): If True, benchmark the candidate worker, prefetch and
+                     thread settings on this dataset first and cache the
+                     fastest for this host.
+        logger (Logger): Logger to report the tuning to.
 
     Returns:
-        DataLoader: A DataLoader for the VOC dataset.
+        DataLoader: A DataLoader for the VOC dataset. The targets are
+                    :class:`yolo.annotations.AnnotationTarget` slices of a
+                    columnar annotation index.
     """
     dataset_dir = os.path.join(ROOT_DIR, "dataset")
     image_set = "train" if train else "val"
-    transform = v2.Compose(
-        [
-            v2.ToImage(),
-            v2.ToDtype(torch.float32, scale=True),
-            v2.Resize((448, 448)),
-            # v2.ConvertImageDtype(torch.float),
-            # v2.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-        ]
-    )
-
-    # dataset = VOCDetection(
-    #     dataset_dir, image_set="train", year="2012", transform=transform
-    # )
-    # dataloader = DataLoader(dataset=dataset, num_workers=8, batch_size=1, shuffle=True)
-
-    # return dataloader
-
-    dataset = VOCDetection(
-        dataset_dir,
-        year="2012",
-        image_set=image_set,
-        download=True,
-        transform=transform,
-    )
-
-    if train:
-        sampler = RandomSampler(dataset)
+    # Decoding at reduced JPEG scale and resizing on uint8 happen in the
+    # loader, so the float conversion only touches the 448x448 pixels
+    decode = DraftDecoder((448, 448))
+    if uint8:
+        # Conversion and normalization run on whole batches in BatchNormalizer
+        transform = v2.ToImage()
+    else:
+        transform = v2.Compose(
+            [
+                v2.ToImage(),
+                v2.ToDtype(torch.float32, scale=True),
+            ]
+        )
+
+    if backend == "shards":
+        shards_dir = shards_dir or os.path.join(dataset_dir, "shards")
+        dataset = TarShardDataset(
+            os.path.join(shards_dir, image_set),
+            (448, 448),
+            transform,
+            shuffle_buffer=shuffle_buffer if train else 0,
+        )
+        sampler = None
+    elif backend == "files":
+        dataset = _files_dataset(
+            dataset_dir, image_set, transform, decode, cache_dir, uint8, logger
+        )
+        if memory_cache_bytes > 0 and not cache_dir:
+            dataset = MemoryCachedDataset(dataset, memory_cache_bytes)
+            if logger is not None:
+                logger.info(
+                    f"Caching up to {len(dataset.cache)} decoded images in memory"
+                )
+        if train:
+            sampler = RandomSampler(dataset)
+        else:
+            sampler = SequentialSampler(dataset)
+    else:
+        raise ValueError(f"Unknown dataset backend: {backend}")
+
+    # Persistent workers would keep streaming the shuffle order of the first
+    # epoch, set_epoch only reaches workers started after it
+    persistent = not hasattr(dataset, "set_epoch")
+
+    def make_loader(settings: LoaderSettings) -> DataLoader:
+        return DataLoader(
+            dataset,
+            batch_size=batch_size,
+            sampler=sampler,
+            pin_memory=torch.cuda.is_available(),
+            collate_fn=collate,
+            **settings.loader_kwargs(persistent),
+        )
+
+    key = f"{backend}:{image_set}:{batch_size}:{'uint8' if uint8 else 'float'}"
+    if backend == "files" and cache_dir:
+        key += ":cached"
+    elif isinstance(dataset, MemoryCachedDataset):
+        key += ":memory"
+    settings = resolve_settings(key, make_loader, num_workers, tune, logger=logger)
+    # Only tuned settings change the threads of the process
+    settings.apply()
+    return make_loader(settings)
+
+
+def _files_dataset(
+    dataset_dir: str,
+    image_set: str,
+    transform: Callable,
+    decode: Callable,
+    cache_dir: str,
+    uint8: bool,
+    logger=None,
+):
+    """Dataset over the VOCdevkit files, downloading them if needed"""
+    # The manifest of the extracted split replaces the archive check of
+    # VOCDetection(download=True) on every launch
+    dataset = open_voc_split(dataset_dir, image_set, logger=logger)
+    if cache_dir:
+        dataset = open_shard_cache(
+            dataset,
+            os.path.join(cache_dir, image_set),
+            (448, 448),
+            transform=v2.Identity() if uint8 else None,
+            logger=logger,
+        )
     else:
-        sampler = SequentialSampler(dataset)
-
-    dataloader = DataLoader(
-        dataset,
-        batch_size=batch_size,
-        sampler=sampler,
-        num_workers=num_workers,
-        pin_memory=torch.cuda.is_available(),
-        collate_fn=collate_fn,
-    )
-
-    return dataloader
+        # Parse the XML of the whole split once instead of on every sample
+        annotations = open_annotation_index(
+            dataset.annotations,
+            os.path.join(dataset_dir, f"voc2012-{image_set}-annotations.npz"),
+            logger=logger,
+        )
+        dataset = IndexedVOCDataset(
+            dataset.images, annotations, transform, loader=decode
+        )
+    return dataset
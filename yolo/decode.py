@@ -0,0 +1,69 @@
+import numpy as np
+import torch
+from PIL import Image
+
+RESAMPLE = Image.Resampling.BILINEAR
+
+
+def decode_image(
+    path, size: tuple[int, int] = (448, 448), resample: int = RESAMPLE
+) -> Image.Image:
+    """Decodes an image straight to the given size.
+
+    JPEG files are decoded at the smallest DCT scale (1/2, 1/4 or 1/8) that
+    still covers ``size``, so the pixels the resize would throw away are
+    never decoded. The remaining resize runs on the 8 bit image.
+
+    :param path: path of the image, or a binary file object
+    :type path: str or file object
+
+    :param size: (width, height) of the decoded image
+    :type size: tuple (int, int)
+
+    :param resample: PIL resampling filter of the final resize
+    :type resample: int
+
+    :returns: RGB image of exactly ``size``
+    :rtype: :class:`PIL.Image.Image`
+    """
+    size = (int(size[0]), int(size[1]))
+    with Image.open(path) as source:
+        source.draft("RGB", size)
+        # convert loads the pixels into a new image, the file can be closed
+        image = source.convert("RGB")
+    if image.size != size:
+        image = image.resize(size, resample)
+    return image
+
+
+class DraftDecoder:
+    """Picklable image loader for datasets and DataLoader workers, see
+    :func:`decode_image`"""
+
+    def __init__(self, size: tuple[int, int] = (448, 448), resample: int = RESAMPLE):
+        """Constructor for a loader decoding to a fixed size
+
+        :param size: (width, height) of the decoded images
+        :type size: tuple (int, int)
+
+        :param resample: PIL resampling filter of the final resize
+        :type resample: int
+
+        :returns: instance of the DraftDecoder class
+        :rtype: :class:`DraftDecoder`
+        """
+        self.size = (int(size[0]), int(size[1]))
+        self.resample = resample
+
+    def __call__(self, path: str) -> Image.Image:
+        return decode_image(path, self.size, self.resample)
+
+    def to_tensor(self, path: str) -> torch.Tensor:
+        """
+        :param path: path of the image
+        :type path: str
+
+        :returns: (3, H, W) uint8 image
+        :rtype: torch.Tensor
+        """
+        return torch.from_numpy(np.asarray(self(path)).copy()).permute(2, 0, 1)
@@ -1,43 +1,416 @@
+import json
 import os
 from logging import Logger
-import torch.nn.functional as F
+
+import torch
+from PIL import Image
 
 from yolo import ROOT_DIR
-from yolo.model import Yolo
+from yolo.backends import InferenceBackend, export_onnx, open_backend
+from yolo.bench import (
+    DEFAULT_SUITES,
+    SUITES,
+    compare,
+    load_results,
+    run_suites,
+    save_results,
+)
+from yolo.model import DEFAULT_INPUT_SIZE, Yolo, save_frozen
 from yolo.config import Config
 from yolo.guru import Guru
-from yolo.data import create_voc_dataloader
+from yolo.autotune import settings_path
+from yolo.augment import BatchAugment
+from yolo.decode import DraftDecoder
+from yolo.data import BatchNormalizer, collate_fn, create_voc_dataloader
+from yolo.loss import YoloLoss
+from yolo.postprocess import postprocess
+from yolo.quantize import format_report, quantization_report
+from yolo.proxy import (
+    DEFAULT_BOOTSTRAP,
+    DEFAULT_PER_CLASS,
+    ProxyEvaluator,
+    open_proxy_subset,
+)
+from yolo.shards import convert_voc
+from yolo.summary import (
+    ConfigError,
+    format_profile,
+    format_summary,
+    infer_layers,
+    profile_modules,
+)
+from yolo.targets import YoloCollate
+
+
+def _loader_options(config) -> dict:
+    """Dataloader options of the ``[dataset]`` section"""
+    options = {
+        "backend": config.get("backend", "files"),
+        "uint8": config.get("uint8_batches", False),
+    }
+    if config.get("cache_dir"):
+        options["cache_dir"] = os.path.join(ROOT_DIR, config["cache_dir"])
+    if config.get("shards_dir"):
+        options["shards_dir"] = os.path.join(ROOT_DIR, config["shards_dir"])
+    if "shuffle_buffer" in config:
+        options["shuffle_buffer"] = config["shuffle_buffer"]
+    if config.get("memory_cache_gb"):
+        options["memory_cache_bytes"] = int(config["memory_cache_gb"] * 2**30)
+    return options
+
+
+def _model_config(args, config) -> dict:
+    """The ``[model]`` section with the execution options given on the
+    command line"""
+    model_config = dict(config["model"])
+    for option in ("channels_last", "fuse", "compile"):
+        value = getattr(args, option, None)
+        if value is not None:
+            model_config[option] = value
+    return model_config
+
+
+def _check_model(model_config: dict, logger: Logger):
+    """Fails before any data is loaded if the layers can not be built"""
+    infos = infer_layers(model_config)
+    params = sum(info.params for info in infos)
+    logger.info(f"Model config checked: {len(infos)} layers, {params:,} parameters")
+
+
+def _build_model(model_config: dict, weights: str, logger: Logger) -> Yolo:
+    """Builds the model around the weights file if one is given, which
+    skips the random initialization"""
+    if weights:
+        return Yolo.from_weights(model_config, weights, logger)
+    return Yolo(model_config, logger)
+
+
+def summarize(args, logger: Logger) -> int:
+    config_path = os.path.join(ROOT_DIR, "config", "default.toml")
+    config = Config(config_path)
+    model_config = _model_config(args, config)
+    try:
+        infos = infer_layers(model_config)
+    except ConfigError as error:
+        logger.error(f"Invalid model config in {config_path}: {error}")
+        return 1
+    logger.info("\n" + format_summary(infos, args.batch_size))
+    if args.profile:
+        model = Yolo(model_config, logger)
+        size = model_config.get("input_size", DEFAULT_INPUT_SIZE)
+        images = torch.rand(args.batch_size, 3, size, size)
+        logger.info("\n" + format_profile(profile_modules(model, images, args.repeat)))
+    return 0
+
+
+def make_shards(args, logger: Logger):
+    config_path = os.path.join(ROOT_DIR, "config", "default.toml")
+    config = Config(config_path)
+    voc_root = args.voc_root or os.path.join(
+        ROOT_DIR, os.path.dirname(config["dataset"]["images_dir"])
+    )
+    shards_dir = args.output or os.path.join(
+        ROOT_DIR, config["dataset"].get("shards_dir", "dataset/shards")
+    )
+    for image_set in args.image_sets:
+        output_dir = os.path.join(shards_dir, image_set)
+        logger.info(f"Writing {image_set} shards of {voc_root} to {output_dir}")
+        shards = convert_voc(voc_root, output_dir, image_set, args.samples_per_shard)
+        logger.info(f"Wrote {len(shards)} shards")
+
+
+def _proxy_evaluator(config, collate: YoloCollate, logger: Logger) -> ProxyEvaluator:
+    """Loads the stratified validation subset of the ``[eval]`` section"""
+    eval_config = config.get("eval", {})
+    options = _loader_options(config["dataset"])
+    # The subset is picked by index, which a stream of shards does not have
+    if options["backend"] == "shards":
+        options["backend"] = "files"
+    options["uint8"] = True
+    dataset = create_voc_dataloader(
+        64, train=False, num_workers=0, logger=logger, **options
+    ).dataset
+    per_class = eval_config.get("proxy_per_class", DEFAULT_PER_CLASS)
+    seed = eval_config.get("proxy_seed", 0)
+    indices = open_proxy_subset(
+        dataset.annotations,
+        os.path.join(ROOT_DIR, "dataset", f"voc2012-val-proxy-{per_class}-{seed}.json"),
+        per_class,
+        seed,
+    )
+    logger.info(f"Loading {len(indices)} proxy evaluation images")
+    return ProxyEvaluator.from_dataset(dataset, indices, collate)
+
+
+def _log_proxy(evaluator: ProxyEvaluator, model, normalize, config, logger: Logger):
+    result = evaluator.evaluate(
+        model,
+        normalize,
+        bootstrap=config.get("eval", {}).get("bootstrap", DEFAULT_BOOTSTRAP),
+    )
+    logger.info(
+        f"Proxy mAP@0.5 on {result['images']} images: {result['map']:.4f} "
+        f"(95% CI {result['ci_low']:.4f}-{result['ci_high']:.4f}, "
+        f"{result['seconds']:.1f} s)"
+    )
+    return result
 
 
 def train_model(args, logger: Logger):
     config_path = os.path.join(ROOT_DIR, "config", "default.toml")
     logger.info(f"Loading config from {config_path}")
     config = Config(config_path)
-    model = Yolo(config["model"], logger)
+    model_config = _model_config(args, config)
+    _check_model(model_config, logger)
+    model = Yolo(model_config, logger)
+    augment_config = config.get("augment", {})
+    augment_mode = augment_config.get("mode", "none")
+    augment = None
+    if augment_mode != "none":
+        augment = BatchAugment.from_config(augment_config)
+    collate = YoloCollate.from_config(config["model"], augment)
+    # In the main process the workers only stack the images, the whole
+    # batch is augmented and encoded by the Guru
+    on_main = augment_mode == "main"
     train_dataloader = create_voc_dataloader(
-        config["train"]["batch_size"], train=True, num_workers=4
+        config["train"]["batch_size"],
+        train=True,
+        collate=collate_fn if on_main else collate,
+        logger=logger,
+        **_loader_options(config["dataset"]),
     )
     logger.info(f"Creating dataloader with {len(train_dataloader)} batches")
-    guru = Guru(logger, model, train_dataloader)
+    criterion = YoloLoss(collate.grid_size, collate.num_boxes, collate.num_classes)
+    normalize = BatchNormalizer.from_config(config["dataset"])
+    prepare = collate.from_batch if on_main else None
+    guru = Guru(logger, model, train_dataloader, criterion, normalize, prepare)
+    proxy_every = config.get("eval", {}).get("proxy_every", 0)
+    evaluator = None
+    if proxy_every > 0:
+        evaluator = _proxy_evaluator(
+            config, YoloCollate.from_config(config["model"]), logger
+        )
 
     for epoch in range(config["train"]["epochs"]):
         logger.info(f"Starting epoch {epoch + 1}/{config['train']['epochs']}")
         avg_loss = guru.train_one_epoch()
         logger.info(f"Epoch {epoch + 1} completed with average loss: {avg_loss:.4f}")
+        if evaluator is not None and (epoch + 1) % proxy_every == 0:
+            _log_proxy(evaluator, model, normalize, config, logger)
 
     logger.info("Training completed")
 
 
+def _inference_backend(args, model_config: dict, logger: Logger) -> InferenceBackend:
+    """Opens the backend of the command line, building the config model
+    only if no model file is given for it"""
+    if args.backend != "torch" and args.model_file:
+        backend = open_backend(args.backend, path=args.model_file, threads=args.threads)
+    else:
+        if args.model_file:
+            logger.warning(
+                f"Ignoring --model-file {args.model_file}, the torch backend runs "
+                "the config model, load weights into it with --weights"
+            )
+        if args.backend != "torch":
+            # The model is traced or exported, which a compiled graph prevents
+            model_config = dict(model_config, compile=False)
+        _check_model(model_config, logger)
+        model = _build_model(model_config, args.weights, logger)
+        backend = open_backend(args.backend, model, threads=args.threads)
+    logger.info(f"Running inference with the {backend.name} backend")
+    return backend
+
+
 def test_model(args, logger: Logger):
     config_path = os.path.join(ROOT_DIR, "config", "default.toml")
     logger.info(f"Loading config from {config_path}")
     config = Config(config_path)
-    model = Yolo(config["model"], logger)
+    model_config = _model_config(args, config)
+    model = _inference_backend(args, model_config, logger)
 
-    eval_dataloader = create_voc_dataloader(64, train=False, num_workers=4)
-    for batch_index, (images, targets) in enumerate(eval_dataloader):
-        outputs = model(images)
-        loss = F.cross_entropy(outputs, targets)
+    collate = YoloCollate.from_config(config["model"])
+    if args.proxy:
+        evaluator = _proxy_evaluator(config, collate, logger)
+        normalize = BatchNormalizer.from_config(config["dataset"])
+        _log_proxy(evaluator, model, normalize, config, logger)
+        return
+
+    criterion = YoloLoss(collate.grid_size, collate.num_boxes, collate.num_classes)
+    eval_dataloader = create_voc_dataloader(
+        64,
+        train=False,
+        collate=collate,
+        logger=logger,
+        **_loader_options(config["dataset"]),
+    )
+    normalize = BatchNormalizer.from_config(config["dataset"])
+    for batch_index, (images, targets, masks) in enumerate(eval_dataloader):
+        outputs = model.predict(normalize(images))
+        loss = criterion(outputs, targets, masks)
         logger.info(f"Batch {batch_index}, Loss: {loss.item()}")
 
     logger.info("Evaluation completed")
+
+
+def _log_detections(path: str, boxes, collate: YoloCollate, logger: Logger):
+    """Logs the detections of an image in the pixels of the image file"""
+    # The image was stretched to the input size like in training, so each
+    # axis is scaled back on its own
+    with Image.open(path) as image:
+        width, height = image.size
+    input_width, input_height = collate.image_size
+    boxes = boxes.numpy().scale(width / input_width, height / input_height)
+    logger.info(f"{path}: {len(boxes)} detections")
+    for box, label, conf in zip(boxes.xyxy(), boxes.labels, boxes.conf):
+        logger.info(
+            f"  {collate.class_names[int(label)]} {conf:.2f} at "
+            + ", ".join(f"{v:.0f}" for v in box)
+        )
+
+
+def predict(args, logger: Logger):
+    config_path = os.path.join(ROOT_DIR, "config", "default.toml")
+    config = Config(config_path)
+    model_config = _model_config(args, config)
+    backend = _inference_backend(args, model_config, logger)
+    collate = YoloCollate.from_config(config["model"])
+    decoder = DraftDecoder(collate.image_size)
+    normalize = BatchNormalizer.from_config(config["dataset"])
+
+    # Batches like ProxyEvaluator.match, so any number of images fits
+    for start in range(0, len(args.images), args.batch_size):
+        paths = args.images[start : start + args.batch_size]
+        images = torch.stack([decoder.to_tensor(path) for path in paths])
+        outputs = backend.predict(normalize(images))
+        detections = postprocess(
+            outputs.flatten(1).float(),
+            collate.grid_size,
+            collate.num_boxes,
+            collate.num_classes,
+            collate.image_size,
+            conf_threshold=args.conf_threshold,
+        )
+        for path, boxes in zip(paths, detections):
+            _log_detections(path, boxes, collate, logger)
+
+
+def export_model(args, logger: Logger):
+    config_path = os.path.join(ROOT_DIR, "config", "default.toml")
+    config = Config(config_path)
+    model_config = dict(config["model"], compile=False)
+    _check_model(model_config, logger)
+    model = _build_model(model_config, args.weights, logger)
+    export_onnx(model, args.output, args.opset)
+    logger.info(f"Exported the model to {args.output}")
+
+
+def freeze_model(args, logger: Logger):
+    config_path = os.path.join(ROOT_DIR, "config", "default.toml")
+    config = Config(config_path)
+    model_config = _model_config(args, config)
+    # A compiled graph can not be traced, the frozen graph is optimized itself
+    model_config["compile"] = False
+    _check_model(model_config, logger)
+    model = _build_model(model_config, args.weights, logger)
+    save_frozen(model.freeze(), args.output)
+    logger.info(f"Saved the frozen model to {args.output}")
+
+
+def quantize_model(args, logger: Logger):
+    config_path = os.path.join(ROOT_DIR, "config", "default.toml")
+    config = Config(config_path)
+    # Quantization needs the plain layers
+    model_config = {
+        k: v
+        for k, v in config["model"].items()
+        if k not in ("channels_last", "fuse", "compile")
+    }
+    _check_model(model_config, logger)
+    fp32 = _build_model(model_config, args.weights, logger)
+    fp32.eval()
+
+    options = _loader_options(config["dataset"])
+    options["uint8"] = True
+    normalize = BatchNormalizer.from_config(config["dataset"])
+    loader = create_voc_dataloader(
+        args.batch_size, train=True, collate=collate_fn, logger=logger, **options
+    )
+    batches = []
+    for images, _ in loader:
+        batches.append(normalize(images))
+        if len(batches) == args.calibration_batches:
+            break
+    logger.info(f"Calibrating on {sum(len(b) for b in batches)} images")
+
+    int8 = Yolo(model_config, logger)
+    int8.load_state_dict(fp32.state_dict())
+    int8.quantize(batches, args.backend)
+    int8.save_weights(args.output)
+
+    evaluator = None
+    collate = YoloCollate.from_config(model_config)
+    if args.proxy:
+        evaluator = _proxy_evaluator(config, collate, logger)
+    report = quantization_report(fp32, int8, batches[0], evaluator, normalize, collate)
+    logger.info("\n" + format_report(report))
+
+
+def tune_loader(args, logger: Logger):
+    config_path = os.path.join(ROOT_DIR, "config", "default.toml")
+    logger.info(f"Loading config from {config_path}")
+    config = Config(config_path)
+    collate = YoloCollate.from_config(config["model"])
+    batch_size = config["train"]["batch_size"] if args.train else 64
+    create_voc_dataloader(
+        batch_size,
+        train=args.train,
+        collate=collate,
+        tune=True,
+        logger=logger,
+        **_loader_options(config["dataset"]),
+    )
+    logger.info(f"Saved the tuned settings to {settings_path()}")
+
+
+def bench(args, logger: Logger) -> int:
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+    suites = args.suites or DEFAULT_SUITES
+    unknown = [name for name in suites if name not in SUITES]
+    if unknown:
+        logger.error(f"Unknown suites {unknown}, choose from {list(SUITES)}")
+        return 1
+    logger.info(f"Running benchmark suites: {', '.join(suites)}")
+    results = run_suites(suites, quick=args.quick)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        save_results(results, args.output)
+
+    baseline_path = args.baseline or os.path.join(ROOT_DIR, "bench", "baseline.json")
+    if args.save_baseline:
+        save_results(results, baseline_path)
+        logger.info(f"Saved baseline to {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        if args.baseline:
+            logger.error(f"Baseline {baseline_path} does not exist")
+            return 1
+        return 0
+
+    baseline = load_results(baseline_path)
+    if baseline["environment"].get("host") != results["environment"]["host"]:
+        logger.warning("The baseline was recorded on another host")
+    regressions = compare(results, baseline, args.threshold)
+    for r in regressions:
+        logger.error(
+            f"{r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} "
+            f"({r['slowdown']:+.1%})"
+        )
+    if regressions:
+        logger.error(
+            f"{len(regressions)} metrics regressed beyond {args.threshold:.0%}"
+        )
+        return 1
+    logger.info(f"No regressions against {baseline_path}")
+    return 0
@@ -1,7 +1,8 @@
 from logging import Logger
+from typing import Callable
+
 import torch.nn as nn
 import torch.optim as optim
-import torch.nn.functional as F
 from torch.utils.data import DataLoader
 from alive_progress import alive_bar
 
@@ -13,14 +14,34 @@ class Guru:
     A Guru or instructor that trains models
     """
 
-    def __init__(self, logger: Logger, model: nn.Module, train_loader: DataLoader):
+    def __init__(
+        self,
+        logger: Logger,
+        model: nn.Module,
+        train_loader: DataLoader,
+        criterion: nn.Module,
+        normalize: Callable = None,
+        prepare: Callable = None,
+    ):
         """
         Initializes the Guru class.
+
+        :param normalize: converts every image batch before the forward
+                          pass, see :class:`yolo.data.BatchNormalizer`
+        :type normalize: Callable
+
+        :param prepare: turns every batch of the loader into images, targets
+                        and masks, e.g. to augment and encode in the main
+                        process with :meth:`yolo.targets.YoloCollate.from_batch`
+        :type prepare: Callable
         """
         self.logger: Logger = logger
         self.optimizer = optim.Adam(model.parameters(), lr=0.001)
+        self.criterion = criterion
         self.train_dset: DataLoader = train_loader
         self.model = model
+        self.normalize = normalize
+        self.prepare = prepare
         self.epoch_index = 0
 
     def train_one_epoch(self):
@@ -29,12 +50,21 @@ class Guru:
         """
         self.model.train()
         self.logger.info("Training for one epoch")
+        # Streaming datasets shuffle differently every epoch
+        set_epoch = getattr(self.train_dset.dataset, "set_epoch", None)
+        if set_epoch is not None:
+            set_epoch(self.epoch_index)
         avg_loss = 0.0
         with alive_bar(len(self.train_dset)) as bar:
-            for batch_index, (images, targets) in enumerate(self.train_dset):
+            for batch_index, batch in enumerate(self.train_dset):
+                if self.prepare is not None:
+                    batch = self.prepare(*batch)
+                images, targets, masks = batch
+                if self.normalize is not None:
+                    images = self.normalize(images)
                 self.optimizer.zero_grad()
                 outputs = self.model(images)
-                loss = F.cross_entropy(outputs, targets)
+                loss = self.criterion(outputs, targets, masks)
                 loss.backward()
                 self.optimizer.step()
                 if batch_index % BATCH_LOG_PERIOD == 0:
@@ -42,5 +72,13 @@ class Guru:
                 avg_loss += loss.item()
                 bar()
         avg_loss /= len(self.train_dset)
+        cache_stats = getattr(self.train_dset.dataset, "cache_stats", None)
+        if cache_stats is not None:
+            stats = cache_stats()
+            self.logger.info(
+                f"Sample cache: {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['evictions']} evictions, {stats['images']} images "
+                f"({stats['bytes'] / 2**20:.0f} MiB)"
+            )
         self.epoch_index += 1
         return avg_loss
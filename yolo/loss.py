@@ -0,0 +1,100 @@
+import torch
+import torch.nn as nn
+
+from yolo.postprocess import DEFAULT_GRID_SIZE, DEFAULT_NUM_BOXES, DEFAULT_NUM_CLASSES
+
+LAMBDA_COORD = 5.0
+LAMBDA_NOOBJ = 0.5
+
+
+def _cell_xyxy(boxes: torch.Tensor, grid_size: int) -> torch.Tensor:
+    """Converts (..., S, S, B, 4) cell-relative boxes to xyxy boxes in
+    fractions of the image"""
+    s = grid_size
+    offsets = torch.arange(s, device=boxes.device, dtype=boxes.dtype)
+    cx = (boxes[..., 0] + offsets.view(s, 1, 1)) / s
+    cy = (boxes[..., 1] + offsets.view(1, s, 1)) / s
+    half_w = boxes[..., 2] / 2
+    half_h = boxes[..., 3] / 2
+    return torch.stack([cx - half_w, cy - half_h, cx + half_w, cy + half_h], -1)
+
+
+class YoloLoss(nn.Module):
+    """Sum-squared YOLO loss over the targets produced by
+    :class:`yolo.targets.YoloCollate`.
+
+    In every cell holding an object, the predicted box that overlaps it
+    most is responsible for it and gets the coordinate and confidence
+    terms; all other boxes are pushed towards zero confidence.
+    """
+
+    def __init__(
+        self,
+        grid_size: int = DEFAULT_GRID_SIZE,
+        num_boxes: int = DEFAULT_NUM_BOXES,
+        num_classes: int = DEFAULT_NUM_CLASSES,
+        lambda_coord: float = LAMBDA_COORD,
+        lambda_noobj: float = LAMBDA_NOOBJ,
+    ):
+        super().__init__()
+        self.grid_size = grid_size
+        self.num_boxes = num_boxes
+        self.num_classes = num_classes
+        self.lambda_coord = lambda_coord
+        self.lambda_noobj = lambda_noobj
+
+    def forward(
+        self, outputs: torch.Tensor, targets: torch.Tensor, mask: torch.Tensor
+    ) -> torch.Tensor:
+        """
+        :param outputs: (N, S*S*(B*5+C)) raw model outputs
+        :type outputs: torch.Tensor
+
+        :param targets: (N, S, S, B*5+C) encoded targets
+        :type targets: torch.Tensor
+
+        :param mask: (N, S, S) object mask
+        :type mask: torch.Tensor
+
+        :returns: loss averaged over the batch
+        :rtype: torch.Tensor
+        """
+        n = outputs.shape[0]
+        s, b = self.grid_size, self.num_boxes
+        preds = outputs.reshape(targets.shape)
+        pred_boxes = preds[..., : b * 5].reshape(n, s, s, b, 5)
+        true_boxes = targets[..., : b * 5].reshape(n, s, s, b, 5)
+
+        with torch.no_grad():
+            p = _cell_xyxy(pred_boxes[..., :4], s)
+            t = _cell_xyxy(true_boxes[..., :4], s)
+            wh = (
+                torch.minimum(p[..., 2:], t[..., 2:])
+                - torch.maximum(p[..., :2], t[..., :2])
+            ).clamp(min=0)
+            inter = wh[..., 0] * wh[..., 1]
+            pred_wh = (p[..., 2:] - p[..., :2]).clamp(min=0)
+            area_p = pred_wh[..., 0] * pred_wh[..., 1]
+            area_t = (t[..., 2] - t[..., 0]) * (t[..., 3] - t[..., 1])
+            iou = inter / (area_p + area_t - inter).clamp(min=1e-9)
+            best = iou.argmax(dim=-1, keepdim=True)
+            responsible = torch.zeros_like(iou, dtype=torch.bool)
+            responsible.scatter_(-1, best, True)
+            responsible &= mask.unsqueeze(-1)
+
+        resp = responsible.to(preds.dtype)
+        signed_sqrt = lambda v: torch.sign(v) * torch.sqrt(v.abs() + 1e-9)
+        xy_loss = ((pred_boxes[..., :2] - true_boxes[..., :2]) ** 2).sum(-1)
+        wh_loss = (
+            (signed_sqrt(pred_boxes[..., 2:4]) - torch.sqrt(true_boxes[..., 2:4])) ** 2
+        ).sum(-1)
+        coord_loss = self.lambda_coord * (resp * (xy_loss + wh_loss)).sum()
+
+        conf = pred_boxes[..., 4]
+        obj_loss = (resp * (conf - iou) ** 2).sum()
+        noobj_loss = self.lambda_noobj * ((1 - resp) * conf**2).sum()
+
+        class_err = ((preds[..., b * 5 :] - targets[..., b * 5 :]) ** 2).sum(-1)
+        class_loss = (mask.to(preds.dtype) * class_err).sum()
+
+        return (coord_loss + obj_loss + noobj_loss + class_loss) / n
@@ -0,0 +1,174 @@
+import json
+import os
+from typing import NamedTuple
+
+from torchvision.datasets import VOCDetection
+
+from yolo.utils.io import files_key
+
+MANIFEST_VERSION = 1
+
+
+class VOCSplit(NamedTuple):
+    """Paths of the images and annotations of one split of an extracted
+    VOCdevkit, in split order. It stands in for
+    :class:`torchvision.datasets.VOCDetection` wherever only the paths are
+    needed."""
+
+    images: list[str]
+    annotations: list[str]
+
+
+def _split_paths(voc_root: str, image_set: str) -> tuple[str, list[str]]:
+    split_file = os.path.join(voc_root, "ImageSets", "Main", image_set + ".txt")
+    with open(split_file) as file:
+        ids = [line.strip() for line in file if line.strip()]
+    return split_file, ids
+
+
+def _fingerprint(voc_root: str, split_file: str) -> str:
+    """Hashes the split file and the two data directories. Adding, removing
+    or renaming a file changes the modification time of its directory, so
+    this catches a changed extraction with three stat calls."""
+    return files_key(
+        [
+            split_file,
+            os.path.join(voc_root, "JPEGImages"),
+            os.path.join(voc_root, "Annotations"),
+        ],
+        {"version": MANIFEST_VERSION},
+    )
+
+
+def write_manifest(voc_root: str, image_set: str, path: str) -> dict:
+    """Lists the files of an extracted split with their sizes and a
+    fingerprint of the extraction, and saves the list atomically
+
+    :param voc_root: year directory of the devkit, e.g.
+                     ``dataset/VOCdevkit/VOC2012``
+    :type voc_root: str
+
+    :param image_set: name of the split in ``ImageSets/Main``
+    :type image_set: str
+
+    :param path: path of the JSON manifest
+    :type path: str
+
+    :returns: the manifest
+    :rtype: dict
+    :raises FileNotFoundError: if a file of the split is missing
+    """
+    split_file, ids = _split_paths(voc_root, image_set)
+    files = {}
+    for i in ids:
+        for name in (f"JPEGImages/{i}.jpg", f"Annotations/{i}.xml"):
+            files[name] = os.path.getsize(os.path.join(voc_root, name))
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "image_set": image_set,
+        "ids": ids,
+        "files": files,
+        "fingerprint": _fingerprint(voc_root, split_file),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as file:
+        json.dump(manifest, file)
+    os.replace(path + ".tmp", path)
+    return manifest
+
+
+def verify_manifest(voc_root: str, manifest: dict, full: bool = False) -> bool:
+    """
+    :param voc_root: year directory of the devkit
+    :type voc_root: str
+
+    :param manifest: manifest written by :func:`write_manifest`
+    :type manifest: dict
+
+    :param full: also compare the size of every file, instead of only the
+                 fingerprint of the split file and data directories
+    :type full: bool
+
+    :returns: whether the extraction still matches the manifest
+    :rtype: bool
+    """
+    if manifest.get("version") != MANIFEST_VERSION:
+        return False
+    split_file = os.path.join(
+        voc_root, "ImageSets", "Main", manifest["image_set"] + ".txt"
+    )
+    try:
+        if manifest["fingerprint"] != _fingerprint(voc_root, split_file):
+            return False
+        if full:
+            for name, size in manifest["files"].items():
+                if os.path.getsize(os.path.join(voc_root, name)) != size:
+                    return False
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def open_voc_split(
+    dataset_dir: str,
+    image_set: str,
+    year: str = "2012",
+    download: bool = True,
+    full_verify: bool = False,
+    logger=None,
+) -> VOCSplit:
+    """Opens a VOC split through its manifest, so a launch never touches
+    the archive or the network once the split was extracted and listed.
+
+    Without a valid manifest the extracted files are listed if they exist,
+    otherwise torchvision downloads and extracts the archive first.
+
+    :param dataset_dir: directory holding ``VOCdevkit``
+    :type dataset_dir: str
+
+    :param image_set: name of the split, e.g. ``train`` or ``val``
+    :type image_set: str
+
+    :param year: year of the challenge
+    :type year: str
+
+    :param download: download the archive if the split is not extracted
+    :type download: bool
+
+    :param full_verify: compare the size of every file with the manifest
+    :type full_verify: bool
+
+    :param logger: logger to report rebuilds to
+    :type logger: :class:`logging.Logger`
+
+    :returns: the image and annotation paths of the split
+    :rtype: :class:`VOCSplit`
+    :raises FileNotFoundError: if the split is missing and ``download`` is
+                               not set
+    """
+    voc_root = os.path.join(dataset_dir, "VOCdevkit", f"VOC{year}")
+    path = os.path.join(dataset_dir, f"voc{year}-{image_set}-manifest.json")
+    manifest = None
+    try:
+        with open(path) as file:
+            manifest = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    if manifest is None or not verify_manifest(voc_root, manifest, full_verify):
+        try:
+            manifest = write_manifest(voc_root, image_set, path)
+        except FileNotFoundError:
+            if not download:
+                raise
+            if logger is not None:
+                logger.info(f"Downloading VOC{year} {image_set} to {dataset_dir}")
+            VOCDetection(dataset_dir, year=year, image_set=image_set, download=True)
+            manifest = write_manifest(voc_root, image_set, path)
+        if logger is not None:
+            logger.info(f"Wrote manifest of {len(manifest['ids'])} samples to {path}")
+
+    return VOCSplit(
+        [os.path.join(voc_root, "JPEGImages", i + ".jpg") for i in manifest["ids"]],
+        [os.path.join(voc_root, "Annotations", i + ".xml") for i in manifest["ids"]],
+    )
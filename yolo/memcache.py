@@ -0,0 +1,170 @@
+import multiprocessing
+
+import torch
+from torch.utils.data import Dataset
+
+from yolo.annotations import IndexedVOCDataset
+
+# Counter slots of SharedImageCache.counters
+HITS, MISSES, EVICTIONS, FILLED, HAND = range(5)
+
+
+class SharedImageCache:
+    """Fixed size cache of decoded uint8 images in shared memory.
+
+    The slots, the index of every slot and the counters are shared tensors
+    allocated in the process that builds the cache, so the DataLoader
+    workers of every epoch read and fill the same cache. Full caches evict
+    with the CLOCK policy: every hit sets the reference bit of its slot and
+    the clock hand clears bits until it finds a slot that was not used
+    since its last pass.
+    """
+
+    def __init__(self, num_images: int, image_shape: tuple[int, ...], max_bytes: int):
+        """Constructor for a cache of the images of a dataset
+
+        :param num_images: number of images of the dataset
+        :type num_images: int
+
+        :param image_shape: (3, H, W) shape of every image
+        :type image_shape: tuple[int, ...]
+
+        :param max_bytes: budget of the image slots in bytes
+        :type max_bytes: int
+
+        :returns: instance of the SharedImageCache class
+        :rtype: :class:`SharedImageCache`
+        """
+        image_bytes = 1
+        for n in image_shape:
+            image_bytes *= n
+        num_slots = min(num_images, max_bytes // image_bytes)
+        if num_slots < 1:
+            raise ValueError(f"{max_bytes} bytes do not hold a single image")
+        self.image_shape = tuple(image_shape)
+        self.slots = torch.empty((num_slots, *image_shape), dtype=torch.uint8)
+        self.slot_of = torch.full((num_images,), -1, dtype=torch.int64)
+        self.index_of = torch.full((num_slots,), -1, dtype=torch.int64)
+        self.referenced = torch.zeros(num_slots, dtype=torch.bool)
+        self.counters = torch.zeros(5, dtype=torch.int64)
+        for tensor in (
+            self.slots,
+            self.slot_of,
+            self.index_of,
+            self.referenced,
+            self.counters,
+        ):
+            tensor.share_memory_()
+        self.lock = multiprocessing.Lock()
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def get(self, index: int) -> torch.Tensor:
+        """
+        :param index: index of the image in the dataset
+        :type index: int
+
+        :returns: copy of the cached image, or None on a miss
+        :rtype: torch.Tensor
+        """
+        with self.lock:
+            slot = int(self.slot_of[index])
+            if slot < 0:
+                self.counters[MISSES] += 1
+                return None
+            self.counters[HITS] += 1
+            self.referenced[slot] = True
+            return self.slots[slot].clone()
+
+    def put(self, index: int, image: torch.Tensor):
+        """Caches an image, evicting another one if the cache is full
+
+        :param index: index of the image in the dataset
+        :type index: int
+
+        :param image: (3, H, W) uint8 image
+        :type image: torch.Tensor
+        """
+        with self.lock:
+            if self.slot_of[index] >= 0:
+                return
+            filled = int(self.counters[FILLED])
+            if filled < len(self.slots):
+                slot = filled
+                self.counters[FILLED] += 1
+            else:
+                slot = self._sweep()
+                self.slot_of[self.index_of[slot]] = -1
+                self.counters[EVICTIONS] += 1
+            self.slots[slot] = image
+            self.slot_of[index] = slot
+            self.index_of[slot] = index
+            self.referenced[slot] = False
+
+    def _sweep(self) -> int:
+        """Moves the clock hand to the next slot without a reference bit,
+        clearing the bits it passes"""
+        hand = int(self.counters[HAND])
+        while self.referenced[hand]:
+            self.referenced[hand] = False
+            hand = (hand + 1) % len(self.slots)
+        self.counters[HAND] = (hand + 1) % len(self.slots)
+        return hand
+
+    def stats(self) -> dict:
+        """
+        :returns: hits, misses, evictions, cached images and their bytes
+        :rtype: dict
+        """
+        hits, misses, evictions, filled, _ = self.counters.tolist()
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "images": filled,
+            "bytes": filled * self.slots[0].numel(),
+        }
+
+
+class MemoryCachedDataset(Dataset):
+    """An :class:`IndexedVOCDataset` whose decoded images are kept in a
+    :class:`SharedImageCache`, so later epochs skip reading and decoding
+    the images that fit into the budget"""
+
+    def __init__(self, dataset: IndexedVOCDataset, max_bytes: int):
+        """Constructor for the cached dataset
+
+        :param dataset: source dataset, its loader must decode to a fixed
+                        size like :class:`yolo.decode.DraftDecoder`
+        :type dataset: :class:`IndexedVOCDataset`
+
+        :param max_bytes: budget of the cached images in bytes
+        :type max_bytes: int
+
+        :returns: instance of the MemoryCachedDataset class
+        :rtype: :class:`MemoryCachedDataset`
+        """
+        width, height = dataset.loader.size
+        self.dataset = dataset
+        self.annotations = dataset.annotations
+        self.cache = SharedImageCache(len(dataset), (3, height, width), max_bytes)
+
+    def __len__(self) -> int:
+        return len(self.dataset)
+
+    def cache_stats(self) -> dict:
+        """
+        :returns: counters of the cache, see :meth:`SharedImageCache.stats`
+        :rtype: dict
+        """
+        return self.cache.stats()
+
+    def __getitem__(self, index: int) -> tuple:
+        image = self.cache.get(index)
+        if image is None:
+            image = self.dataset.loader.to_tensor(self.dataset.images[index])
+            self.cache.put(index, image)
+        if self.dataset.transform is not None:
+            image = self.dataset.transform(image)
+        return image, self.annotations[index]
@@ -1,22 +1,132 @@
+import contextlib
+import copy
+import math
+import os
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from logging import Logger
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+from torch.utils.checkpoint import checkpoint
 
 from yolo.config import Config
+from yolo.weights import load_state_dict, save_state_dict
 
 DEFAULT_IN_CHANNELS = 3
+DEFAULT_INPUT_SIZE = 448
+
+
+def _out_size(size: int, kernel_size: int, stride: int, padding: int = 0) -> int:
+    return (size + 2 * padding - kernel_size) // stride + 1
+
+
+def _output_shape(layer: dict, shape: tuple[int, ...]) -> tuple[int, ...]:
+    """Shape of the output of one layer of the ``[model]`` section for one
+    sample. :func:`get_layers` sizes its modules with it and
+    :func:`yolo.summary.infer_layers` checks configs with it, so both
+    accept the same layer orders.
+
+    :param layer: layer of the section
+    :type layer: dict
+
+    :param shape: shape of the input of the layer, without the batch
+    :type shape: tuple[int, ...]
+
+    :returns: shape of the output, without the batch
+    :rtype: tuple[int, ...]
+    :raises ValueError: if the layer can not take an input of this shape
+    """
+    layer_type = layer["type"]
+    if layer_type in ("conv", "maxpool"):
+        if len(shape) != 3:
+            raise ValueError(f"{layer_type} needs a (C, H, W) input, got {shape}")
+        kernel_size, stride = layer["kernel_size"], layer["stride"]
+        channels, height, width = shape
+        padding = 0
+        if layer_type == "conv":
+            channels = layer["filters"]
+            # Same padding, so only the strides shrink the feature maps
+            padding = layer.get("padding", kernel_size // 2)
+        return (
+            channels,
+            _out_size(height, kernel_size, stride, padding),
+            _out_size(width, kernel_size, stride, padding),
+        )
+    if layer_type == "fc":
+        return (layer["filters"],)
+    if layer_type == "reshape":
+        target = tuple(layer["shape"])
+        if math.prod(target) != math.prod(shape):
+            raise ValueError(
+                f"can not reshape {shape} ({math.prod(shape)} values) to {target}"
+            )
+        return target
+    raise ValueError(f"Unsupported layer type: {layer_type}")
+
+
+class ConvAct(nn.Conv2d):
+    """Convolution with its activation applied in place on the output, so
+    the pair is a single module and the activation allocates nothing"""
+
+    def __init__(self, *args, activation: str = "relu", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.activation = activation
+
+    def forward(self, x):
+        x = super().forward(x)
+        if self.activation == "relu":
+            return F.relu(x, inplace=True)
+        return F.leaky_relu(x, inplace=True)
+
+    def extra_repr(self) -> str:
+        return f"{super().extra_repr()}, activation={self.activation}"
+
+
+class Reshape(nn.Module):
+    """Reshapes every sample of the batch, keeping the batch dimension"""
+
+    def __init__(self, shape: tuple[int, ...]):
+        super().__init__()
+        self.shape = tuple(shape)
+
+    def forward(self, x):
+        return x.reshape(x.shape[0], *self.shape)
 
+    def extra_repr(self) -> str:
+        return f"shape={self.shape}"
 
-def get_layers(config: Config):
+
+def get_layers(config: Config, fuse: bool = False):
+    """Builds the layers of the ``[model]`` section
+
+    :param config: the ``[model]`` section of the configuration
+    :type config: dict
+
+    :param fuse: build every conv and its activation as one
+                 :class:`ConvAct`. An Identity takes the place of the
+                 activation, so the weights keep their names. Convs with
+                 ``batch_norm`` are not fused, the norm sits in between.
+    :type fuse: bool
+    """
+    for _, module in _numbered_layers(config, fuse):
+        yield module
+
+
+def _numbered_layers(config: Config, fuse: bool = False):
+    """Modules of :func:`get_layers`, each with the index of the layer of
+    the section it was built for"""
     layers: list[dict] = config["layers"]
-    prev_layer = None
+    # Every module is sized from the shape of its input, not from the module
+    # before it, which a reshape may sit after
+    size = config.get("input_size", DEFAULT_INPUT_SIZE)
+    shape = (DEFAULT_IN_CHANNELS, size, size)
     for i, layer in enumerate(layers):
         layer_type = layer["type"]
+        in_shape = shape
+        shape = _output_shape(layer, in_shape)
         if layer_type == "conv":
-            in_channels = (
-                DEFAULT_IN_CHANNELS if prev_layer == None else prev_layer.out_channels
-            )
+            in_channels = in_shape[0]
             out_channels = layer["filters"]
             kernel_size = layer["kernel_size"]
             stride = layer["stride"]
@@ -28,21 +138,41 @@ def get_layers(config: Config):
             else:
                 raise ValueError(f"Unsupported activation function: {activation}")
 
-            conv_layer = nn.Conv2d(in_channels, out_channels, kernel_size, stride)
-            prev_layer = conv_layer
-            yield conv_layer
-            yield activation_fn
+            padding = layer.get("padding", kernel_size // 2)
+            batch_norm = layer.get("batch_norm", False)
+            if batch_norm:
+                # The norm shifts the outputs itself, a bias would be ignored
+                conv_layer = nn.Conv2d(
+                    in_channels, out_channels, kernel_size, stride, padding, bias=False
+                )
+            elif fuse:
+                conv_layer = ConvAct(
+                    in_channels,
+                    out_channels,
+                    kernel_size,
+                    stride,
+                    padding,
+                    activation=activation,
+                )
+                activation_fn = nn.Identity()
+            else:
+                conv_layer = nn.Conv2d(
+                    in_channels, out_channels, kernel_size, stride, padding
+                )
+            yield i, conv_layer
+            if batch_norm:
+                yield i, nn.BatchNorm2d(out_channels)
+            yield i, activation_fn
 
         elif layer_type == "maxpool":
             kernel_size = layer["kernel_size"]
             stride = layer["stride"]
-            pool_layer = nn.MaxPool2d(kernel_size, stride)
-            yield pool_layer
+            yield i, nn.MaxPool2d(kernel_size, stride)
 
         elif layer_type == "fc":
-            in_features = (
-                DEFAULT_IN_CHANNELS if prev_layer == None else prev_layer.out_channels
-            )
+            in_features = math.prod(in_shape)
+            if len(in_shape) != 1:
+                yield i, nn.Flatten()
             out_features = layer["filters"]
             activation = layer.get("activation", "relu")
             if activation == "relu":
@@ -54,45 +184,348 @@ def get_layers(config: Config):
             else:
                 raise ValueError(f"Unsupported activation function: {activation}")
 
-            fc_layer = nn.Linear(in_features, out_features)
-            yield fc_layer
-            yield activation_fn
+            yield i, nn.Linear(in_features, out_features)
+            yield i, activation_fn
+            dropout = layer.get("dropout", 0.0)
+            if dropout > 0:
+                yield i, nn.Dropout(dropout)
 
         elif layer_type == "reshape":
-            shape = layer["shape"]
-            reshape_layer = lambda x: x.view(shape)
-            yield reshape_layer
+            yield i, Reshape(shape)
+
+
+def checkpoint_segments(
+    config: Config, layer_index: list[int]
+) -> list[tuple[int, int, bool]]:
+    """Splits the modules of the section into the runs that are
+    checkpointed and the runs that are not.
 
+    A layer is checkpointed if it sets ``checkpoint``. Consecutive layers
+    with the same value share one segment, so ``checkpoint = true`` on a
+    whole section recomputes it as one block, while distinct values, e.g.
+    the number of the section, split adjacent sections.
+
+    :param config: the ``[model]`` section of the configuration
+    :type config: dict
+
+    :param layer_index: index of the layer of every module, see
+                        :func:`get_layers`
+    :type layer_index: list[int]
+
+    :returns: start and end module of every segment and whether it is
+              checkpointed
+    :rtype: list[tuple[int, int, bool]]
+    """
+    layers = config["layers"]
+    segments = []
+    previous = None
+    for n, i in enumerate(layer_index):
+        key = layers[i].get("checkpoint", False) or False
+        if segments and key == previous:
+            start, _, checkpointed = segments[-1]
+            segments[-1] = (start, n + 1, checkpointed)
         else:
-            raise ValueError(f"Unsupported layer type: {layer_type}")
+            segments.append((n, n + 1, bool(key)))
+        previous = key
+    return segments
+
+
+@contextlib.contextmanager
+def _keep_norm_statistics(modules: nn.Sequential):
+    """Keeps the running statistics of the batch norms while a checkpointed
+    segment is recomputed, they were updated by its first forward pass"""
+    norms = [m for m in modules if isinstance(m, nn.modules.batchnorm._BatchNorm)]
+    saved = [(m.momentum, m.num_batches_tracked.clone()) for m in norms]
+    for m in norms:
+        m.momentum = 0.0
+    try:
+        yield
+    finally:
+        for m, (momentum, tracked) in zip(norms, saved):
+            m.momentum = momentum
+            m.num_batches_tracked.copy_(tracked)
+
+
+class _InferenceNet(nn.Module):
+    def __init__(self, layers: nn.Sequential, channels_last: bool = False):
+        super().__init__()
+        self.layers = layers
+        self.channels_last = channels_last
+
+    def forward(self, x):
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        return self.layers(x)
+
+
+def save_frozen(module: torch.jit.ScriptModule, path: str):
+    """
+    :param module: module returned by :meth:`Yolo.freeze`
+    :type module: torch.jit.ScriptModule
+
+    :param path: path of the file
+    :type path: str
+    """
+    torch.jit.save(module, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def load_frozen(path: str, optimize: bool = True) -> torch.jit.ScriptModule:
+    """
+    :param path: file written by :func:`save_frozen`
+    :type path: str
+
+    :param optimize: rewrite the graph for this CPU, see :meth:`Yolo.freeze`
+    :type optimize: bool
+
+    :returns: the frozen module, on the CPU
+    :rtype: torch.jit.ScriptModule
+    """
+    module = torch.jit.load(path, map_location="cpu").eval()
+    if optimize:
+        module = torch.jit.optimize_for_inference(module)
+    return module
 
 
 class Yolo(nn.Module):
     def __init__(self, config, logger: Logger):
+        """Builds the model of the ``[model]`` section.
+
+        Besides the layers, the section may set the execution options
+        ``channels_last`` (NHWC memory format for the convolutions),
+        ``fuse`` (see :class:`ConvAct`) and ``compile``, either true or the
+        name of a :func:`torch.compile` backend. None of them changes the
+        outputs beyond floating point noise or the names of the weights.
+
+        Layers that set ``checkpoint`` are run with activation
+        checkpointing in training, see :func:`checkpoint_segments`: their
+        outputs are dropped after the forward pass and recomputed in the
+        backward pass, which trades compute for activation memory.
+        """
         super().__init__()
         layers = []
-        for layer in get_layers(config):
+        layer_index = []
+        for i, layer in _numbered_layers(config, fuse=config.get("fuse", False)):
             layers.append(layer)
+            layer_index.append(i)
 
         self.layers = nn.Sequential(*layers)
+        self.segments = checkpoint_segments(config, layer_index)
+        self.checkpointed = any(c for _, _, c in self.segments)
         self.logger = logger
+        self.input_size = config.get("input_size", DEFAULT_INPUT_SIZE)
+        # Name of the quantized engine once :meth:`quantize` ran
+        self.quantized = None
+        self.channels_last = config.get("channels_last", False)
+        if self.channels_last:
+            self.to(memory_format=torch.channels_last)
+        backend = config.get("compile", False)
+        # Kept out of the submodules, so the state dict has no second copy
+        # of the weights under the compiled wrapper
+        self.__dict__["_compiled"] = None
+        if backend:
+            if self.checkpointed:
+                # Dynamo does not trace the checkpoint context of the norms
+                raise ValueError("Checkpointed layers can not be compiled")
+            backend = "inductor" if backend is True else backend
+            self.__dict__["_compiled"] = torch.compile(self.layers, backend=backend)
 
     def forward(self, x):
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        if self.checkpointed and self.training and torch.is_grad_enabled():
+            return self._checkpointed_forward(x)
+        if self._compiled is not None:
+            return self._compiled(x)
         x = self.layers(x)
         return x
 
+    def _checkpointed_forward(self, x):
+        for start, end, checkpointed in self.segments:
+            segment = self.layers[start:end]
+            if checkpointed:
+                x = checkpoint(
+                    segment,
+                    x,
+                    use_reentrant=False,
+                    context_fn=lambda segment=segment: (
+                        contextlib.nullcontext(),
+                        _keep_norm_statistics(segment),
+                    ),
+                )
+            else:
+                x = segment(x)
+        return x
+
     def predict(self, x):
-        with torch.no_grad():
+        with torch.inference_mode():
             x = self.forward(x)
         return x
 
-    def load_weights(self, weights_path):
-        state_dict = torch.load(weights_path)
-        self.load_state_dict(state_dict)
+    def inference_layers(self, share: bool = False) -> nn.Sequential:
+        """Copies the layers for inference: every batch norm is folded
+        into the conv before it, and the modules that do nothing in
+        evaluation, Identity and Dropout, are dropped
+
+        :param share: reuse the modules of the model instead of copying
+                      them, for exports that must not hold a second copy
+                      of the weights. Only the folded convs are new, and
+                      the model is left in evaluation mode.
+        :type share: bool
+
+        :returns: layers in evaluation mode, without gradients unless
+                  shared
+        :rtype: nn.Sequential
+        """
+        source = self.layers if share else copy.deepcopy(self.layers)
+        layers = []
+        for module in source.eval():
+            if isinstance(module, (nn.Identity, nn.Dropout)):
+                continue
+            if isinstance(module, nn.BatchNorm2d) and isinstance(layers[-1], nn.Conv2d):
+                layers[-1] = fuse_conv_bn_eval(layers[-1], module)
+                continue
+            layers.append(module)
+        frozen = nn.Sequential(*layers).eval()
+        if not share:
+            frozen.requires_grad_(False)
+        return frozen
+
+    def freeze(
+        self, batch_size: int = 1, optimize: bool = False
+    ) -> torch.jit.ScriptModule:
+        """Builds a frozen TorchScript graph of :meth:`inference_layers` for
+        serving. The weights become constants of the graph, which can be
+        saved with :func:`save_frozen` and loaded without this class.
+
+        :param batch_size: batch size of the example input it is traced with
+        :type batch_size: int
+
+        :param optimize: also rewrite the graph for the CPU it runs on with
+                         :func:`torch.jit.optimize_for_inference`. The
+                         result can not be saved, :func:`load_frozen` does
+                         this after loading instead.
+        :type optimize: bool
+
+        :returns: frozen module mapping images to raw outputs
+        :rtype: torch.jit.ScriptModule
+        """
+        net = _InferenceNet(self.inference_layers(), self.channels_last).eval()
+        size = self.input_size
+        example = torch.rand(batch_size, DEFAULT_IN_CHANNELS, size, size)
+        with torch.no_grad():
+            traced = torch.jit.trace(net, example)
+        frozen = torch.jit.freeze(traced)
+        if optimize:
+            frozen = torch.jit.optimize_for_inference(frozen)
+        return frozen
+
+    def quantize(self, calibration=(), backend: str = None):
+        """Quantizes the model to int8 for CPU inference, see
+        :func:`yolo.quantize.quantize_layers`. The model can not be
+        trained afterwards.
+
+        :param calibration: normalized input batches
+        :type calibration: Iterable[torch.Tensor]
+
+        :param backend: quantized engine, ``x86`` by default
+        :type backend: str
+
+        :returns: the model itself
+        :rtype: :class:`Yolo`
+        """
+        from yolo.quantize import DEFAULT_BACKEND, quantize_layers
+
+        if self._compiled is not None:
+            raise ValueError("Can not quantize a compiled model")
+        backend = backend or DEFAULT_BACKEND
+        self.layers = quantize_layers(self.layers, calibration, backend, inplace=True)
+        self.quantized = backend
+        return self.eval()
+
+    @staticmethod
+    def from_weights(
+        config, weights_path: str, logger: Logger, verify: bool = False
+    ) -> "Yolo":
+        """Builds the model around saved weights, for a fast start.
+
+        The layers are built without memory and random initialization, on
+        the meta device, and take the mapped tensors of the file as their
+        weights, so no weight is copied or read before it is used.
+
+        :param config: the ``[model]`` section of the configuration
+        :type config: dict
+
+        :param weights_path: file written by :meth:`save_weights`
+        :type weights_path: str
+
+        :param logger: logger of the model
+        :type logger: :class:`logging.Logger`
+
+        :param verify: check the file against its saved hash first
+        :type verify: bool
+
+        :returns: the model with the weights
+        :rtype: :class:`Yolo`
+        """
+        from yolo.quantize import QUANTIZED_FORMAT
+
+        state_dict = load_state_dict(weights_path, verify=verify)
+        if state_dict.get("format") == QUANTIZED_FORMAT:
+            # Quantization needs real placeholder weights
+            model = Yolo(config, logger)
+        else:
+            with torch.device("meta"):
+                model = Yolo(config, logger)
+        return model._load(state_dict, weights_path, assign=True)
+
+    def load_weights(self, weights_path: str, verify: bool = False):
+        """Loads weights into the model, see
+        :func:`yolo.weights.load_state_dict`
+
+        :param weights_path: file written by :meth:`save_weights`
+        :type weights_path: str
+
+        :param verify: check the file against its saved hash first
+        :type verify: bool
+
+        :returns: the model itself
+        :rtype: :class:`Yolo`
+        """
+        return self._load(load_state_dict(weights_path, verify=verify), weights_path)
+
+    def _load(self, state_dict: dict, weights_path: str, assign: bool = False):
+        from yolo.quantize import QUANTIZED_FORMAT
+
+        if state_dict.get("format") == QUANTIZED_FORMAT:
+            # Quantize with placeholder parameters, the saved ones replace them
+            if self.quantized is None:
+                self.quantize(backend=state_dict["backend"])
+            state_dict = state_dict["state_dict"]
+            assign = False
+        self.load_state_dict(state_dict, assign=assign)
+        if assign and self.channels_last:
+            # The assigned weights keep the layout they were saved in
+            self.to(memory_format=torch.channels_last)
         self.logger.info(f"Loaded weights from {weights_path}")
         return self
 
-    def save_weights(self, weights_path):
-        torch.save(self.state_dict(), weights_path)
+    def save_weights(self, weights_path: str):
+        """Saves the weights atomically with their hash, see
+        :func:`yolo.weights.save_state_dict`
+
+        :param weights_path: path of the file, in the safetensors format if
+                             it ends with ``.safetensors``
+        :type weights_path: str
+
+        :returns: the model itself
+        :rtype: :class:`Yolo`
+        """
+        if self.quantized is not None:
+            from yolo.quantize import save_quantized
+
+            save_quantized(self, weights_path)
+        else:
+            save_state_dict(self.state_dict(), weights_path)
         self.logger.info(f"Saved weights to {weights_path}")
         return self
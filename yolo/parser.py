@@ -1,5 +1,59 @@
 import argparse
 
+from yolo.backends import BACKENDS, ONNX_OPSET
+from yolo.bench import DEFAULT_SUITES, REGRESSION_THRESHOLD, SUITES
+from yolo.postprocess import DEFAULT_CONF_THRESHOLD
+from yolo.shards import DEFAULT_SAMPLES_PER_SHARD
+
+
+def add_model_options(parser: argparse.ArgumentParser):
+    """Flags overriding the execution options of the ``[model]`` section"""
+    parser.add_argument(
+        "--channels-last",
+        action="store_true",
+        help="run the convolutions in NHWC memory format",
+        default=None,
+    )
+    parser.add_argument(
+        "--fuse",
+        action="store_true",
+        help="fuse every convolution with its activation",
+        default=None,
+    )
+    parser.add_argument(
+        "--compile",
+        nargs="?",
+        const=True,
+        help="compile the model with torch.compile, optionally naming the backend",
+        default=None,
+        metavar="BACKEND",
+    )
+
+
+def add_backend_options(parser: argparse.ArgumentParser):
+    """Flags choosing what runs the inference, see :mod:`yolo.backends`"""
+    parser.add_argument(
+        "-w", "--weights", type=str, help="weights to load", default=None
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        help="inference backend",
+        default="torch",
+    )
+    parser.add_argument(
+        "--model-file",
+        type=str,
+        help="frozen TorchScript or ONNX file to run instead of the config model",
+        default=None,
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        help="CPU threads of the backend, its own default if not given",
+        default=None,
+    )
+
 
 def get_parser():
     parser = argparse.ArgumentParser()
@@ -17,5 +71,161 @@ def get_parser():
 
     parser_train = subparsers.add_parser("train", help="train the model")
     parser_test = subparsers.add_parser("test", help="train the model")
+    parser_test.add_argument(
+        "--proxy",
+        action="store_true",
+        help="estimate the mAP on a small stratified subset of the val split",
+        default=False,
+    )
+    for subparser in (parser_train, parser_test):
+        add_model_options(subparser)
+    add_backend_options(parser_test)
+    parser_predict = subparsers.add_parser(
+        "predict", help="detect the objects in images"
+    )
+    parser_predict.add_argument("images", nargs="+", help="image files")
+    parser_predict.add_argument(
+        "--conf-threshold",
+        type=float,
+        help="minimum confidence of a detection",
+        default=DEFAULT_CONF_THRESHOLD,
+    )
+    parser_predict.add_argument(
+        "-b", "--batch-size", type=int, help="images per forward pass", default=64
+    )
+    add_model_options(parser_predict)
+    add_backend_options(parser_predict)
+    parser_bench = subparsers.add_parser("bench", help="run performance benchmarks")
+    parser_bench.add_argument(
+        "suites",
+        nargs="*",
+        help=f"suites to run out of {', '.join(SUITES)}; "
+        f"default: {' '.join(DEFAULT_SUITES)}",
+        metavar="SUITE",
+    )
+    parser_bench.add_argument(
+        "--quick", action="store_true", help="run shorter suites", default=False
+    )
+    parser_bench.add_argument(
+        "-o", "--output", type=str, help="write the results to a file", default=None
+    )
+    parser_bench.add_argument(
+        "-b",
+        "--baseline",
+        type=str,
+        help="compare against the results in this file",
+        default=None,
+    )
+    parser_bench.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store the results as the new baseline",
+        default=False,
+    )
+    parser_bench.add_argument(
+        "--threshold",
+        type=float,
+        help="tolerated relative slowdown before failing",
+        default=REGRESSION_THRESHOLD,
+    )
+    parser_bench.add_argument(
+        "--threads", type=int, help="torch intra-op threads", default=None
+    )
+    parser_summary = subparsers.add_parser(
+        "summary", help="check the model config and report its per layer costs"
+    )
+    parser_summary.add_argument(
+        "-b", "--batch-size", type=int, help="batch size of the costs", default=1
+    )
+    parser_summary.add_argument(
+        "--profile",
+        action="store_true",
+        help="also time the forward and backward pass of every module",
+        default=False,
+    )
+    parser_summary.add_argument(
+        "--repeat", type=int, help="timed passes of --profile", default=3
+    )
+    add_model_options(parser_summary)
+    parser_freeze = subparsers.add_parser(
+        "freeze", help="save a frozen TorchScript model for CPU inference"
+    )
+    parser_freeze.add_argument(
+        "-w", "--weights", type=str, help="weights to load", default=None
+    )
+    parser_freeze.add_argument(
+        "-o", "--output", type=str, help="output file", default="yolo-frozen.pt"
+    )
+    add_model_options(parser_freeze)
+    parser_export = subparsers.add_parser(
+        "export", help="export the model to ONNX with a dynamic batch size"
+    )
+    parser_export.add_argument(
+        "-w", "--weights", type=str, help="weights to load", default=None
+    )
+    parser_export.add_argument(
+        "-o", "--output", type=str, help="output file", default="yolo.onnx"
+    )
+    parser_export.add_argument(
+        "--opset", type=int, help="ONNX operator set version", default=ONNX_OPSET
+    )
+    parser_quantize = subparsers.add_parser(
+        "quantize", help="quantize the model to int8 and compare it with fp32"
+    )
+    parser_quantize.add_argument(
+        "-w", "--weights", type=str, help="float weights to load", default=None
+    )
+    parser_quantize.add_argument(
+        "-o", "--output", type=str, help="output file", default="yolo-int8.pt"
+    )
+    parser_quantize.add_argument(
+        "--calibration-batches",
+        type=int,
+        help="training batches the activation ranges are observed on",
+        default=8,
+    )
+    parser_quantize.add_argument(
+        "-b", "--batch-size", type=int, help="calibration batch size", default=8
+    )
+    parser_quantize.add_argument(
+        "--backend", type=str, help="quantized engine", default="x86"
+    )
+    parser_quantize.add_argument(
+        "--proxy",
+        action="store_true",
+        help="compare the mAP of both models on the proxy evaluation subset",
+        default=False,
+    )
+    parser_tune = subparsers.add_parser(
+        "tune", help="benchmark and cache the dataloader settings of this host"
+    )
+    parser_tune.add_argument(
+        "--val",
+        dest="train",
+        action="store_false",
+        help="tune the validation loader instead of the training loader",
+        default=True,
+    )
+    parser_shards = subparsers.add_parser(
+        "shards", help="convert the VOCdevkit files into tar shards"
+    )
+    parser_shards.add_argument(
+        "--voc-root", type=str, help="VOCdevkit year directory", default=None
+    )
+    parser_shards.add_argument(
+        "-o", "--output", type=str, help="shards directory", default=None
+    )
+    parser_shards.add_argument(
+        "--image-sets",
+        nargs="+",
+        help="splits to convert",
+        default=["train", "val"],
+    )
+    parser_shards.add_argument(
+        "--samples-per-shard",
+        type=int,
+        help="number of samples per tar file",
+        default=DEFAULT_SAMPLES_PER_SHARD,
+    )
 
     return parser
@@ -0,0 +1,170 @@
+import torch
+from torchvision.ops import nms
+
+from yolo.base import BoxArray
+
+DEFAULT_GRID_SIZE = 7
+DEFAULT_NUM_BOXES = 2
+DEFAULT_NUM_CLASSES = 20
+DEFAULT_IMAGE_SIZE = (448, 448)
+
+DEFAULT_CONF_THRESHOLD = 0.2
+DEFAULT_IOU_THRESHOLD = 0.5
+DEFAULT_TOP_K = 100
+
+
+def decode_outputs(
+    outputs: torch.Tensor,
+    grid_size: int = DEFAULT_GRID_SIZE,
+    num_boxes: int = DEFAULT_NUM_BOXES,
+    num_classes: int = DEFAULT_NUM_CLASSES,
+    image_size: tuple[int, int] = DEFAULT_IMAGE_SIZE,
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """Decodes a batch of raw YOLO outputs into boxes, scores and classes.
+
+    Every cell holds ``num_boxes`` predictions of ``(x, y, w, h, conf)``
+    followed by ``num_classes`` class probabilities. ``x`` and ``y`` are
+    offsets inside the cell, ``w`` and ``h`` are fractions of the image.
+    Like :class:`yolo.base.GridCell`, the first grid axis indexes columns
+    and the second indexes rows.
+
+    :param outputs: (N, S*S*(B*5+C)) or (N, S, S, B*5+C) model outputs
+    :type outputs: torch.Tensor
+
+    :param grid_size: number of cells along each side of the grid
+    :type grid_size: int
+
+    :param num_boxes: number of boxes predicted per cell
+    :type num_boxes: int
+
+    :param num_classes: number of object classes
+    :type num_classes: int
+
+    :param image_size: (width, height) of the model input
+    :type image_size: tuple (int, int)
+
+    :returns: (N, S*S*B, 4) xyxy boxes in pixels, (N, S*S*B) class-specific
+              scores and (N, S*S*B) class ids
+    :rtype: tuple (torch.Tensor, torch.Tensor, torch.Tensor)
+    """
+    n = outputs.shape[0]
+    s = grid_size
+    cell_depth = num_boxes * 5 + num_classes
+    grid = outputs.reshape(n, s, s, cell_depth)
+
+    preds = grid[..., : num_boxes * 5].reshape(n, s, s, num_boxes, 5)
+    class_score, class_id = grid[..., num_boxes * 5 :].max(dim=-1)
+
+    offsets = torch.arange(s, device=outputs.device, dtype=outputs.dtype)
+    width, height = image_size
+    cx = (preds[..., 0] + offsets.view(1, s, 1, 1)) * (width / s)
+    cy = (preds[..., 1] + offsets.view(1, 1, s, 1)) * (height / s)
+    half_w = preds[..., 2] * (width / 2)
+    half_h = preds[..., 3] * (height / 2)
+    boxes = torch.stack([cx - half_w, cy - half_h, cx + half_w, cy + half_h], -1)
+
+    scores = preds[..., 4] * class_score.unsqueeze(-1)
+    classes = class_id.unsqueeze(-1).expand(n, s, s, num_boxes)
+
+    return boxes.reshape(n, -1, 4), scores.reshape(n, -1), classes.reshape(n, -1)
+
+
+def batched_class_nms(
+    boxes: torch.Tensor,
+    scores: torch.Tensor,
+    classes: torch.Tensor,
+    conf_threshold: float = DEFAULT_CONF_THRESHOLD,
+    iou_threshold: float = DEFAULT_IOU_THRESHOLD,
+    top_k: int = DEFAULT_TOP_K,
+) -> list[BoxArray]:
+    """Runs class-aware non-maximum suppression on every image of a batch.
+
+    All images are suppressed in a single call by shifting the boxes of
+    every (image, class) pair into their own disjoint coordinate range.
+
+    :param boxes: (N, K, 4) xyxy boxes
+    :type boxes: torch.Tensor
+
+    :param scores: (N, K) box scores
+    :type scores: torch.Tensor
+
+    :param classes: (N, K) class ids
+    :type classes: torch.Tensor
+
+    :param conf_threshold: boxes scoring at or below this are dropped first
+    :type conf_threshold: float
+
+    :param iou_threshold: overlap above which the lower scoring box is dropped
+    :type iou_threshold: float
+
+    :param top_k: maximum number of detections kept per image
+    :type top_k: int
+
+    :returns: one box array per image, sorted by decreasing score, with the
+              scores as ``conf`` and the class ids as ``labels``
+    :rtype: list[:class:`BoxArray`]
+    """
+    n, k = scores.shape
+    num_classes = int(classes.max()) + 1 if classes.numel() else 1
+
+    candidates = (scores > conf_threshold).flatten().nonzero().squeeze(1)
+    image_idx = candidates // k
+    flat_boxes = boxes.reshape(-1, 4)[candidates]
+    flat_scores = scores.flatten()[candidates]
+    flat_classes = classes.flatten()[candidates]
+
+    # torchvision's batched_nms falls back to a Python loop over groups
+    # for large inputs on the CPU, so apply the offset trick unconditionally
+    # in double precision so large offsets do not round the coordinates
+    groups = (image_idx * num_classes + flat_classes).double()
+    span = flat_boxes.max() - flat_boxes.min() + 1 if len(flat_boxes) else 0
+    shifted = flat_boxes.double() + (groups * span)[:, None]
+    keep = nms(shifted, flat_scores.double(), iou_threshold)
+
+    # keep is sorted by decreasing score, a stable sort by image keeps that
+    # order within each image so the rank of a box is its position in it
+    image_idx = image_idx[keep]
+    image_idx, order = torch.sort(image_idx, stable=True)
+    keep = keep[order]
+    counts = torch.bincount(image_idx, minlength=n)
+    starts = torch.cumsum(counts, 0) - counts
+    rank = torch.arange(len(keep), device=keep.device) - starts[image_idx]
+    capped = rank < top_k
+    keep = keep[capped]
+    counts = torch.clamp(counts, max=top_k).tolist()
+
+    return [
+        BoxArray(b, "xyxy", conf=s, labels=c)
+        for b, s, c in zip(
+            flat_boxes[keep].split(counts),
+            flat_scores[keep].split(counts),
+            flat_classes[keep].split(counts),
+        )
+    ]
+
+
+def postprocess(
+    outputs: torch.Tensor,
+    grid_size: int = DEFAULT_GRID_SIZE,
+    num_boxes: int = DEFAULT_NUM_BOXES,
+    num_classes: int = DEFAULT_NUM_CLASSES,
+    image_size: tuple[int, int] = DEFAULT_IMAGE_SIZE,
+    conf_threshold: float = DEFAULT_CONF_THRESHOLD,
+    iou_threshold: float = DEFAULT_IOU_THRESHOLD,
+    top_k: int = DEFAULT_TOP_K,
+) -> list[BoxArray]:
+    """Turns a batch of raw YOLO outputs into per-image detections.
+
+    See :func:`decode_outputs` and :func:`batched_class_nms` for the
+    meaning of the parameters.
+
+    :returns: one box array of detections per image
+    :rtype: list[:class:`BoxArray`]
+    """
+    with torch.no_grad():
+        boxes, scores, classes = decode_outputs(
+            outputs, grid_size, num_boxes, num_classes, image_size
+        )
+        return batched_class_nms(
+            boxes, scores, classes, conf_threshold, iou_threshold, top_k
+        )
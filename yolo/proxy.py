@@ -0,0 +1,376 @@
+import json
+import os
+import time
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from yolo.annotations import AnnotationIndex
+from yolo.base import BoxArray
+from yolo.base.spatial import IGNORED, match_boxes
+from yolo.postprocess import postprocess
+from yolo.targets import YoloCollate
+
+PROXY_VERSION = 1
+DEFAULT_PER_CLASS = 10
+DEFAULT_BOOTSTRAP = 200
+# Detections down to a low confidence are kept, so the precision/recall
+# curve reaches high recall
+EVAL_CONF_THRESHOLD = 0.01
+
+
+def stratified_subset(
+    annotations: AnnotationIndex, per_class: int = DEFAULT_PER_CLASS, seed: int = 0
+) -> np.ndarray:
+    """Picks a deterministic subset of images that shows every class in at
+    least ``per_class`` images, or in all of its images if it is rarer.
+
+    Classes are filled from the rarest to the most frequent, so the images
+    picked for rare classes also count towards the frequent ones.
+
+    :param annotations: annotations of the whole split
+    :type annotations: :class:`AnnotationIndex`
+
+    :param per_class: number of images per class
+    :type per_class: int
+
+    :param seed: seed of the order the candidates are picked in
+    :type seed: int
+
+    :returns: sorted indices of the picked images
+    :rtype: numpy.ndarray
+    """
+    num_classes = len(annotations.class_names)
+    images = annotations.image_of_box()
+    # (N, C) whether an image shows a class
+    shows = np.zeros((len(annotations), num_classes), dtype=bool)
+    shows[images, annotations.labels] = True
+    rank = np.random.default_rng(seed).permutation(len(annotations))
+
+    picked = np.zeros(len(annotations), dtype=bool)
+    for c in np.argsort(shows.sum(0), kind="stable"):
+        missing = per_class - int((shows[:, c] & picked).sum())
+        if missing <= 0:
+            continue
+        candidates = np.flatnonzero(shows[:, c] & ~picked)
+        candidates = candidates[np.argsort(rank[candidates])]
+        picked[candidates[:missing]] = True
+    return np.flatnonzero(picked)
+
+
+def open_proxy_subset(
+    annotations: AnnotationIndex,
+    path: str,
+    per_class: int = DEFAULT_PER_CLASS,
+    seed: int = 0,
+) -> np.ndarray:
+    """Loads the subset saved at ``path``, picking and saving it first if it
+    is missing or was picked from other annotations or parameters
+
+    :param annotations: annotations of the whole split
+    :type annotations: :class:`AnnotationIndex`
+
+    :param path: path of the JSON subset file
+    :type path: str
+
+    :param per_class: number of images per class
+    :type per_class: int
+
+    :param seed: seed of the pick
+    :type seed: int
+
+    :returns: sorted indices of the subset
+    :rtype: numpy.ndarray
+    """
+    params = {
+        "version": PROXY_VERSION,
+        "key": annotations.key,
+        "per_class": per_class,
+        "seed": seed,
+    }
+    try:
+        with open(path) as file:
+            saved = json.load(file)
+        if saved["params"] == params:
+            return np.asarray(saved["indices"], dtype=np.int64)
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        pass
+    indices = stratified_subset(annotations, per_class, seed)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as file:
+        json.dump({"params": params, "indices": indices.tolist()}, file)
+    os.replace(path + ".tmp", path)
+    return indices
+
+
+def _average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """Area under the precision/recall curve with all-point interpolation,
+    as in VOC 2010 and later"""
+    recall = np.concatenate([[0.0], recall, [1.0]])
+    precision = np.concatenate([[0.0], precision, [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    steps = np.flatnonzero(recall[1:] != recall[:-1])
+    return float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+
+def mean_average_precision(
+    image_idx: np.ndarray,
+    labels: np.ndarray,
+    conf: np.ndarray,
+    true_positive: np.ndarray,
+    num_positives: np.ndarray,
+    image_weights: np.ndarray = None,
+) -> tuple[float, np.ndarray]:
+    """Mean average precision of matched detections, with every image
+    counted ``image_weights`` times
+
+    :param image_idx: (D,) image of every detection
+    :type image_idx: numpy.ndarray
+
+    :param labels: (D,) class id of every detection
+    :type labels: numpy.ndarray
+
+    :param conf: (D,) confidence of every detection
+    :type conf: numpy.ndarray
+
+    :param true_positive: (D,) whether a detection matched a ground truth box
+    :type true_positive: numpy.ndarray
+
+    :param num_positives: (N, C) ground truth boxes per image and class
+    :type num_positives: numpy.ndarray
+
+    :param image_weights: (N,) weight of every image, ones by default
+    :type image_weights: numpy.ndarray
+
+    :returns: mAP over the classes with ground truth, and the (C,) APs,
+              NaN for classes without ground truth
+    :rtype: tuple (float, numpy.ndarray)
+    """
+    if image_weights is None:
+        image_weights = np.ones(len(num_positives))
+    order = np.argsort(-conf, kind="stable")
+    image_idx, labels, tp = image_idx[order], labels[order], true_positive[order]
+    positives = image_weights @ num_positives
+    ap = np.full(num_positives.shape[1], np.nan)
+    for c in np.flatnonzero(positives > 0):
+        rows = labels == c
+        w = image_weights[image_idx[rows]]
+        tps = np.cumsum(w * tp[rows])
+        fps = np.cumsum(w * ~tp[rows])
+        precision = tps / np.maximum(tps + fps, np.finfo(np.float64).eps)
+        ap[c] = _average_precision(tps / positives[c], precision)
+    return float(np.nanmean(ap)) if np.any(positives > 0) else 0.0, ap
+
+
+class ProxyEvaluator:
+    """Evaluates a model on a small validation subset held in memory.
+
+    The images are loaded once as one uint8 tensor, so every evaluation
+    only costs the forward passes and the matching. The mAP comes with a
+    bootstrap confidence interval over the images of the subset, which
+    tells how far to trust it.
+    """
+
+    def __init__(
+        self,
+        images: torch.Tensor,
+        boxes: list[BoxArray],
+        difficult: list[np.ndarray],
+        collate: YoloCollate = None,
+    ):
+        """Constructor for an evaluator over loaded samples
+
+        :param images: (N, 3, H, W) uint8 images at the model input size
+        :type images: torch.Tensor
+
+        :param boxes: ground truth of every image in input pixels, with the
+                      class ids as labels
+        :type boxes: list[:class:`BoxArray`]
+
+        :param difficult: difficult flags of the boxes of every image
+        :type difficult: list[numpy.ndarray]
+
+        :param collate: describes the model head, defaults to the VOC head
+        :type collate: :class:`YoloCollate`
+
+        :returns: instance of the ProxyEvaluator class
+        :rtype: :class:`ProxyEvaluator`
+        """
+        self.images = images
+        self.boxes = [b.numpy() for b in boxes]
+        self.difficult = [np.asarray(d, dtype=bool) for d in difficult]
+        self.collate = collate or YoloCollate()
+        num_classes = self.collate.num_classes
+        self.num_positives = np.zeros((len(boxes), num_classes), dtype=np.int64)
+        for n, (b, d) in enumerate(zip(self.boxes, self.difficult)):
+            np.add.at(self.num_positives[n], b.labels[~d], 1)
+
+    @staticmethod
+    def from_dataset(
+        dataset: Dataset, indices: np.ndarray, collate: YoloCollate = None
+    ) -> "ProxyEvaluator":
+        """Loads a subset of a dataset
+
+        :param dataset: indexable dataset of images at the model input size
+                        and :class:`yolo.annotations.AnnotationTarget` targets
+        :type dataset: :class:`torch.utils.data.Dataset`
+
+        :param indices: indices of the subset, see :func:`open_proxy_subset`
+        :type indices: numpy.ndarray
+
+        :param collate: describes the model head, defaults to the VOC head
+        :type collate: :class:`YoloCollate`
+
+        :returns: evaluator over the loaded subset
+        :rtype: :class:`ProxyEvaluator`
+        """
+        collate = collate or YoloCollate()
+        images, targets = [], []
+        for index in indices:
+            image, target = dataset[int(index)]
+            image = torch.as_tensor(image)
+            if image.is_floating_point():
+                image = image.mul(255).round().to(torch.uint8)
+            images.append(image)
+            targets.append(target)
+        return ProxyEvaluator(
+            torch.stack(images),
+            collate.input_boxes(targets),
+            [t.difficult for t in targets],
+            collate,
+        )
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+    def match(
+        self,
+        model,
+        normalize=None,
+        batch_size: int = 64,
+        conf_threshold: float = EVAL_CONF_THRESHOLD,
+        iou_threshold: float = 0.5,
+    ) -> tuple[np.ndarray, ...]:
+        """Runs the model on the subset and matches its detections
+
+        :param model: model returning raw YOLO outputs from ``predict``
+        :type model: :class:`yolo.model.Yolo`
+
+        :param normalize: converts the uint8 batches, see
+                          :class:`yolo.data.BatchNormalizer`
+        :type normalize: Callable
+
+        :param batch_size: number of images per forward pass
+        :type batch_size: int
+
+        :param conf_threshold: minimum confidence of a detection
+        :type conf_threshold: float
+
+        :param iou_threshold: minimum IoU of a match
+        :type iou_threshold: float
+
+        :returns: (D,) image, class id, confidence and true positive flag
+                  of every detection that is not matched to a difficult box
+        :rtype: tuple of numpy.ndarray
+        """
+        collate = self.collate
+        was_training = model.training
+        model.eval()
+        detections = []
+        try:
+            for start in range(0, len(self), batch_size):
+                images = self.images[start : start + batch_size]
+                if normalize is not None:
+                    images = normalize(images)
+                else:
+                    images = images.float() / 255
+                outputs = model.predict(images)
+                detections += postprocess(
+                    outputs.flatten(1).float().cpu(),
+                    collate.grid_size,
+                    collate.num_boxes,
+                    collate.num_classes,
+                    collate.image_size,
+                    conf_threshold=conf_threshold,
+                )
+        finally:
+            model.train(was_training)
+
+        image_idx, labels, conf, tp = [], [], [], []
+        for n, (found, truth) in enumerate(zip(detections, self.boxes)):
+            found = found.numpy()
+            matches = match_boxes(found, truth, iou_threshold, self.difficult[n])
+            hit = matches >= 0
+            # Like VOC, detections of difficult boxes count neither way
+            keep = matches != IGNORED
+            image_idx.append(np.full(keep.sum(), n))
+            labels.append(found.labels[keep])
+            conf.append(found.conf[keep])
+            tp.append(hit[keep])
+        return (
+            np.concatenate(image_idx).astype(np.int64),
+            np.concatenate(labels).astype(np.int64),
+            np.concatenate(conf).astype(np.float64),
+            np.concatenate(tp).astype(bool),
+        )
+
+    def evaluate(
+        self,
+        model,
+        normalize=None,
+        batch_size: int = 64,
+        bootstrap: int = DEFAULT_BOOTSTRAP,
+        confidence: float = 0.95,
+        seed: int = 0,
+    ) -> dict:
+        """Estimates the mAP of a model on the subset
+
+        :param model: model returning raw YOLO outputs from ``predict``
+        :type model: :class:`yolo.model.Yolo`
+
+        :param normalize: converts the uint8 batches, see
+                          :class:`yolo.data.BatchNormalizer`
+        :type normalize: Callable
+
+        :param batch_size: number of images per forward pass
+        :type batch_size: int
+
+        :param bootstrap: number of bootstrap resamples of the images
+        :type bootstrap: int
+
+        :param confidence: coverage of the interval
+        :type confidence: float
+
+        :param seed: seed of the resampling
+        :type seed: int
+
+        :returns: mAP, the bounds of its confidence interval, the APs per
+                  class, the number of images and the evaluation time
+        :rtype: dict
+        """
+        start = time.perf_counter()
+        matched = self.match(model, normalize, batch_size)
+        mean_ap, ap = mean_average_precision(*matched, self.num_positives)
+
+        rng = np.random.default_rng(seed)
+        n = len(self)
+        resampled = [
+            mean_average_precision(
+                *matched, self.num_positives, rng.multinomial(n, np.full(n, 1 / n))
+            )[0]
+            for _ in range(bootstrap)
+        ]
+        tail = (1 - confidence) / 2 * 100
+        if bootstrap:
+            low, high = np.percentile(resampled, [tail, 100 - tail])
+        else:
+            low = high = mean_ap
+        return {
+            "map": mean_ap,
+            "ci_low": float(low),
+            "ci_high": float(high),
+            "ap": ap.tolist(),
+            "images": n,
+            "seconds": time.perf_counter() - start,
+        }
@@ -0,0 +1,261 @@
+import copy
+import io
+import warnings
+from typing import Iterable
+
+import torch
+import torch.nn as nn
+from torch.ao.quantization import (
+    DeQuantStub,
+    QuantStub,
+    convert,
+    fuse_modules,
+    get_default_qconfig,
+    prepare,
+    quantize_dynamic,
+)
+
+from yolo.base import match_boxes
+from yolo.bench import time_fn
+from yolo.model import ConvAct
+from yolo.postprocess import postprocess
+from yolo.targets import YoloCollate
+from yolo.weights import save_state_dict
+
+# Saved by :func:`save_quantized` in place of a plain state dict, so
+# :meth:`yolo.model.Yolo.load_weights` knows to quantize before loading
+QUANTIZED_FORMAT = "yolo-int8"
+DEFAULT_BACKEND = "x86"
+
+
+def _fusion_groups(layers: nn.Sequential) -> list[list[str]]:
+    """Names of every conv with the batch norm and ReLU following it"""
+    modules = list(layers)
+    groups = []
+    for i, module in enumerate(modules):
+        if type(module) is not nn.Conv2d:
+            continue
+        group = [str(i)]
+        j = i + 1
+        if j < len(modules) and isinstance(modules[j], nn.BatchNorm2d):
+            group.append(str(j))
+            j += 1
+        if j < len(modules) and isinstance(modules[j], nn.ReLU):
+            group.append(str(j))
+        if len(group) > 1:
+            groups.append(group)
+    return groups
+
+
+def _quantizable(
+    layers: nn.Sequential, backend: str, inplace: bool = False
+) -> nn.Sequential:
+    """Rebuilds the layers with every conv fused with its norm and ReLU, and
+    the convolutional part between a QuantStub and a DeQuantStub. The
+    fully connected part stays float here, it is quantized dynamically."""
+    if any(isinstance(module, ConvAct) for module in layers):
+        raise ValueError("Can not quantize ConvAct layers, build without fuse")
+    if not inplace:
+        layers = copy.deepcopy(layers)
+    layers.eval()
+    fuse_modules(layers, _fusion_groups(layers), inplace=True)
+
+    modules = [QuantStub()]
+    quantized = True
+    for module in layers:
+        if isinstance(module, (nn.Identity, nn.Dropout)):
+            continue
+        if quantized and isinstance(module, (nn.Flatten, nn.Linear)):
+            modules.append(DeQuantStub())
+            quantized = False
+        modules.append(module)
+    if quantized:
+        modules.append(DeQuantStub())
+
+    net = nn.Sequential(*modules).eval()
+    net.qconfig = get_default_qconfig(backend)
+    for module in net.modules():
+        if isinstance(module, nn.Linear):
+            module.qconfig = None
+    return net
+
+
+def quantize_layers(
+    layers: nn.Sequential,
+    calibration: Iterable[torch.Tensor] = (),
+    backend: str = DEFAULT_BACKEND,
+    inplace: bool = False,
+) -> nn.Sequential:
+    """Quantizes the layers of a model for CPU inference: the convs
+    statically to int8 with activation ranges observed on the calibration
+    batches, the fully connected layers dynamically to int8.
+
+    :param layers: float layers, built without ``fuse``
+    :type layers: nn.Sequential
+
+    :param calibration: normalized input batches. Without any, the
+                        quantization parameters are placeholders to be
+                        overwritten by a state dict.
+    :type calibration: Iterable[torch.Tensor]
+
+    :param backend: quantized engine, ``x86`` or ``qnnpack``
+    :type backend: str
+
+    :param inplace: reuse the float modules instead of copying them, which
+                    saves the memory of a second float model
+    :type inplace: bool
+
+    :returns: quantized layers
+    :rtype: nn.Sequential
+    """
+    torch.backends.quantized.engine = backend
+    net = _quantizable(layers, backend, inplace)
+    with warnings.catch_warnings():
+        # Observers without data warn when they are converted, which is
+        # expected when the parameters come from a state dict
+        warnings.simplefilter("ignore", UserWarning)
+        prepare(net, inplace=True)
+        with torch.no_grad():
+            for images in calibration:
+                net(images)
+        convert(net, inplace=True)
+        return quantize_dynamic(net, {nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def save_quantized(model, path: str):
+    """Saves a quantized :class:`yolo.model.Yolo` so that
+    :meth:`yolo.model.Yolo.load_weights` of a float model of the same
+    config loads it
+
+    :param model: model quantized with :meth:`yolo.model.Yolo.quantize`
+    :type model: :class:`yolo.model.Yolo`
+
+    :param path: path of the file, in the torch format
+    :type path: str
+    """
+    save_state_dict(
+        {
+            "format": QUANTIZED_FORMAT,
+            "backend": model.quantized,
+            "state_dict": model.state_dict(),
+        },
+        path,
+    )
+
+
+def state_dict_bytes(model: nn.Module) -> int:
+    """
+    :param model: any module
+    :type model: nn.Module
+
+    :returns: size of the serialized state dict
+    :rtype: int
+    """
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def _agreement(reference: list, other: list, iou_threshold: float = 0.5) -> float:
+    """Fraction of the reference detections that the other model finds too,
+    with the same class"""
+    found = total = 0
+    for a, b in zip(reference, other):
+        total += len(a)
+        if len(a) and len(b):
+            found += int((match_boxes(b.numpy(), a.numpy(), iou_threshold) >= 0).sum())
+    return found / total if total else 1.0
+
+
+def quantization_report(
+    fp32,
+    int8,
+    images: torch.Tensor,
+    evaluator=None,
+    normalize=None,
+    collate: YoloCollate = None,
+    repeat: int = 5,
+) -> dict:
+    """Compares a float model with its quantized copy
+
+    :param fp32: float model
+    :type fp32: :class:`yolo.model.Yolo`
+
+    :param int8: quantized model
+    :type int8: :class:`yolo.model.Yolo`
+
+    :param images: normalized batch the latency and the agreement of the
+                   outputs are measured on
+    :type images: torch.Tensor
+
+    :param evaluator: if given, the mAP of both models is estimated on its
+                      subset
+    :type evaluator: :class:`yolo.proxy.ProxyEvaluator`
+
+    :param normalize: converts the uint8 batches of the evaluator
+    :type normalize: Callable
+
+    :param collate: describes the model head, defaults to the VOC head
+    :type collate: :class:`yolo.targets.YoloCollate`
+
+    :param repeat: number of timed batches
+    :type repeat: int
+
+    :returns: per model the size in MiB, the batch latency and the mAP if
+              evaluated, and how closely the int8 outputs and detections
+              follow the float ones
+    :rtype: dict
+    """
+    report = {}
+    outputs = {}
+    for name, model in (("fp32", fp32), ("int8", int8)):
+        model.eval()
+        outputs[name] = model.predict(images).flatten(1).float()
+        timing = time_fn(lambda: model.predict(images), repeat=repeat, warmup=1)
+        report[name] = {
+            "size_mib": state_dict_bytes(model) / 2**20,
+            "p50_ms": timing["p50_ms"],
+        }
+        if evaluator is not None:
+            result = evaluator.evaluate(model, normalize)
+            report[name].update({k: result[k] for k in ("map", "ci_low", "ci_high")})
+    diff = (outputs["int8"] - outputs["fp32"]).abs()
+    collate = collate or YoloCollate()
+    options = {
+        "grid_size": collate.grid_size,
+        "num_boxes": collate.num_boxes,
+        "num_classes": collate.num_classes,
+        "image_size": collate.image_size,
+    }
+    report["max_output_diff"] = diff.max().item()
+    report["mean_output_diff"] = diff.mean().item()
+    report["detection_agreement"] = _agreement(
+        postprocess(outputs["fp32"], **options),
+        postprocess(outputs["int8"], **options),
+    )
+    return report
+
+
+def format_report(report: dict) -> str:
+    """
+    :param report: report from :func:`quantization_report`
+    :type report: dict
+
+    :returns: table of both models and the agreement of their outputs
+    :rtype: str
+    """
+    lines = [f"{'model':<6} {'MiB':>8} {'p50 ms':>9} {'mAP@0.5':>22}"]
+    for name in ("fp32", "int8"):
+        r = report[name]
+        accuracy = "-"
+        if "map" in r:
+            accuracy = f"{r['map']:.4f} ({r['ci_low']:.4f}-{r['ci_high']:.4f})"
+        lines.append(
+            f"{name:<6} {r['size_mib']:>8.1f} {r['p50_ms']:>9.1f} {accuracy:>22}"
+        )
+    lines.append(
+        f"output diff max {report['max_output_diff']:.4f}, "
+        f"mean {report['mean_output_diff']:.4f}; "
+        f"{report['detection_agreement']:.1%} of the fp32 detections kept"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,248 @@
+import io
+import json
+import os
+import random
+import tarfile
+from typing import Callable, Iterator, Sequence
+
+import numpy as np
+from torch.utils.data import IterableDataset, get_worker_info
+
+from yolo.annotations import AnnotationIndex, AnnotationTarget
+from yolo.decode import decode_image
+
+SHARD_INDEX = "shards.json"
+DEFAULT_SAMPLES_PER_SHARD = 1000
+DEFAULT_SHUFFLE_BUFFER = 1000
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def write_shards(
+    image_paths: Sequence[str],
+    annotations: AnnotationIndex,
+    output_dir: str,
+    samples_per_shard: int = DEFAULT_SAMPLES_PER_SHARD,
+    prefix: str = "voc",
+) -> list[str]:
+    """Packs images and their parsed annotations into sequential tar shards.
+
+    Every sample is a ``<key>.jpg`` member with the original image bytes
+    followed by a ``<key>.json`` member with the annotation arrays. A
+    ``shards.json`` index lists the shards and their sample counts.
+
+    :param image_paths: paths of the images, in index order
+    :type image_paths: Sequence[str]
+
+    :param annotations: annotations of the images
+    :type annotations: :class:`AnnotationIndex`
+
+    :param output_dir: directory to write the shards to
+    :type output_dir: str
+
+    :param samples_per_shard: number of samples per tar file
+    :type samples_per_shard: int
+
+    :param prefix: file name prefix of the shards
+    :type prefix: str
+
+    :returns: paths of the written shards
+    :rtype: list[str]
+    """
+    if len(image_paths) != len(annotations):
+        raise ValueError("Every image needs exactly one annotation")
+    os.makedirs(output_dir, exist_ok=True)
+
+    shards = []
+    for start in range(0, len(image_paths), samples_per_shard):
+        stop = min(start + samples_per_shard, len(image_paths))
+        name = f"{prefix}-{len(shards):06d}.tar"
+        path = os.path.join(output_dir, name)
+        with tarfile.open(path + ".tmp", "w") as tar:
+            for n in range(start, stop):
+                target = annotations[n]
+                key = f"{n:08d}"
+                with open(image_paths[n], "rb") as file:
+                    _add_bytes(tar, key + ".jpg", file.read())
+                record = {
+                    "image_id": target.image_id,
+                    "size": list(target.size),
+                    "boxes": target.boxes.tolist(),
+                    "labels": target.labels.tolist(),
+                    "difficult": target.difficult.tolist(),
+                }
+                _add_bytes(tar, key + ".json", json.dumps(record).encode())
+        os.replace(path + ".tmp", path)
+        shards.append({"path": name, "samples": stop - start})
+
+    index_path = os.path.join(output_dir, SHARD_INDEX)
+    with open(index_path + ".tmp", "w") as file:
+        json.dump({"class_names": annotations.class_names, "shards": shards}, file)
+    os.replace(index_path + ".tmp", index_path)
+    return [os.path.join(output_dir, s["path"]) for s in shards]
+
+
+def convert_voc(
+    voc_root: str,
+    output_dir: str,
+    image_set: str = "train",
+    samples_per_shard: int = DEFAULT_SAMPLES_PER_SHARD,
+    num_workers: int = 8,
+) -> list[str]:
+    """Converts a split of a VOCdevkit directory into tar shards
+
+    :param voc_root: year directory of the devkit, e.g.
+                     ``dataset/VOCdevkit/VOC2012``
+    :type voc_root: str
+
+    :param output_dir: directory to write the shards to
+    :type output_dir: str
+
+    :param image_set: name of the split in ``ImageSets/Main``
+    :type image_set: str
+
+    :param samples_per_shard: number of samples per tar file
+    :type samples_per_shard: int
+
+    :param num_workers: number of processes parsing the annotations
+    :type num_workers: int
+
+    :returns: paths of the written shards
+    :rtype: list[str]
+    """
+    with open(os.path.join(voc_root, "ImageSets", "Main", image_set + ".txt")) as f:
+        ids = [line.strip() for line in f if line.strip()]
+    images = [os.path.join(voc_root, "JPEGImages", i + ".jpg") for i in ids]
+    xmls = [os.path.join(voc_root, "Annotations", i + ".xml") for i in ids]
+    annotations = AnnotationIndex.build(xmls, num_workers=num_workers)
+    return write_shards(images, annotations, output_dir, samples_per_shard)
+
+
+def _read_samples(path: str) -> Iterator[tuple[bytes, AnnotationTarget]]:
+    """Streams the (image bytes, target) pairs of a shard in file order"""
+    image = None
+    with tarfile.open(path, "r|") as tar:
+        for member in tar:
+            data = tar.extractfile(member).read()
+            if member.name.endswith(".json"):
+                record = json.loads(data)
+                yield image, AnnotationTarget(
+                    record["image_id"],
+                    np.array(record["boxes"], dtype=np.float32).reshape(-1, 4),
+                    np.array(record["labels"], dtype=np.int64),
+                    np.array(record["difficult"], dtype=bool),
+                    tuple(record["size"]),
+                )
+            else:
+                image = data
+
+
+class TarShardDataset(IterableDataset):
+    """Training samples streamed sequentially from tar shards
+
+    Every DataLoader worker reads its own subset of the shards, so each
+    shard is read front to back by one process. Samples are mixed through
+    a shuffle buffer of undecoded image bytes; only the samples leaving
+    the buffer are decoded. Call :meth:`set_epoch` before every epoch to
+    get a different order.
+    """
+
+    def __init__(
+        self,
+        shards_dir: str,
+        image_size: tuple[int, int] = (448, 448),
+        transform: Callable = None,
+        shuffle_buffer: int = DEFAULT_SHUFFLE_BUFFER,
+        seed: int = 0,
+    ):
+        """Constructor for a dataset over the shards in a directory
+
+        :param shards_dir: directory written by :func:`write_shards`
+        :type shards_dir: str
+
+        :param image_size: (width, height) to decode the images to
+        :type image_size: tuple (int, int)
+
+        :param transform: applied to every decoded PIL image
+        :type transform: Callable
+
+        :param shuffle_buffer: number of samples in the shuffle buffer,
+                               0 or 1 keeps the shard order
+        :type shuffle_buffer: int
+
+        :param seed: seed of the shard and sample order
+        :type seed: int
+
+        :returns: instance of the TarShardDataset class
+        :rtype: :class:`TarShardDataset`
+        """
+        with open(os.path.join(shards_dir, SHARD_INDEX)) as file:
+            index = json.load(file)
+        self.shards = [os.path.join(shards_dir, s["path"]) for s in index["shards"]]
+        self.num_samples = sum(s["samples"] for s in index["shards"])
+        self.class_names = tuple(index["class_names"])
+        self.image_size = tuple(image_size)
+        self.transform = transform
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int):
+        """
+        :param epoch: epoch number mixed into the shuffle seed
+        :type epoch: int
+        """
+        self.epoch = epoch
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    def _worker_samples(self, rng: random.Random):
+        info = get_worker_info()
+        worker, workers = (0, 1) if info is None else (info.id, info.num_workers)
+        shards = list(self.shards)
+        rng.shuffle(shards)
+        if len(shards) >= workers:
+            for path in shards[worker::workers]:
+                yield from _read_samples(path)
+        else:
+            # Too few shards to give every worker its own, so every worker
+            # reads all of them and keeps its share of the samples
+            n = 0
+            for path in shards:
+                for sample in _read_samples(path):
+                    if n % workers == worker:
+                        yield sample
+                    n += 1
+
+    def _shuffled(self, samples, rng: random.Random):
+        if self.shuffle_buffer <= 1:
+            yield from samples
+            return
+        buffer = []
+        for sample in samples:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(sample)
+                continue
+            k = rng.randrange(len(buffer))
+            yield buffer[k]
+            buffer[k] = sample
+        rng.shuffle(buffer)
+        yield from buffer
+
+    def __iter__(self) -> Iterator[tuple]:
+        # The shard order must be the same in every worker, so the seed
+        # does not depend on the worker id until the shards are split
+        shard_rng = random.Random(self.seed * 1_000_003 + self.epoch)
+        info = get_worker_info()
+        worker = 0 if info is None else info.id
+        sample_rng = random.Random((self.seed * 1_000_003 + self.epoch) * 997 + worker)
+        for data, target in self._shuffled(self._worker_samples(shard_rng), sample_rng):
+            image = decode_image(io.BytesIO(data), self.image_size)
+            if self.transform is not None:
+                image = self.transform(image)
+            yield image, target
@@ -0,0 +1,338 @@
+import math
+import time
+from typing import NamedTuple
+
+import torch
+import torch.nn as nn
+
+from yolo.model import DEFAULT_IN_CHANNELS, DEFAULT_INPUT_SIZE, _output_shape
+from yolo.postprocess import DEFAULT_GRID_SIZE, DEFAULT_NUM_BOXES, DEFAULT_NUM_CLASSES
+
+# Bytes per element of the float32 activations
+ELEMENT_BYTES = 4
+ACTIVATIONS = ("relu", "leaky_relu", "linear")
+
+
+class ConfigError(ValueError):
+    """A layer of the ``[model]`` section can not be built"""
+
+
+class LayerInfo(NamedTuple):
+    """Static cost of one layer of the ``[model]`` section, per sample"""
+
+    index: int
+    name: str
+    type: str
+    input_shape: tuple[int, ...]
+    output_shape: tuple[int, ...]
+    params: int
+    macs: int
+    activation_bytes: int
+    # Value of ``checkpoint``, False if the layer is not checkpointed
+    checkpoint: object = False
+
+
+def _require(layer: dict, where: str, *keys: str):
+    for key in keys:
+        if key not in layer:
+            raise ConfigError(f"{where}: missing {key!r}")
+        if not isinstance(layer[key], int) or layer[key] <= 0:
+            raise ConfigError(f"{where}: {key!r} must be a positive integer")
+
+
+def _activation(layer: dict, where: str, allowed=ACTIVATIONS):
+    activation = layer.get("activation", "relu")
+    if activation not in allowed:
+        raise ConfigError(f"{where}: unsupported activation {activation!r}")
+
+
+def infer_layers(config) -> list[LayerInfo]:
+    """Infers the shape of every tensor of the ``[model]`` section from the
+    input size, without building the model.
+
+    The shapes come from the same function :func:`yolo.model.get_layers`
+    sizes its modules with, so every config that passes can be built. The
+    output of the last layer must hold the ``grid_size`` x ``grid_size``
+    cells of the head.
+
+    :param config: the ``[model]`` section of the configuration
+    :type config: dict
+
+    :returns: shapes and costs of every layer, per sample
+    :rtype: list[:class:`LayerInfo`]
+    :raises ConfigError: naming the first layer that can not be built
+    """
+    size = config.get("input_size", DEFAULT_INPUT_SIZE)
+    shape = (DEFAULT_IN_CHANNELS, size, size)
+    infos = []
+    for i, layer in enumerate(config.get("layers", [])):
+        name = layer.get("name", f"layer{i}")
+        layer_type = layer.get("type")
+        where = f"layer {i} ({name})"
+        in_shape = shape
+        params = macs = 0
+        checkpoint = layer.get("checkpoint", False)
+        if not isinstance(checkpoint, (bool, int, str)):
+            raise ConfigError(f"{where}: checkpoint must be a boolean or a name")
+        if checkpoint and config.get("compile", False):
+            raise ConfigError(f"{where}: checkpointed layers can not be compiled")
+
+        if layer_type == "conv":
+            _require(layer, where, "filters", "kernel_size", "stride")
+            _activation(layer, where, ("relu", "leaky_relu"))
+        elif layer_type == "maxpool":
+            _require(layer, where, "kernel_size", "stride")
+        elif layer_type == "fc":
+            _require(layer, where, "filters")
+            _activation(layer, where)
+            if not 0 <= layer.get("dropout", 0.0) < 1:
+                raise ConfigError(f"{where}: dropout must be in [0, 1)")
+        elif layer_type == "reshape":
+            if "shape" not in layer:
+                raise ConfigError(f"{where}: missing 'shape'")
+        else:
+            raise ConfigError(f"{where}: unsupported layer type {layer_type!r}")
+        try:
+            shape = _output_shape(layer, in_shape)
+        except ValueError as error:
+            raise ConfigError(f"{where}: {error}") from None
+
+        if layer_type == "conv":
+            c, k = in_shape[0], layer["kernel_size"]
+            # A batch norm replaces the bias by a scale and a shift
+            bias = 2 if layer.get("batch_norm", False) else 1
+            params = layer["filters"] * (c * k * k + bias)
+            macs = math.prod(shape) * c * k * k
+        elif layer_type == "fc":
+            in_features = math.prod(in_shape)
+            params = layer["filters"] * (in_features + 1)
+            macs = layer["filters"] * in_features
+
+        if min(shape) <= 0:
+            raise ConfigError(f"{where}: the input {in_shape} shrinks to {shape}")
+        infos.append(
+            LayerInfo(
+                i,
+                name,
+                layer_type,
+                in_shape,
+                shape,
+                params,
+                macs,
+                math.prod(shape) * ELEMENT_BYTES,
+                checkpoint or False,
+            )
+        )
+
+    if not infos:
+        raise ConfigError("The model has no layers")
+    s = config.get("grid_size", DEFAULT_GRID_SIZE)
+    cell = config.get("num_boxes", DEFAULT_NUM_BOXES) * 5 + config.get(
+        "num_classes", DEFAULT_NUM_CLASSES
+    )
+    if math.prod(shape) != s * s * cell:
+        raise ConfigError(
+            f"The output {shape} does not hold {s}x{s} cells of {cell} values"
+        )
+    return infos
+
+
+def _count(n: float) -> str:
+    for unit in ("", "K", "M", "G", "T"):
+        if abs(n) < 1000:
+            return f"{n:.0f}{unit}" if unit == "" else f"{n:.2f}{unit}"
+        n /= 1000
+    return f"{n:.2f}P"
+
+
+def checkpoint_cost(infos: list[LayerInfo]) -> dict:
+    """Estimates what activation checkpointing trades, per sample, from the
+    layer outputs. A checkpointed segment keeps only its last output for
+    the backward pass and runs its forward pass again to rebuild the
+    others. The backward pass goes from the last layer to the first, so a
+    segment is rebuilt while only the outputs before it are still kept.
+
+    :param infos: layers from :func:`infer_layers`
+    :type infos: list[:class:`LayerInfo`]
+
+    :returns: number of segments, bytes of the layer outputs kept for the
+              backward pass with and without checkpointing, the peak bytes
+              with checkpointing, the MACs recomputed and their share of a
+              training step, taken as three forward passes
+    :rtype: dict
+    """
+    # (start, end) layers of every checkpointed segment
+    segments = []
+    for n, info in enumerate(infos):
+        if not info.checkpoint:
+            continue
+        if (
+            segments
+            and segments[-1][1] == n
+            and infos[n - 1].checkpoint == (info.checkpoint)
+        ):
+            segments[-1][1] = n + 1
+        else:
+            segments.append([n, n + 1])
+
+    stored = [info.activation_bytes for info in infos]
+    for start, end in segments:
+        for n in range(start, end - 1):
+            stored[n] = 0
+    peak = sum(stored)
+    for start, end in segments:
+        rebuilt = sum(info.activation_bytes for info in infos[start:end])
+        peak = max(peak, sum(stored[:start]) + rebuilt)
+    recomputed = sum(i.macs for start, end in segments for i in infos[start:end])
+    total = sum(i.macs for i in infos)
+    return {
+        "segments": len(segments),
+        "kept_bytes": sum(info.activation_bytes for info in infos),
+        "checkpointed_bytes": sum(stored),
+        "peak_bytes": peak,
+        "recomputed_macs": recomputed,
+        "extra_compute": recomputed / (3 * total) if total else 0.0,
+    }
+
+
+def format_summary(infos: list[LayerInfo], batch_size: int = 1) -> str:
+    """
+    :param infos: layers from :func:`infer_layers`
+    :type infos: list[:class:`LayerInfo`]
+
+    :param batch_size: the memory and MACs are given for this batch size
+    :type batch_size: int
+
+    :returns: table of the layers with the totals
+    :rtype: str
+    """
+    header = (
+        f"{'#':>3} {'name':<10} {'type':<8} {'output':<16} {'params':>9} "
+        f"{'MACs':>9} {'act MiB':>9} {'ckpt':>4}"
+    )
+    lines = [header, "-" * len(header)]
+    for info in infos:
+        lines.append(
+            f"{info.index:>3} {info.name:<10} {info.type:<8} "
+            f"{'x'.join(map(str, info.output_shape)):<16} {_count(info.params):>9} "
+            f"{_count(info.macs * batch_size):>9} "
+            f"{info.activation_bytes * batch_size / 2**20:>9.2f} "
+            f"{'yes' if info.checkpoint else '':>4}"
+        )
+    params = sum(i.params for i in infos)
+    lines.append("-" * len(header))
+    lines.append(
+        f"batch {batch_size}: {_count(params)} params "
+        f"({params * ELEMENT_BYTES / 2**20:.0f} MiB), "
+        f"{_count(sum(i.macs for i in infos) * batch_size)} MACs, "
+        f"{sum(i.activation_bytes for i in infos) * batch_size / 2**20:.0f} MiB "
+        "of layer outputs"
+    )
+    cost = checkpoint_cost(infos)
+    if cost["segments"]:
+        mib = lambda n: f"{n * batch_size / 2**20:.0f} MiB"
+        lines.append(
+            f"checkpointing {cost['segments']} segments: "
+            f"{mib(cost['checkpointed_bytes'])} of layer outputs kept for the "
+            f"backward pass instead of {mib(cost['kept_bytes'])}, peak "
+            f"{mib(cost['peak_bytes'])} while recomputing, for "
+            f"{_count(cost['recomputed_macs'] * batch_size)} more MACs "
+            f"(+{cost['extra_compute']:.0%} per training step)"
+        )
+    return "\n".join(lines)
+
+
+def profile_modules(
+    model: nn.Module, images: torch.Tensor, repeat: int = 3
+) -> list[dict]:
+    """Measures the forward and backward time of every module of
+    ``model.layers`` with hooks
+
+    :param model: model with an ``nn.Sequential`` of ``layers``
+    :type model: :class:`yolo.model.Yolo`
+
+    :param images: input batch
+    :type images: torch.Tensor
+
+    :param repeat: number of timed passes, after one warm up pass
+    :type repeat: int
+
+    :returns: per module its index, its class name and the mean forward
+              and backward time in milliseconds
+    :rtype: list[dict]
+    """
+    modules = list(model.layers)
+    forward = [0.0] * len(modules)
+    backward = [0.0] * len(modules)
+    starts = {}
+    timing = [False]
+    handles = []
+
+    def hooks(n):
+        def forward_pre(module, args):
+            starts[("f", n)] = time.perf_counter()
+
+        def forward_post(module, args, output):
+            if timing[0]:
+                forward[n] += time.perf_counter() - starts[("f", n)]
+
+        def backward_pre(module, grad_output):
+            starts[("b", n)] = time.perf_counter()
+
+        def backward_post(module, grad_input, grad_output):
+            if timing[0]:
+                backward[n] += time.perf_counter() - starts[("b", n)]
+
+        return forward_pre, forward_post, backward_pre, backward_post
+
+    for n, module in enumerate(modules):
+        forward_pre, forward_post, backward_pre, backward_post = hooks(n)
+        handles += [
+            module.register_forward_pre_hook(forward_pre),
+            module.register_forward_hook(forward_post),
+            module.register_full_backward_pre_hook(backward_pre),
+            module.register_full_backward_hook(backward_post),
+        ]
+    # Full backward hooks need an input that requires grad to fire on the
+    # first module
+    images = images.detach().requires_grad_(True)
+    try:
+        for run in range(repeat + 1):
+            timing[0] = run > 0
+            model.zero_grad(set_to_none=True)
+            model(images).sum().backward()
+    finally:
+        for handle in handles:
+            handle.remove()
+    return [
+        {
+            "index": n,
+            "module": type(module).__name__,
+            "forward_ms": forward[n] * 1000 / repeat,
+            "backward_ms": backward[n] * 1000 / repeat,
+        }
+        for n, module in enumerate(modules)
+    ]
+
+
+def format_profile(profile: list[dict]) -> str:
+    """
+    :param profile: modules from :func:`profile_modules`
+    :type profile: list[dict]
+
+    :returns: table of the module times with the totals
+    :rtype: str
+    """
+    header = f"{'#':>3} {'module':<12} {'forward ms':>11} {'backward ms':>12}"
+    lines = [header, "-" * len(header)]
+    for p in profile:
+        lines.append(
+            f"{p['index']:>3} {p['module']:<12} {p['forward_ms']:>11.2f} "
+            f"{p['backward_ms']:>12.2f}"
+        )
+    lines.append("-" * len(header))
+    lines.append(
+        f"{'total':<16} {sum(p['forward_ms'] for p in profile):>11.2f} "
+        f"{sum(p['backward_ms'] for p in profile):>12.2f}"
+    )
+    return "\n".join(lines)
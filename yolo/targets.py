@@ -0,0 +1,242 @@
+from typing import Callable, List, Tuple
+
+import numpy as np
+import torch
+
+from yolo.annotations import AnnotationTarget
+from yolo.base import BoxArray
+from yolo.data import stack_images
+from yolo.utils.convert import objects_to_arrays, VOC_CLASSES
+from yolo.postprocess import (
+    DEFAULT_GRID_SIZE,
+    DEFAULT_NUM_BOXES,
+    DEFAULT_NUM_CLASSES,
+    DEFAULT_IMAGE_SIZE,
+)
+
+
+def annotation_to_arrays(
+    target, class_names: tuple[str, ...] = VOC_CLASSES
+) -> tuple[np.ndarray, np.ndarray, tuple[int, int]]:
+    """Extracts the boxes, class ids and image size of a VOC target
+
+    :param target: target from an :class:`yolo.annotations.AnnotationIndex`,
+                   or a target dict as returned by
+                   :class:`torchvision.datasets.VOCDetection`
+    :type target: :class:`yolo.annotations.AnnotationTarget` or dict
+
+    :param class_names: class names, the index of a name is its class id
+    :type class_names: tuple[str, ...]
+
+    :returns: (K, 4) xyxy boxes, (K,) class ids and (width, height) of the
+              original image
+    :rtype: tuple (numpy.ndarray, numpy.ndarray, tuple (int, int))
+    """
+    if isinstance(target, AnnotationTarget):
+        return target.boxes, target.labels, target.size
+    anno = target["annotation"]
+    size = anno["size"]
+    boxes, labels = objects_to_arrays(anno.get("object", []), class_names)
+    return boxes, labels, (int(size["width"]), int(size["height"]))
+
+
+def encode_targets(
+    boxes: torch.Tensor,
+    labels: torch.Tensor,
+    image_idx: torch.Tensor,
+    batch_size: int,
+    grid_size: int = DEFAULT_GRID_SIZE,
+    num_boxes: int = DEFAULT_NUM_BOXES,
+    num_classes: int = DEFAULT_NUM_CLASSES,
+    image_size: tuple[int, int] = DEFAULT_IMAGE_SIZE,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Encodes the boxes of a whole batch into dense YOLO targets.
+
+    The layout matches :func:`yolo.postprocess.decode_outputs`: each cell
+    holds ``num_boxes`` copies of ``(x, y, w, h, 1)`` followed by a one-hot
+    class vector. When several objects share a cell the largest one wins.
+
+    :param boxes: (K, 4) xyxy boxes in model input pixels
+    :type boxes: torch.Tensor
+
+    :param labels: (K,) class ids
+    :type labels: torch.Tensor
+
+    :param image_idx: (K,) index of the image every box belongs to
+    :type image_idx: torch.Tensor
+
+    :param batch_size: number of images in the batch
+    :type batch_size: int
+
+    :param grid_size: number of cells along each side of the grid
+    :type grid_size: int
+
+    :param num_boxes: number of boxes predicted per cell
+    :type num_boxes: int
+
+    :param num_classes: number of object classes
+    :type num_classes: int
+
+    :param image_size: (width, height) of the model input
+    :type image_size: tuple (int, int)
+
+    :returns: (N, S, S, B*5+C) targets and (N, S, S) object mask
+    :rtype: tuple (torch.Tensor, torch.Tensor)
+    """
+    s = grid_size
+    targets = torch.zeros(batch_size, s, s, num_boxes * 5 + num_classes)
+    mask = torch.zeros(batch_size, s, s, dtype=torch.bool)
+    if len(boxes) == 0:
+        return targets, mask
+
+    width, height = image_size
+    cx = (boxes[:, 0] + boxes[:, 2]) / 2
+    cy = (boxes[:, 1] + boxes[:, 3]) / 2
+    w = (boxes[:, 2] - boxes[:, 0]) / width
+    h = (boxes[:, 3] - boxes[:, 1]) / height
+
+    # Sort by area so the largest box of a cell comes last
+    order = torch.argsort(w * h)
+    cx, cy, w, h = cx[order], cy[order], w[order], h[order]
+    labels, image_idx = labels[order], image_idx[order]
+
+    # Cells of the same fractional size as in decode_outputs, so the offsets
+    # decode back to the same centers when the size does not divide evenly
+    gx = cx / (width / s)
+    gy = cy / (height / s)
+    i = gx.floor().long().clamp(0, s - 1)
+    j = gy.floor().long().clamp(0, s - 1)
+    x = gx - i
+    y = gy - j
+
+    box = torch.stack([x, y, w, h, torch.ones_like(x)], dim=-1)
+    cell = torch.cat([box.repeat(1, num_boxes), torch.zeros(len(box), num_classes)], 1)
+    cell[torch.arange(len(box)), num_boxes * 5 + labels] = 1.0
+
+    # Keep only the last, i.e. largest, box of every occupied cell
+    key = (image_idx * s + i) * s + j
+    unique_keys, inverse = torch.unique(key, return_inverse=True)
+    positions = torch.arange(len(key))
+    last = torch.full((len(unique_keys),), -1, dtype=torch.long)
+    last = last.scatter_reduce(0, inverse, positions, "amax")
+
+    targets[image_idx[last], i[last], j[last]] = cell[last]
+    mask[image_idx[last], i[last], j[last]] = True
+    return targets, mask
+
+
+class YoloCollate:
+    """Collate function that stacks the images and encodes the VOC targets.
+
+    It runs inside the DataLoader workers, so the training loop receives
+    ready tensors.
+    """
+
+    def __init__(
+        self,
+        grid_size: int = DEFAULT_GRID_SIZE,
+        num_boxes: int = DEFAULT_NUM_BOXES,
+        num_classes: int = DEFAULT_NUM_CLASSES,
+        image_size: tuple[int, int] = DEFAULT_IMAGE_SIZE,
+        class_names: tuple[str, ...] = VOC_CLASSES,
+        augment: Callable = None,
+    ):
+        self.grid_size = grid_size
+        self.num_boxes = num_boxes
+        self.num_classes = num_classes
+        self.image_size = tuple(image_size)
+        self.class_names = class_names
+        # Applied to the images and boxes of every batch before encoding,
+        # see :class:`yolo.augment.BatchAugment`
+        self.augment = augment
+
+    @staticmethod
+    def from_config(config, augment: Callable = None) -> "YoloCollate":
+        """
+        :param config: the ``[model]`` section of the configuration
+        :type config: dict
+
+        :param augment: batch augmentation to apply before encoding
+        :type augment: Callable
+
+        :returns: collate function for the configured head
+        :rtype: :class:`YoloCollate`
+        """
+        input_size = config.get("input_size", DEFAULT_IMAGE_SIZE[0])
+        return YoloCollate(
+            grid_size=config.get("grid_size", DEFAULT_GRID_SIZE),
+            num_boxes=config.get("num_boxes", DEFAULT_NUM_BOXES),
+            num_classes=config.get("num_classes", DEFAULT_NUM_CLASSES),
+            image_size=(input_size, input_size),
+            augment=augment,
+        )
+
+    def input_boxes(self, targets) -> List[BoxArray]:
+        """
+        :param targets: targets of the images of a batch
+        :type targets: list[:class:`yolo.annotations.AnnotationTarget`]
+
+        :returns: boxes of every image scaled to the model input, with the
+                  class ids as labels
+        :rtype: list[:class:`BoxArray`]
+        """
+        boxes = []
+        for target in targets:
+            b, l, (width, height) = annotation_to_arrays(target, self.class_names)
+            # The images were resized to the model input, follow with the boxes
+            b = b * np.array(
+                [self.image_size[0] / width, self.image_size[1] / height] * 2,
+                dtype=np.float32,
+            )
+            boxes.append(BoxArray(b, "xyxy", labels=l))
+        return boxes
+
+    def encode(self, boxes: List[BoxArray]) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        :param boxes: boxes of every image in model input pixels
+        :type boxes: list[:class:`BoxArray`]
+
+        :returns: encoded targets and object mask, see :func:`encode_targets`
+        :rtype: tuple (torch.Tensor, torch.Tensor)
+        """
+        boxes = [b.numpy() for b in boxes]
+        return encode_targets(
+            torch.from_numpy(
+                np.concatenate([b.xyxy() for b in boxes] + [np.zeros((0, 4))])
+            ).float(),
+            torch.from_numpy(
+                np.concatenate([b.labels for b in boxes] + [np.zeros(0, np.int64)])
+            ),
+            torch.from_numpy(np.repeat(np.arange(len(boxes)), [len(b) for b in boxes])),
+            len(boxes),
+            self.grid_size,
+            self.num_boxes,
+            self.num_classes,
+            self.image_size,
+        )
+
+    def from_batch(
+        self, features: torch.Tensor, targets
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Augments and encodes an already stacked batch, e.g. one collated by
+        :func:`yolo.data.collate_fn`, to augment in the main process
+
+        :param features: (N, 3, H, W) images
+        :type features: torch.Tensor
+
+        :param targets: targets of the images
+        :type targets: list[:class:`yolo.annotations.AnnotationTarget`]
+
+        :returns: images, encoded targets and object mask
+        :rtype: tuple (torch.Tensor, torch.Tensor, torch.Tensor)
+        """
+        boxes = self.input_boxes(targets)
+        if self.augment is not None:
+            features, boxes = self.augment(features, boxes)
+        return (features, *self.encode(boxes))
+
+    def __call__(
+        self, data: List[Tuple[torch.Tensor, AnnotationTarget]]
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        tensors, targets = zip(*data)
+        return self.from_batch(stack_images(tensors), targets)
@@ -6,10 +6,19 @@ from yolo.utils.images import (
     draw_grid_on_image,
 )
 
+from yolo.utils.render import (
+    make_palette,
+    render_overlays,
+    DEFAULT_PALETTE,
+)
+
 from yolo.utils.io import (
     open_toml,
+    files_key,
 )
 
 from yolo.utils.convert import (
     objects_to_rects,
+    objects_to_arrays,
+    VOC_CLASSES,
 )
@@ -1,3 +1,5 @@
+import numpy as np
+
 from yolo.base import Rectangle, Point
 
 
@@ -23,3 +25,61 @@ def objects_to_rects(objects: dict) -> list[(str, Rectangle)]:
         rect = rect * 0.25
         rects.append((obj["name"], rect))
     return rects
+
+
+VOC_CLASSES = (
+    "aeroplane",
+    "bicycle",
+    "bird",
+    "boat",
+    "bottle",
+    "bus",
+    "car",
+    "cat",
+    "chair",
+    "cow",
+    "diningtable",
+    "dog",
+    "horse",
+    "motorbike",
+    "person",
+    "pottedplant",
+    "sheep",
+    "sofa",
+    "train",
+    "tvmonitor",
+)
+
+
+def objects_to_arrays(
+    objects: list[dict], class_names: tuple[str, ...] = VOC_CLASSES
+) -> tuple[np.ndarray, np.ndarray]:
+    """Convert a list of annotations to flat box and class id arrays
+
+    Unlike :func:`objects_to_rects` the boxes keep the annotated corners
+    and size, so they can be fed to :class:`yolo.base.BoxArray` directly.
+
+    :param objects: list of objects
+    :type objects: list[dict]
+
+    :param class_names: class names, the index of a name is its class id
+    :type class_names: tuple[str, ...]
+
+    :returns: (K, 4) xyxy boxes and (K,) class ids
+    :rtype: tuple (numpy.ndarray, numpy.ndarray)
+    """
+    class_ids = {name: i for i, name in enumerate(class_names)}
+    boxes = []
+    labels = []
+    for obj in objects:
+        bbox = obj.get("bndbox", None)
+        if bbox is None:
+            continue
+        boxes.append(
+            (bbox["xmin"], bbox["ymin"], bbox["xmax"], bbox["ymax"]),
+        )
+        labels.append(class_ids[obj["name"]])
+    return (
+        np.array(boxes, dtype=np.float32).reshape(-1, 4),
+        np.array(labels, dtype=np.int64),
+    )
@@ -2,7 +2,7 @@ import PIL.Image as Image
 import numpy as np
 import cv2
 
-from yolo.base import GridCell, Rectangle
+from yolo.base import Grid, GridSlots, Rectangle, get_grid
 
 BOUNDING_BOX_COLOR = (0, 255, 255)
 BOUNDING_BOX_THICKNESS = 2
@@ -10,6 +10,8 @@ BOUNDING_BOX_THICKNESS = 2
 MIDPOINT_SIZE = 1
 MIDPOINT_COLOR = (255, 0, 255)
 
+GRID_COLOR = (127, 127, 127)
+
 
 def save_image_buf(image_buf: np.ndarray, path: str):
     """saves an image buffer to a file
@@ -73,61 +75,41 @@ def draw_bbox_on_image(
 
 def generate_grid_cells(
     image_size: tuple[int, int], grid_size: tuple[int, int]
-) -> np.ndarray[GridCell]:
+) -> Grid:
     """Generates grid cells for an image.
 
+    Grids are memoized, so all images of the same size share one.
+
     :param image_size: size of the image
     :type image_size: tuple (int, int)
     :param grid_size: size of the grid
     :type grid_size: tuple (int, int)
 
-    :returns: list of grid cells
-    :rtype: list[:class:`GridCell`]
+    :returns: grid of cells
+    :rtype: :class:`Grid`
     """
-    grid_cells = np.empty(grid_size, dtype=GridCell)
-    delta_w = image_size[0] // grid_size[0]
-    delta_h = image_size[1] // grid_size[1]
-
-    # Add extra pixels to last grid cells if
-    # image size dimention is not divisible by grid size
-    extra_w = image_size[0] % grid_size[0]
-    extra_h = image_size[1] % grid_size[1]
-
-    for i in range(grid_size[0]):
-        for j in range(grid_size[1]):
-            w = delta_w
-            h = delta_h
-            if i == grid_size[0] - 1:
-                w = delta_w + extra_w
-            if j == grid_size[1] - 1:
-                h = delta_h + extra_h
-            cell = GridCell(w, h, i, j)
-            grid_cells[i][j] = cell
-
-    return grid_cells
+    return get_grid(image_size, grid_size)
 
 
 def draw_grid_on_image(
-    image_buf: np.ndarray, grid_cells: np.ndarray[GridCell]
+    image_buf: np.ndarray, grid: Grid, slots: GridSlots = None
 ) -> np.ndarray:
     """Draws grid cells on an image buffer.
 
     :param image_buf: image buffer as a numpy array
     :type image_buf: numpy.ndarray
-    :param grid_cells: list of grid cells
-    :type grid_cells: list[:class:`GridCell`]
+    :param grid: grid of cells
+    :type grid: :class:`Grid`
+    :param slots: boxes assigned to the cells, drawn if given
+    :type slots: :class:`GridSlots`
 
     :returns: modified image buffer as a numpy array
     :rtype: numpy.ndarray
     """
 
-    for i in range(grid_cells.shape[0]):
-        for j in range(grid_cells.shape[1]):
-            cell: GridCell = grid_cells[i][j]
-            image_buf[:, i * cell.width] = [127, 127, 127]
-            image_buf[j * cell.height, :] = [127, 127, 127]
-            image_buf[:, i * cell.width] = [127, 127, 127]
-            image_buf[j * cell.height, :] = [127, 127, 127]
-            image_buf = draw_bbox_on_image(image_buf, cell.get_bbox_list())
+    image_buf[:, grid.x_edges[:-1]] = GRID_COLOR
+    image_buf[grid.y_edges[:-1], :] = GRID_COLOR
+    if slots is not None:
+        image_buf = draw_bbox_on_image(image_buf, slots.all_boxes().to_rects())
 
     return image_buf
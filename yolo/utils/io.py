@@ -1,3 +1,7 @@
+import hashlib
+import json
+import os
+
 import toml
 
 
@@ -10,3 +14,27 @@ def open_toml(path):
     with open(path, "r") as f:
         data = toml.load(f)
     return data
+
+
+def files_key(paths, params: dict = None) -> str:
+    """Hashes a set of files by name, size and modification time together
+    with the parameters used to process them, so derived data can tell when
+    it is stale without reading the files
+
+    :param paths: paths of the source files
+    :type paths: Iterable[str]
+
+    :param params: JSON serializable processing parameters
+    :type params: dict
+
+    :returns: hex digest
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(params or {}, sort_keys=True).encode())
+    for path in paths:
+        stat = os.stat(path)
+        h.update(
+            f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode()
+        )
+    return h.hexdigest()
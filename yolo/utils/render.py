@@ -0,0 +1,180 @@
+import colorsys
+
+import numpy as np
+import torch
+
+from yolo.base import BoxArray, Grid
+from yolo.utils.images import BOUNDING_BOX_COLOR, BOUNDING_BOX_THICKNESS, GRID_COLOR
+
+
+def make_palette(num_colors: int = 20) -> np.ndarray:
+    """Makes a table of evenly spaced, saturated colors
+
+    :param num_colors: number of colors
+    :type num_colors: int
+
+    :returns: (num_colors, 3) uint8 RGB color table
+    :rtype: numpy.ndarray
+    """
+    colors = [colorsys.hsv_to_rgb(k / num_colors, 1.0, 1.0) for k in range(num_colors)]
+    return (np.array(colors) * 255).astype(np.uint8)
+
+
+DEFAULT_PALETTE = make_palette()
+
+
+def _ranges(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Concatenates ``arange(lo[k], hi[k] + 1)`` for every k"""
+    counts = np.maximum(hi - lo + 1, 0)
+    ends = np.cumsum(counts)
+    total = int(ends[-1]) if len(ends) else 0
+    return np.repeat(lo - ends + counts, counts) + np.arange(total)
+
+
+def _to_uint8_batch(images, out: np.ndarray = None) -> np.ndarray:
+    """Returns the images as an (N, H, W, 3) uint8 array, written into
+    ``out`` if given and converted in place when possible"""
+    if isinstance(images, torch.Tensor):
+        if images.shape[-1] != 3:
+            images = images.permute(0, 2, 3, 1)
+        if images.is_floating_point():
+            # Augmented or normalized images stray outside [0, 1] and would
+            # wrap around in the uint8 cast
+            images = (images * 255).clamp(0, 255)
+        if out is None:
+            return images.to(torch.uint8).numpy()
+        torch.from_numpy(out).copy_(images)
+        return out
+
+    if out is None:
+        if images.dtype == np.uint8:
+            return images
+        out = np.empty(images.shape, dtype=np.uint8)
+    if out is images:
+        return out
+    if images.dtype == np.uint8:
+        np.copyto(out, images)
+    else:
+        scaled = np.multiply(images, 255, dtype=np.float32)
+        np.clip(scaled, 0, 255, out=scaled)
+        np.copyto(out, scaled, casting="unsafe")
+    return out
+
+
+def _box_colors(boxes: BoxArray, num_colors: int) -> np.ndarray:
+    """Index of the color of every box, ``num_colors`` for unlabeled boxes"""
+    if boxes.labels is None or boxes.labels.dtype.kind not in "iu":
+        return np.full(len(boxes), num_colors, dtype=np.int64)
+    return boxes.labels.astype(np.int64) % num_colors
+
+
+def render_overlays(
+    images,
+    boxes: list[BoxArray] = None,
+    grid: Grid = None,
+    palette: np.ndarray = DEFAULT_PALETTE,
+    thickness: int = BOUNDING_BOX_THICKNESS,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """Draws grids and bounding boxes on a whole batch of images at once.
+
+    All grid lines are drawn with two slice assignments and all box
+    outlines of the batch with one indexed assignment per color. Boxes with
+    integer labels take their color from the palette, other boxes use
+    the default bounding box color.
+
+    :param images: (N, H, W, 3) uint8 or float images in [0, 1], or the
+                   (N, 3, H, W) tensors produced by the dataloader. Float
+                   values outside [0, 1] are clamped.
+    :type images: numpy.ndarray or torch.Tensor
+
+    :param boxes: boxes in pixels, one box array per image
+    :type boxes: list[:class:`BoxArray`]
+
+    :param grid: grid to draw on every image
+    :type grid: :class:`Grid`
+
+    :param palette: (K, 3) uint8 color table indexed by label
+    :type palette: numpy.ndarray
+
+    :param thickness: thickness of the box outlines in pixels
+    :type thickness: int
+
+    :param out: preallocated (N, H, W, 3) uint8 buffer to draw into. If not
+                given, uint8 numpy images are drawn on in place.
+    :type out: numpy.ndarray
+
+    :returns: (N, H, W, 3) uint8 images with the overlays
+    :rtype: numpy.ndarray
+    """
+    out = _to_uint8_batch(images, out)
+    height, width = out.shape[1:3]
+
+    if grid is not None:
+        out[:, :, grid.x_edges[:-1]] = GRID_COLOR
+        out[:, grid.y_edges[:-1], :] = GRID_COLOR
+
+    if not boxes:
+        return out
+
+    boxes = [b.numpy() for b in boxes]
+    image_idx = np.concatenate(
+        [np.full(len(b), n, dtype=np.int64) for n, b in enumerate(boxes)]
+    )
+    if len(image_idx) == 0:
+        return out
+    xyxy = np.concatenate([b.xyxy() for b in boxes])
+    color_table = np.concatenate([palette, [BOUNDING_BOX_COLOR]]).astype(np.uint8)
+    box_colors = np.concatenate([_box_colors(b, len(palette)) for b in boxes])
+
+    # Same pixel convention as Rectangle.get_top_left_pixel and
+    # Rectangle.get_bottom_right_pixel
+    x1 = np.floor(xyxy[:, 0]).astype(np.int64) + 1
+    y1 = np.floor(xyxy[:, 1]).astype(np.int64) + 1
+    x2 = np.ceil(xyxy[:, 2]).astype(np.int64)
+    y2 = np.ceil(xyxy[:, 3]).astype(np.int64)
+    # Boxes entirely off the image would be clamped onto its border
+    inside = (x2 >= 0) & (x1 < width) & (y2 >= 0) & (y1 < height)
+    if not inside.all():
+        image_idx, box_colors = image_idx[inside], box_colors[inside]
+        x1, y1, x2, y2 = x1[inside], y1[inside], x2[inside], y2[inside]
+    x1 = np.clip(x1, 0, width - 1)
+    y1 = np.clip(y1, 0, height - 1)
+    x2 = np.clip(x2, 0, width - 1)
+    y2 = np.clip(y2, 0, height - 1)
+
+    # Every edge of every box is a run of pixels with a start, a length and
+    # a stride into the flattened batch
+    top = image_idx * height
+    starts, lengths, strides = [], [], []
+    for t in range(thickness):
+        for row in (np.minimum(y1 + t, y2), np.maximum(y2 - t, y1)):
+            starts.append((top + row) * width + x1)
+            lengths.append(x2 - x1 + 1)
+            strides.append(np.ones_like(x1))
+        for col in (np.minimum(x1 + t, x2), np.maximum(x2 - t, x1)):
+            starts.append((top + y1) * width + col)
+            lengths.append(y2 - y1 + 1)
+            strides.append(np.full_like(x1, width))
+    colors = np.tile(box_colors, 4 * thickness)
+    order = np.argsort(colors, kind="stable")
+    starts = np.concatenate(starts)[order]
+    lengths = np.maximum(np.concatenate(lengths)[order], 0)
+    strides = np.concatenate(strides)[order]
+    offsets = _ranges(np.zeros_like(lengths), lengths - 1)
+    pixels = np.repeat(starts, lengths) + offsets * np.repeat(strides, lengths)
+
+    # Viewing every RGB triple as one 3 byte item makes the scatter write
+    # whole pixels, and grouping the runs by color lets every color be
+    # written with one scalar assignment
+    pixel_dtype = np.dtype((np.void, 3))
+    target = out if out.flags.c_contiguous else np.ascontiguousarray(out)
+    flat = target.view(pixel_dtype).reshape(-1)
+    table = color_table.view(pixel_dtype).reshape(-1)
+    used, counts = np.unique(colors[order], return_counts=True)
+    bounds = np.concatenate([[0], np.cumsum(lengths)[np.cumsum(counts) - 1]])
+    for color, lo, hi in zip(used, bounds[:-1], bounds[1:]):
+        flat[pixels[lo:hi]] = table[color]
+    if target is not out:
+        out[...] = target
+    return out
@@ -0,0 +1,132 @@
+import hashlib
+import os
+
+import torch
+
+SAFETENSORS_SUFFIX = ".safetensors"
+HASH_SUFFIX = ".sha256"
+# Bytes hashed per read
+HASH_CHUNK = 1 << 20
+
+
+class WeightsError(ValueError):
+    """A weights file does not match the hash saved with it"""
+
+
+def _import_safetensors():
+    try:
+        import safetensors.torch
+    except ImportError as error:
+        raise ImportError(
+            "Weights in the safetensors format need the safetensors package, "
+            "install it with: pip install safetensors"
+        ) from error
+    return safetensors.torch
+
+
+def file_sha256(path: str) -> str:
+    """
+    :param path: path of the file
+    :type path: str
+
+    :returns: hex digest of the contents
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def save_state_dict(state_dict: dict, path: str):
+    """Saves weights atomically together with their hash.
+
+    The weights and the hash are written to temporary files and renamed
+    over the destination, so a crash never leaves a truncated file behind.
+    The hash is saved next to the weights as ``<path>.sha256``, in the
+    format of ``sha256sum``.
+
+    :param state_dict: state dict, or any object the torch format takes
+    :type state_dict: dict
+
+    :param path: path of the file, saved as safetensors if it ends with
+                 ``.safetensors`` and with :func:`torch.save` otherwise
+    :type path: str
+
+    :raises ValueError: if the safetensors format can not hold the weights
+    """
+    tmp = path + ".tmp"
+    try:
+        if path.endswith(SAFETENSORS_SUFFIX):
+            tensors = {}
+            for name, value in state_dict.items():
+                if not isinstance(value, torch.Tensor):
+                    raise ValueError(f"{name} is not a tensor, save it as a .pt file")
+                # Safetensors stores the data in order, channels last weights
+                # are reordered here and back when they are loaded
+                tensors[name] = value.detach().contiguous()
+            _import_safetensors().save_file(tensors, tmp)
+        else:
+            torch.save(state_dict, tmp)
+        digest = file_sha256(tmp)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    with open(path + HASH_SUFFIX + ".tmp", "w") as file:
+        file.write(f"{digest}  {os.path.basename(path)}\n")
+    # A crash between the two renames leaves a stale hash, which fails the
+    # verification instead of passing a wrong file
+    os.replace(tmp, path)
+    os.replace(path + HASH_SUFFIX + ".tmp", path + HASH_SUFFIX)
+
+
+def verify_weights(path: str) -> bool:
+    """
+    :param path: file written by :func:`save_state_dict`
+    :type path: str
+
+    :returns: False if no hash was saved with the file
+    :rtype: bool
+    :raises WeightsError: if the file does not match its hash
+    """
+    try:
+        with open(path + HASH_SUFFIX) as file:
+            expected = file.read().split()[0]
+    except FileNotFoundError:
+        return False
+    if file_sha256(path) != expected:
+        raise WeightsError(f"{path} does not match the hash in {path}{HASH_SUFFIX}")
+    return True
+
+
+def load_state_dict(path: str, mmap: bool = True, verify: bool = False) -> dict:
+    """Loads weights on the CPU without copying them into memory first.
+
+    Both formats map the file, so the tensors share the pages of the OS
+    file cache and are only read when they are used. Loading them into a
+    model with ``assign=True`` keeps them that way, see
+    :meth:`yolo.model.Yolo.from_weights`.
+
+    :param path: safetensors file, or file written by :func:`torch.save`
+    :type path: str
+
+    :param mmap: map torch files instead of reading them. Files of the
+                 legacy, pre zip format can not be mapped.
+    :type mmap: bool
+
+    :param verify: check the file against its saved hash first, which
+                   reads the whole file
+    :type verify: bool
+
+    :returns: the saved state dict
+    :rtype: dict
+    :raises WeightsError: if ``verify`` is set and the file has no hash or
+                          does not match it
+    """
+    if verify and not verify_weights(path):
+        raise WeightsError(f"No hash was saved with {path}")
+    if path.endswith(SAFETENSORS_SUFFIX):
+        return _import_safetensors().load_file(path, device="cpu")
+    return torch.load(path, map_location="cpu", mmap=mmap)